@@ -267,31 +267,34 @@ except ClientError as my_Error:
 	print(my_Error)
 
 print(ERASE_LINE, end='\r')
+VPCsToDelete=[]
 for i in range(len(DefaultVPCs)):
 	# print("I found a default VPC for account {} in region {}".format(DefaultVPCs[i]['AccountID'], DefaultVPCs[i]['Region']), end='\n')
 	if FixRun:
-		logging.warning("Deleting VpcId %s in account %s in region %s", DefaultVPCs[i]['VPCId'], DefaultVPCs[i]['AccountID'], DefaultVPCs[i]['Region'])
-		try:	# confirm the user really want to delete the VPC. This is irreversible
-			if pVPCConfirm:
-				ReallyDelete=True
-			else:
-				ReallyDelete=(input("Deletion of {} default VPC has been requested. Are you still sure? (y/n): ".format(DefaultVPCs[i]['Region'])) in ['y', 'Y'])
-			if ReallyDelete:
-				DelVPC_Success=(vpc_modules.del_vpc(account_credentials, DefaultVPCs[i]['VPCId'], DefaultVPCs[i]['Region'])==0)
-				if DelVPC_Success:
-					ProcessStatus['Step1']['IssuesFixed']+=1
-				else:
-					print("Something went wrong with the VPC Deletion")
-					ProcessStatus['Step1']['Success']=False
-					sys.exit(9)
-			else:
-				logging.warning("User answered False to the 'Are you sure' question")
-				print("Skipping VPC ID {} in account {} in region {}".format(DefaultVPCs[i]['VPCId'], DefaultVPCs[i]['AccountID'], DefaultVPCs[i]['Region']))
-				ProcessStatus['Step1']['Success']=False
-		except ClientError as my_Error:
-			logging.error("Failed to delete the Default VPCs in the region properly")
+		# confirm the user really want to delete the VPC. This is irreversible
+		if pVPCConfirm:
+			ReallyDelete=True
+		else:
+			ReallyDelete=(input("Deletion of {} default VPC has been requested. Are you still sure? (y/n): ".format(DefaultVPCs[i]['Region'])) in ['y', 'Y'])
+		if ReallyDelete:
+			logging.warning("Deleting VpcId %s in account %s in region %s", DefaultVPCs[i]['VPCId'], DefaultVPCs[i]['AccountID'], DefaultVPCs[i]['Region'])
+			VPCsToDelete.append(DefaultVPCs[i])
+		else:
+			logging.warning("User answered False to the 'Are you sure' question")
+			print("Skipping VPC ID {} in account {} in region {}".format(DefaultVPCs[i]['VPCId'], DefaultVPCs[i]['AccountID'], DefaultVPCs[i]['Region']))
 			ProcessStatus['Step1']['Success']=False
-			print(my_Error)
+
+# Once they're all confirmed, the default VPCs in every region are deleted at the same time
+if len(VPCsToDelete) > 0:
+	DelVPC_Results=vpc_modules.del_vpcs([(account_credentials, vpc['VPCId'], vpc['Region']) for vpc in VPCsToDelete], fMaxWorkers=len(VPCsToDelete))
+	for vpc, DelVPC_Result in zip(VPCsToDelete, DelVPC_Results):
+		if DelVPC_Result == 0:
+			ProcessStatus['Step1']['IssuesFixed']+=1
+		else:
+			print("Something went wrong with the VPC Deletion of {} in region {}".format(vpc['VPCId'], vpc['Region']))
+			ProcessStatus['Step1']['Success']=False
+	if ProcessStatus['Step1']['IssuesFixed'] < len(VPCsToDelete):
+		sys.exit(9)
 
 print()
 if ProcessStatus['Step1']['Success']:
@@ -22,7 +22,6 @@ import Inventory_Modules
 import argparse
 from colorama import init, Fore
 from botocore.exceptions import ClientError
-from prettytable import PrettyTable
 
 import logging
 
@@ -121,31 +120,6 @@ else:
 	# Updated as of January 5th, 2020 to the 10 regions supported by AWS Control Tower.
 	RegionList=['us-east-1', 'us-east-2', 'us-west-2', 'eu-west-1', 'ap-southeast-2', 'ap-southeast-1', 'eu-central-1', 'eu-north-1', 'eu-west-2', 'ca-central-1']
 
-ERASE_LINE = '\x1b[2K'
-
-print(ERASE_LINE,"Gathering all account data from {} profile".format(pProfile),end="\r")
-logging.info("Confirming that this profile {%s} represents a Management Account", pProfile)
-ProfileIsRoot=Inventory_Modules.find_if_org_root(pProfile)
-logging.info("---%s---",ProfileIsRoot)
-if ProfileIsRoot == 'Root':
-	logging.info("Profile represents a Management Account: %s",pProfile)
-	if pChildAccountId == 'all':
-		ChildAccounts=Inventory_Modules.find_child_accounts2(pProfile)
-	else:
-		ChildAccounts=[{'ParentProfile':pProfile,'AccountId':pChildAccountId,'AccountEmail':'NotImportant@Right.Now'}]
-	# ChildAccounts=Inventory_Modules.RemoveCoreAccounts(ChildAccounts,AccountsToSkip)
-elif ProfileIsRoot == 'StandAlone':
-	logging.info("Profile represents a Standalone account: %s",pProfile)
-	MyAcctNumber=Inventory_Modules.find_account_number(pProfile)
-	ChildAccounts=[]
-elif ProfileIsRoot == 'Child':
-	logging.info("Profile name: %s is a child account",pProfile)
-	MyAcctNumber=Inventory_Modules.find_account_number(pProfile)
-	ChildAccounts=[]
-
-ERASE_LINE = '\x1b[2K'
-
-print()
 ExplainMessage = """
 Objective: This script aims to identify issues and make it easier to "adopt" an existing account into a Control Tower environment.
 
@@ -186,6 +160,35 @@ if pExplain:
 	print(ExplainMessage)
 	sys.exit("Exiting after Script Explanation...")
 
+# Nothing above needed AWS, so --explain doesn't wait on boto3 or the network
+Inventory_Modules.preload_service_models(['sts', 'organizations', 'config', 'cloudtrail', 'sns', 'lambda', 'iam', 'logs'])
+
+ERASE_LINE = '\x1b[2K'
+
+print(ERASE_LINE,"Gathering all account data from {} profile".format(pProfile),end="\r")
+logging.info("Confirming that this profile {%s} represents a Management Account", pProfile)
+ProfileIsRoot=Inventory_Modules.find_if_org_root(pProfile)
+logging.info("---%s---",ProfileIsRoot)
+if ProfileIsRoot == 'Root':
+	logging.info("Profile represents a Management Account: %s",pProfile)
+	if pChildAccountId == 'all':
+		ChildAccounts=Inventory_Modules.find_child_accounts2(pProfile)
+	else:
+		ChildAccounts=[{'ParentProfile':pProfile,'AccountId':pChildAccountId,'AccountEmail':'NotImportant@Right.Now'}]
+	# ChildAccounts=Inventory_Modules.RemoveCoreAccounts(ChildAccounts,AccountsToSkip)
+elif ProfileIsRoot == 'StandAlone':
+	logging.info("Profile represents a Standalone account: %s",pProfile)
+	MyAcctNumber=Inventory_Modules.find_account_number(pProfile)
+	ChildAccounts=[]
+elif ProfileIsRoot == 'Child':
+	logging.info("Profile name: %s is a child account",pProfile)
+	MyAcctNumber=Inventory_Modules.find_account_number(pProfile)
+	ChildAccounts=[]
+
+ERASE_LINE = '\x1b[2K'
+
+print()
+
 # Step 0 -
 # 0. The Child account MUST allow the Management account access into the Child IAM role called "AWSControlTowerExecution"
 
@@ -273,6 +276,8 @@ def DoSteps(fChildAccountId, fProfile, fFixRun, fRegionList):
 			sys.exit("Exiting for other failure...")
 	
 	account_credentials['AccountNumber']=fChildAccountId
+	# No point checking the regions this account hasn't opted into
+	fRegionList=Inventory_Modules.filter_enabled_regions(account_credentials, fRegionList)
 	logging.error("Was able to successfully connect using the credentials... ")
 	print()
 	calling_creds=Inventory_Modules.find_calling_identity(fProfile)
@@ -722,6 +727,8 @@ for account in OrgResults:
 	else:
 		print(Fore.RED+"Account # {} has {} issues that would hinder the adoption of this account".format(account['AccountId'],account['IssuesFound'] - account['IssuesFixed'])+Fore.RESET)
 
+# Only needed for the summary at the very end, so it doesn't slow down --explain (or anything else)
+from prettytable import PrettyTable
 x = PrettyTable()
 y = PrettyTable()
 
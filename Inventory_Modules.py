@@ -16,10 +16,868 @@ IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
 CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
 
+import os
+import abc
+import threading
+from collections import OrderedDict
+
+# Where we keep anything we want to remember between runs
+CACHE_DIR = os.path.expanduser(os.getenv('INVENTORY_SCRIPTS_CACHE_DIR', '~/.inventory_scripts'))
+
+"""
+The maximum number of simultaneous calls we'll allow against any single service when fanning out across accounts and regions.
+Anything not listed here is only limited by the number of workers requested.
+IAM and Organizations are global, low-TPS APIs, so they get the smallest caps.
+"""
+SERVICE_CONCURRENCY_LIMITS = {
+	'iam': 4,
+	'organizations': 2,
+	'sts': 10,
+	'cloudformation': 10,
+	'ec2': 20,
+	'config': 10,
+	'cloudtrail': 10,
+	'sns': 10,
+	'logs': 10,
+}
+_service_semaphores = {}
+_service_semaphores_lock = threading.Lock()
+
+"""
+Assumed-role credentials are re-used until this many seconds before they expire.
+Set the environment variable INVENTORY_CREDENTIAL_CACHE=disk (or call enable_credential_disk_cache) to keep them between runs too.
+"""
+CREDENTIAL_EXPIRY_MARGIN = int(os.getenv('INVENTORY_CREDENTIAL_EXPIRY_MARGIN', '300'))
+_credential_cache = {}
+_role_preferences = None
+_credential_cache_file = os.path.join(CACHE_DIR, 'credentials.json') if os.getenv('INVENTORY_CREDENTIAL_CACHE', '').lower() == 'disk' else None
+_credential_cache_loaded = False
+_credential_cache_lock = threading.RLock()
+# When we don't already know which role gets us into an account, all the candidates are tried at once.
+# Set the environment variable INVENTORY_ROLE_PROBING=sequential to try them one at a time instead.
+PARALLEL_ROLE_PROBING = not os.getenv('INVENTORY_ROLE_PROBING', '').lower() == 'sequential'
+
+"""
+What we learn about each profile's place within its Organization (account number, org attributes, child accounts) is
+kept in a snapshot file, and re-used for ORG_SNAPSHOT_TTL seconds. Each item is refreshed on its own as it goes stale.
+Set the environment variable INVENTORY_REFRESH_ORG_SNAPSHOT (or call invalidate_org_snapshot) to start from scratch.
+"""
+ORG_SNAPSHOT_TTL = int(os.getenv('INVENTORY_ORG_SNAPSHOT_TTL', '3600'))
+_org_snapshot = None
+_org_snapshot_lock = threading.RLock()
+
+"""
+Which regions each account has enabled (opt-in regions it hasn't opted into are left out) is kept in a file under
+CACHE_DIR, and re-used for ENABLED_REGIONS_TTL seconds. fan_out_finder uses this to skip the regions an account can't use.
+Set the environment variable INVENTORY_REFRESH_ENABLED_REGIONS (or call invalidate_enabled_regions) to look them all up again.
+"""
+ENABLED_REGIONS_TTL = int(os.getenv('INVENTORY_ENABLED_REGIONS_TTL', '86400'))
+_enabled_regions = None
+_enabled_regions_lock = threading.RLock()
+
+"""
+Sessions and clients are re-used, keyed by the credentials (access key id, or profile name), region and service.
+Creating a client re-parses the botocore service model and starts a new connection pool, so this saves a lot of time.
+The least recently used are dropped once we hit CLIENT_CACHE_SIZE.
+"""
+CLIENT_CACHE_SIZE = int(os.getenv('INVENTORY_CLIENT_CACHE_SIZE', '256'))
+_session_cache = OrderedDict()
+_client_cache = OrderedDict()
+_client_cache_lock = threading.RLock()
+# Sessions and clients are made outside _client_cache_lock (which only guards the caches), so workers using different
+# credentials don't wait on each other. Each set of credentials gets its own lock for that, since a boto3 Session isn't
+# safe to make clients from on several threads at once.
+_creation_locks = {}
+
+"""
+boto3 isn't imported until something needs it, and every session shares one botocore data loader (see get_data_loader),
+so each service model is only read and parsed once per process. preload_service_models gets the import and the parsing
+out of the way in the background, while the script does other things - otherwise every worker thread that makes its first
+client for a service parses the same model at the same time.
+"""
+PRELOAD_SERVICES = ['sts', 'organizations']
+_shared_data_loader = None
+_data_loader_lock = threading.Lock()
+_preload_thread = None
+# Functions called with (client, ocredentials, fProfile) for every new client - see register_client_hook
+_client_hooks = []
+
+"""
+When we're only checking which profiles work (and what they are), we don't want to wait the botocore default of 60 seconds
+for a dead endpoint, so those calls use these (connect, read) timeouts. PROFILE_TIMEOUT caps the total time spent on any one
+profile - including things like an SSO login or credential_process that never returns.
+"""
+PROFILE_PROBE_TIMEOUTS = (int(os.getenv('INVENTORY_PROBE_CONNECT_TIMEOUT', '5')), int(os.getenv('INVENTORY_PROBE_READ_TIMEOUT', '10')))
+PROFILE_TIMEOUT = int(os.getenv('INVENTORY_PROFILE_TIMEOUT', '30'))
+
+
+def get_session_key(ocredentials=None, fProfile=None):
+	"""
+	Returns the key we cache sessions (and clients) under - either ('AccessKeyId', <key id>) or ('Profile', <profile name>).
+	"""
+	if fProfile is None and ocredentials is not None and ocredentials.get('AccessKeyId') is not None:
+		return(('AccessKeyId', ocredentials['AccessKeyId']))
+	elif fProfile is None and ocredentials is not None:
+		return(('Profile', ocredentials.get('Profile')))
+	else:
+		return(('Profile', fProfile))
+
+
+def get_session(ocredentials=None, fProfile=None):
+	"""
+	- ocredentials is an object with the following structure:
+		- ['AccessKeyId'] holds the AWS_ACCESS_KEY
+		- ['SecretAccessKey'] holds the AWS_SECRET_ACCESS_KEY
+		- ['SessionToken'] holds the AWS_SESSION_TOKEN
+		- ['Profile'] can hold the profile, instead of the session credentials
+		- ['ParentProfile'], ['AccountNumber'], ['Role'] and ['Expiration'], if they're all there (as they are from
+		  get_account_credentials), let the session renew the credentials itself - see get_refreshing_session
+	- fProfile is a profile name. If provided, it wins over ocredentials.
+
+	If neither is provided (or both are empty), you get a session based on your default credentials.
+	Returns a boto3 Session - the same one each time for the same credentials.
+	All sessions share the same botocore data loader, so service models are only parsed once.
+	"""
+	import boto3
+
+	SessionKey = get_session_key(ocredentials, fProfile)
+	my_Session = get_cached(_session_cache, SessionKey)
+	if my_Session is not None:
+		return(my_Session)
+	if _preload_thread is not None:
+		# Whatever it's in the middle of parsing, we'd only parse again ourselves
+		_preload_thread.join()
+	with get_creation_lock(('Session', SessionKey)):
+		# Someone else may have made it while we waited
+		my_Session = get_cached(_session_cache, SessionKey)
+		if my_Session is not None:
+			return(my_Session)
+		if SessionKey[0] == 'AccessKeyId' and all(ocredentials.get(key) is not None for key in ('ParentProfile', 'AccountNumber', 'Role', 'Expiration')):
+			my_Session = get_refreshing_session(ocredentials)
+		elif SessionKey[0] == 'AccessKeyId':
+			my_Session = boto3.Session(
+				aws_access_key_id=ocredentials['AccessKeyId'],
+				aws_secret_access_key=ocredentials['SecretAccessKey'],
+				aws_session_token=ocredentials.get('SessionToken'))
+		else:
+			my_Session = boto3.Session(profile_name=SessionKey[1])
+		# Every session shares one loader, so each service model is only read and parsed once per process
+		my_Session._session.register_component('data_loader', get_data_loader())
+		return(put_cached(_session_cache, SessionKey, my_Session))
+
+
+def get_creation_lock(fKey):
+	"""
+	Returns the lock that making the session (or clients) for fKey happens under - see _creation_locks.
+	"""
+	with _client_cache_lock:
+		return(_creation_locks.setdefault(fKey, threading.Lock()))
+
+
+def get_cached(fCache, fKey):
+	"""
+	Returns what's in fCache (_session_cache or _client_cache) for fKey - marking it as the most recently used - or None.
+	"""
+	with _client_cache_lock:
+		if fKey in fCache:
+			fCache.move_to_end(fKey)
+			return(fCache[fKey])
+	return(None)
+
+
+def put_cached(fCache, fKey, fValue):
+	"""
+	Adds fValue to fCache under fKey (dropping the least recently used, past CLIENT_CACHE_SIZE), and returns it.
+	"""
+	with _client_cache_lock:
+		fCache[fKey] = fValue
+		while len(fCache) > CLIENT_CACHE_SIZE:
+			fCache.popitem(last=False)
+	return(fValue)
+
+
+def get_data_loader():
+	"""
+	Returns the botocore data loader every session shares - created the first time it's asked for.
+	"""
+	global _shared_data_loader
+
+	with _data_loader_lock:
+		if _shared_data_loader is None:
+			import boto3, botocore.loaders
+
+			_shared_data_loader = botocore.loaders.create_loader(os.getenv('AWS_DATA_PATH'))
+			# boto3 keeps its resource models in a directory of its own
+			_shared_data_loader.search_paths.append(os.path.join(os.path.dirname(boto3.__file__), 'data'))
+		return(_shared_data_loader)
+
+
+def load_service_models(fServices):
+	"""
+	- fServices is a list of boto3 service names
+
+	Reads and parses the models for fServices (and the endpoint and retry data every client needs) into the shared loader.
+	"""
+	import logging
+
+	try:
+		Loader = get_data_loader()
+	except Exception as my_Error:
+		logging.info("Couldn't preload the service models: %s", my_Error)
+		return()
+	for data in ['endpoints', '_retry', 'sdk-default-configuration']:
+		try:
+			Loader.load_data(data)
+		except Exception as my_Error:
+			# Not every version of botocore has all of these
+			logging.info("Couldn't preload %s: %s", data, my_Error)
+	for service in fServices:
+		for model in ['service-2', 'paginators-1']:
+			try:
+				Loader.load_service_model(service, model)
+			except Exception as my_Error:
+				# Some services don't have paginators
+				logging.info("Couldn't preload the %s model for %s: %s", model, service, my_Error)
+
+
+def preload_service_models(fServices=None):
+	"""
+	- fServices is the list of boto3 service names the script is going to use. Defaults to PRELOAD_SERVICES.
+
+	Starts importing boto3 and parsing those service models in a background thread, and returns straight away.
+	get_session waits for it to finish before making any session, so nothing gets parsed twice. Only the first call counts.
+	"""
+	global _preload_thread
+
+	with _data_loader_lock:
+		if _preload_thread is not None:
+			return()
+		_preload_thread = threading.Thread(target=load_service_models, args=(list(fServices or PRELOAD_SERVICES),), daemon=True)
+		_preload_thread.start()
+
+
+def get_refreshing_session(ocredentials):
+	"""
+	- ocredentials are credentials from get_account_credentials - they have to include ['ParentProfile'], ['AccountNumber'],
+	  ['Role'] and ['Expiration']
+
+	Returns a boto3 Session whose credentials renew themselves - by assuming the same role again - shortly before they
+	expire, so clients made from it (and cached by get_client) keep working through scans that run for hours.
+	"""
+	import boto3, botocore.session
+	from botocore.credentials import RefreshableCredentials
+
+	def get_metadata(fCredentials):
+		Expiration = fCredentials['Expiration']
+		return({'access_key': fCredentials['AccessKeyId'],
+		        'secret_key': fCredentials['SecretAccessKey'],
+		        'token': fCredentials['SessionToken'],
+		        'expiry_time': Expiration.isoformat() if hasattr(Expiration, 'isoformat') else str(Expiration)})
+
+	def refresh():
+		import logging
+
+		logging.info("Renewing the credentials for account %s (role %s)", ocredentials['AccountNumber'], ocredentials['Role'])
+		account_credentials, role = get_child_access2(ocredentials['ParentProfile'], ocredentials['AccountNumber'],
+		                                              fRoleList=[ocredentials['Role']], fUseCache=False)
+		if account_credentials['AccessKeyId'] is None:
+			raise RuntimeError("Couldn't renew the credentials for account {} using role {}".format(ocredentials['AccountNumber'], ocredentials['Role']))
+		return(get_metadata(account_credentials))
+
+	my_botocore_Session = botocore.session.get_session()
+	my_botocore_Session._credentials = RefreshableCredentials.create_from_metadata(metadata=get_metadata(ocredentials),
+	                                                                               refresh_using=refresh,
+	                                                                               method='sts-assume-role')
+	return(boto3.Session(botocore_session=my_botocore_Session))
+
+
+def get_client(fService, fRegion=None, ocredentials=None, fProfile=None, fTimeouts=None):
+	"""
+	- fService is the boto3 service name ('ec2', 'cloudformation', etc.)
+	- fRegion is the region. If None, the region from the profile (or environment) is used
+	- ocredentials / fProfile are as described in get_session
+	- fTimeouts is an optional (connect timeout, read timeout) tuple, in seconds. If None, the botocore defaults are used
+
+	Returns a boto3 client - the same one each time for the same credentials, region, service and timeouts.
+	boto3 clients are thread-safe once created, so these can be shared across worker threads.
+	"""
+	from botocore.config import Config
+
+	SessionKey = get_session_key(ocredentials, fProfile)
+	ClientKey = (SessionKey, fRegion, fService, fTimeouts)
+	my_Client = get_cached(_client_cache, ClientKey)
+	if my_Client is not None:
+		return(my_Client)
+	ConfigOptions = {}
+	if RATE_LIMITING:
+		# The rate limiter backs off when we're throttled, so give it a few more chances before giving up on a call
+		ConfigOptions['retries'] = {'max_attempts': RATE_LIMIT_MAX_ATTEMPTS}
+	if fTimeouts is not None:
+		ConfigOptions.update(connect_timeout=fTimeouts[0], read_timeout=fTimeouts[1], retries={'max_attempts': 2})
+	my_Config = Config(**ConfigOptions) if ConfigOptions else None
+	my_Session = get_session(ocredentials, fProfile)
+	with get_creation_lock(('Client', SessionKey)):
+		# Someone else may have made it while we waited
+		my_Client = get_cached(_client_cache, ClientKey)
+		if my_Client is not None:
+			return(my_Client)
+		my_Client = my_Session.client(fService, region_name=fRegion, config=my_Config)
+		with _client_cache_lock:
+			Hooks = list(_client_hooks)
+		for hook in Hooks:
+			hook(my_Client, ocredentials, fProfile)
+		return(put_cached(_client_cache, ClientKey, my_Client))
+
+def register_client_hook(fHook):
+	"""
+	- fHook is called with (client, ocredentials, fProfile) for every client get_client makes from now on - usually to
+	  register handlers on the client's events (client.meta.events).
+	"""
+	with _client_cache_lock:
+		if fHook not in _client_hooks:
+			_client_hooks.append(fHook)
+
+
+def paginate(fClient, fOperation, fResultKey, fFragments=None, fFragmentKey=None, fPageSize=None, fMaxItems=None, **kwargs):
+	"""
+	- fClient is a boto3 client (like one from get_client)
+	- fOperation is the name of the API call ('list_roles', 'describe_stacks', etc.)
+	- fResultKey is the key within each page that holds the list of items ('Roles', 'Stacks', etc.)
+	- fFragments is an optional list of strings. If provided (and 'all' isn't in the list), only items that contain one of them are returned
+	- fFragmentKey is the key within each item to compare the fragments to. If None, the item itself is compared (for lists of strings)
+	- fPageSize is how many items to ask for in each call. If None, the API default is used
+	- fMaxItems stops the pagination once this many (matching) items have been found
+	- Any other keyword parameters are passed along to the API call itself (like Filters or StackStatusFilter)
+
+	This is a generator - items come back one at a time as each page arrives, so only a single page is ever held in memory.
+	Stop iterating whenever you like, and no further pages will be requested.
+	"""
+	PaginationConfig = {}
+	if fPageSize is not None:
+		PaginationConfig['PageSize'] = fPageSize
+	if fFragments is not None and ('all' in fFragments or 'ALL' in fFragments or 'All' in fFragments):
+		fFragments = None
+	ItemsFound = 0
+	for page in fClient.get_paginator(fOperation).paginate(PaginationConfig=PaginationConfig, **kwargs):
+		for item in page.get(fResultKey, []):
+			if fFragments is not None:
+				ItemName = item if fFragmentKey is None else item[fFragmentKey]
+				if not any(ItemName.find(fragment) >= 0 for fragment in fFragments):
+					continue
+			yield(item)
+			ItemsFound += 1
+			if fMaxItems is not None and ItemsFound >= fMaxItems:
+				return
+
+
+"""
+Call profiling - when enabled (enable_call_profiling, or --profile-calls on the scripts), every client made by get_client
+records each API call through botocore's event system: counts, latency, retries, throttles and response bytes, per
+(service, operation, region, account). LATENCY_BUCKETS are the upper bounds (in seconds) of the latency histogram.
+"""
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float('inf'))
+THROTTLING_ERRORS = ('Throttling', 'ThrottlingException', 'ThrottledException', 'RequestThrottledException',
+                     'TooManyRequestsException', 'RequestLimitExceeded', 'SlowDown', 'RequestThrottled')
+_call_stats = {}
+_call_trace = None
+_call_stats_lock = threading.Lock()
+
+
+def get_call_account(ocredentials=None, fProfile=None):
+	"""
+	Returns what we label a client's calls with - the account number when we have it, otherwise the profile name.
+	"""
+	if fProfile is None and ocredentials is not None and ocredentials.get('AccountNumber') is not None:
+		return(str(ocredentials['AccountNumber']))
+	elif fProfile is None and ocredentials is not None and ocredentials.get('Profile') is not None:
+		return(ocredentials['Profile'])
+	return(fProfile or 'default')
+
+
+def record_call(fKey, fDuration, fError=None, fRetries=0, fThrottles=0, fBytes=0):
+	"""
+	- fKey is a (service, operation, region, account) tuple
+	- fDuration is how long the call took (including retries), in seconds
+	"""
+	import time
+
+	with _call_stats_lock:
+		Stats = _call_stats.get(fKey)
+		if Stats is None:
+			Stats = {'Calls': 0, 'Errors': 0, 'Retries': 0, 'Throttles': 0, 'Bytes': 0, 'TotalTime': 0.0, 'MaxTime': 0.0,
+			         'Histogram': [0] * len(LATENCY_BUCKETS)}
+			_call_stats[fKey] = Stats
+		Stats['Calls'] += 1
+		Stats['Errors'] += 0 if fError is None else 1
+		Stats['Retries'] += fRetries
+		Stats['Throttles'] += fThrottles
+		Stats['Bytes'] += fBytes
+		Stats['TotalTime'] += fDuration
+		Stats['MaxTime'] = max(Stats['MaxTime'], fDuration)
+		Stats['Histogram'][next(x for x in range(len(LATENCY_BUCKETS)) if fDuration <= LATENCY_BUCKETS[x])] += 1
+		if _call_trace is not None:
+			_call_trace.append({'Time': time.time(), 'Service': fKey[0], 'Operation': fKey[1], 'Region': fKey[2],
+			                    'Account': fKey[3], 'Duration': fDuration, 'Error': fError, 'Retries': fRetries,
+			                    'Throttles': fThrottles, 'Bytes': fBytes})
+
+
+def profile_client(fClient, ocredentials=None, fProfile=None):
+	"""
+	Hooks the call-recording handlers into one client's events. This is the client hook that enable_call_profiling registers.
+	"""
+	import time
+
+	Service = fClient.meta.service_model.service_name
+	Region = fClient.meta.region_name
+	Account = get_call_account(ocredentials, fProfile)
+
+	def before_call(model, context, **kwargs):
+		context['inventory_call_start'] = time.perf_counter()
+		context['inventory_call_operation'] = model.name
+		context['inventory_call_throttles'] = 0
+
+	def needs_retry(response, request_dict, **kwargs):
+		# botocore sends needs-retry after every attempt (the last one too), so this is where we count every throttle
+		if response is not None and response[1].get('Error', {}).get('Code') in THROTTLING_ERRORS:
+			Context = request_dict.get('context', {})
+			Context['inventory_call_throttles'] = Context.get('inventory_call_throttles', 0) + 1
+
+	def after_call(http_response, parsed, model, context, **kwargs):
+		Start = context.pop('inventory_call_start', None)
+		if Start is None:
+			return
+		Error = parsed.get('Error', {}).get('Code') if http_response.status_code >= 300 else None
+		record_call((Service, model.name, Region, Account), time.perf_counter() - Start, Error,
+		            parsed.get('ResponseMetadata', {}).get('RetryAttempts', 0), context.pop('inventory_call_throttles', 0),
+		            int(http_response.headers.get('content-length', 0) or 0))
+
+	def after_call_error(context, exception, **kwargs):
+		# This is for when there's no response at all (like a connection error). Older botocore versions don't send it.
+		Start = context.pop('inventory_call_start', None)
+		if Start is None:
+			return
+		record_call((Service, context.get('inventory_call_operation'), Region, Account), time.perf_counter() - Start, type(exception).__name__,
+		            0, context.pop('inventory_call_throttles', 0))
+
+	fClient.meta.events.register('before-call', before_call, unique_id='inventory-profile-before-call')
+	fClient.meta.events.register('needs-retry', needs_retry, unique_id='inventory-profile-needs-retry')
+	fClient.meta.events.register('after-call', after_call, unique_id='inventory-profile-after-call')
+	fClient.meta.events.register('after-call-error', after_call_error, unique_id='inventory-profile-after-call-error')
+
+
+def enable_call_profiling(fTraceFileName=None, fReportFile=None):
+	"""
+	- fTraceFileName is where to write every individual call (as json) when the script exits. If None, there's no trace.
+	- fReportFile is where to print the summary table when the script exits. Defaults to stderr.
+
+	Only clients made after this is called are profiled, so call it before anything else.
+	"""
+	import atexit, sys
+	global _call_trace
+
+	if profile_client in _client_hooks:
+		return
+	if fTraceFileName is not None:
+		_call_trace = []
+	register_client_hook(profile_client)
+
+	def report():
+		print_call_report(fReportFile or sys.stderr)
+		if fTraceFileName is not None:
+			save_call_trace(fTraceFileName)
+	atexit.register(report)
+
+
+def get_call_stats():
+	"""
+	Returns a copy of what's been recorded, as {(service, operation, region, account): stats}
+	"""
+	with _call_stats_lock:
+		return({key: dict(_call_stats[key], Histogram=list(_call_stats[key]['Histogram'])) for key in _call_stats})
+
+
+def merge_call_stats(fStats, fTrace=None):
+	"""
+	- fStats is what get_call_stats returned somewhere else (like a worker process), to add to what we've recorded here
+	- fTrace is that process's trace (a list of calls), if it kept one. It's only kept if we're keeping one too.
+	"""
+	with _call_stats_lock:
+		for key in fStats:
+			Stats = _call_stats.get(key)
+			if Stats is None:
+				_call_stats[key] = dict(fStats[key], Histogram=list(fStats[key]['Histogram']))
+				continue
+			for measure in ('Calls', 'Errors', 'Retries', 'Throttles', 'Bytes', 'TotalTime'):
+				Stats[measure] += fStats[key][measure]
+			Stats['MaxTime'] = max(Stats['MaxTime'], fStats[key]['MaxTime'])
+			Stats['Histogram'] = [x + y for x, y in zip(Stats['Histogram'], fStats[key]['Histogram'])]
+		if _call_trace is not None and fTrace:
+			_call_trace.extend(fTrace)
+
+
+def get_latency_percentile(fHistogram, fPercentile):
+	"""
+	Returns the upper bound of the histogram bucket the percentile falls in.
+	"""
+	Target = sum(fHistogram) * fPercentile / 100
+	Count = 0
+	for x in range(len(fHistogram)):
+		Count += fHistogram[x]
+		if Count >= Target:
+			return(LATENCY_BUCKETS[x])
+	return(LATENCY_BUCKETS[-1])
+
+
+def print_call_report(fFile=None, fTopN=25):
+	"""
+	Prints the fTopN (service, operation, region, account) combinations that took the most time, and then totals by service.
+	"""
+	import sys
+
+	fFile = fFile or sys.stderr
+	Stats = get_call_stats()
+	if not Stats:
+		print("No API calls were recorded", file=fFile)
+		return
+	fmt='%-16s %-32s %-15s %-15s %7s %6s %7s %9s %10s %9s %8s %8s'
+	print(file=fFile)
+	print(fmt % ("Service", "Operation", "Region", "Account", "Calls", "Errors", "Retries", "Throttles", "KB", "Total(s)", "Avg(ms)", "p90(s)"), file=fFile)
+	print(fmt % ("-------", "---------", "------", "-------", "-----", "------", "-------", "---------", "--", "--------", "-------", "------"), file=fFile)
+	for key in sorted(Stats, key=lambda x: Stats[x]['TotalTime'], reverse=True)[:fTopN]:
+		call = Stats[key]
+		print(fmt % (key[0], key[1], key[2], key[3], call['Calls'], call['Errors'], call['Retries'], call['Throttles'],
+		             "{:.1f}".format(call['Bytes'] / 1024), "{:.2f}".format(call['TotalTime']),
+		             "{:.0f}".format(1000 * call['TotalTime'] / call['Calls']), get_latency_percentile(call['Histogram'], 90)), file=fFile)
+	if len(Stats) > fTopN:
+		print("... and {} more".format(len(Stats) - fTopN), file=fFile)
+	Services = {}
+	for key in Stats:
+		Total = Services.setdefault(key[0], {'Calls': 0, 'Errors': 0, 'Retries': 0, 'Throttles': 0, 'Bytes': 0, 'TotalTime': 0.0})
+		for measure in Total:
+			Total[measure] += Stats[key][measure]
+	fmt='%-16s %7s %6s %7s %9s %10s %9s'
+	print(file=fFile)
+	print(fmt % ("Service", "Calls", "Errors", "Retries", "Throttles", "KB", "Total(s)"), file=fFile)
+	print(fmt % ("-------", "-----", "------", "-------", "---------", "--", "--------"), file=fFile)
+	for service in sorted(Services, key=lambda x: Services[x]['TotalTime'], reverse=True):
+		Total = Services[service]
+		print(fmt % (service, Total['Calls'], Total['Errors'], Total['Retries'], Total['Throttles'],
+		             "{:.1f}".format(Total['Bytes'] / 1024), "{:.2f}".format(Total['TotalTime'])), file=fFile)
+
+
+def save_call_trace(fFileName):
+	"""
+	Writes every call recorded (since enable_call_profiling was given a trace file) to fFileName, as json.
+	"""
+	import json
+
+	with _call_stats_lock:
+		Trace = list(_call_trace or [])
+	with open(fFileName, 'w') as f:
+		json.dump({'LatencyBuckets': [str(bucket) for bucket in LATENCY_BUCKETS], 'Calls': Trace}, f, default=str)
+
+
+"""
+Rate limiting - every client made by get_client waits for a token from the RateLimiter for its (service, account, region)
+before each request it sends (retries included). Each limiter starts at the rate in SERVICE_RATE_LIMITS and adapts to
+what AWS tells us (AIMD): every successful call adds RATE_LIMIT_INCREASE calls/second, up to RATE_LIMIT_MAX, and a
+throttling response halves the rate (at most once a second, so a burst of throttles counts as one).
+IAM and Organizations are global, so all regions share one limiter for them.
+Set the environment variable INVENTORY_RATE_LIMIT=off to turn this off.
+"""
+SERVICE_RATE_LIMITS = {
+	'iam': 5.0,
+	'organizations': 2.0,
+	'sts': 10.0,
+	'cloudformation': 5.0,
+}
+DEFAULT_RATE_LIMIT = 10.0
+RATE_LIMIT_MIN = 0.5
+RATE_LIMIT_MAX = float(os.getenv('INVENTORY_RATE_LIMIT_MAX', '100'))
+RATE_LIMIT_INCREASE = 0.1
+RATE_LIMIT_MAX_ATTEMPTS = 10
+GLOBAL_SERVICES = ('iam', 'organizations', 'route53', 'cloudfront')
+RATE_LIMITING = not os.getenv('INVENTORY_RATE_LIMIT', '').lower() in ('off', 'no', 'false', '0')
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+class RateLimiter(object):
+	"""
+	A token bucket, shared by every thread (and client) calling the same service in the same account and region.
+	The bucket holds up to one second's worth of tokens, so there's never much of a burst.
+	"""
+	def __init__(self, fRate):
+		import time
+
+		self.rate = fRate
+		self.tokens = 1.0
+		self.updated = time.monotonic()
+		self.decreased = 0.0
+		self.throttles = 0
+		self._lock = threading.Lock()
+
+	def take(self):
+		"""
+		Spends a token if there is one, and returns None. Otherwise returns how long to wait before trying again.
+		"""
+		import time
+
+		with self._lock:
+			Now = time.monotonic()
+			self.tokens = min(max(1.0, self.rate), self.tokens + (Now - self.updated) * self.rate)
+			self.updated = Now
+			if self.tokens >= 1:
+				self.tokens -= 1
+				return(None)
+			return((1 - self.tokens) / self.rate)
+
+	def acquire(self):
+		"""
+		Blocks until there's a token to spend.
+		"""
+		import time
+
+		while True:
+			Wait = self.take()
+			if Wait is None:
+				return
+			time.sleep(Wait)
+
+	def succeeded(self):
+		with self._lock:
+			self.rate = min(RATE_LIMIT_MAX, self.rate + RATE_LIMIT_INCREASE)
+
+	def throttled(self):
+		import time
+
+		with self._lock:
+			self.throttles += 1
+			Now = time.monotonic()
+			if Now - self.decreased >= 1:
+				self.rate = max(RATE_LIMIT_MIN, self.rate / 2)
+				self.decreased = Now
+
+
+def get_rate_limiter(fService, fAccount, fRegion):
+	"""
+	Returns the RateLimiter for this (service, account, region) - the same one for everyone asking.
+	"""
+	Scope = (fService, fAccount, 'global' if fService in GLOBAL_SERVICES else fRegion)
+	with _rate_limiters_lock:
+		if Scope not in _rate_limiters:
+			_rate_limiters[Scope] = RateLimiter(SERVICE_RATE_LIMITS.get(fService, DEFAULT_RATE_LIMIT))
+		return(_rate_limiters[Scope])
+
+
+def rate_limit_client(fClient, ocredentials=None, fProfile=None, fAsync=False):
+	"""
+	Hooks the rate limiter into one client's events. This is registered as a client hook unless INVENTORY_RATE_LIMIT=off.
+	fAsync is for aiobotocore clients, which wait for their token without blocking the event loop.
+	"""
+	Limiter = get_rate_limiter(fClient.meta.service_model.service_name, get_call_account(ocredentials, fProfile), fClient.meta.region_name)
+
+	def before_send(request, **kwargs):
+		if fAsync:
+			# aiobotocore waits on whatever coroutine a handler returns
+			return(rate_limit_async(Limiter))
+		Limiter.acquire()
+
+	def needs_retry(response, **kwargs):
+		if response is not None and response[1].get('Error', {}).get('Code') in THROTTLING_ERRORS:
+			Limiter.throttled()
+
+	def after_call(http_response, parsed, **kwargs):
+		# A throttle on the last attempt has already been through needs_retry, like every other attempt's
+		if http_response.status_code < 300:
+			Limiter.succeeded()
+
+	fClient.meta.events.register('before-send', before_send, unique_id='inventory-rate-limit-before-send')
+	fClient.meta.events.register('needs-retry', needs_retry, unique_id='inventory-rate-limit-needs-retry')
+	fClient.meta.events.register('after-call', after_call, unique_id='inventory-rate-limit-after-call')
+
+
+if RATE_LIMITING:
+	register_client_hook(rate_limit_client)
+
+
+"""
+Negative cache - a role we couldn't assume into an account, and an (account, region, service) that answered with one of
+DENIED_ERRORS (or an operation that answered with one of ACCESS_DENIED_ERRORS), is remembered for NEGATIVE_CACHE_TTL
+seconds. CREDENTIAL_ERRORS, and anything from credentials that don't say which account they're for, are remembered
+against the access key rather than the account. Asking again within that time fails straight away, with the same error, without calling AWS.
+What was skipped this way is reported (on stderr) when the script exits.
+Set the environment variable INVENTORY_NEGATIVE_CACHE=disk to remember these between runs too, or
+INVENTORY_NEGATIVE_CACHE_TTL=0 to turn this off.
+"""
+NEGATIVE_CACHE_TTL = int(os.getenv('INVENTORY_NEGATIVE_CACHE_TTL', '600'))
+# These mean we can't use this service in this region at all
+DENIED_ERRORS = ('AuthFailure', 'UnrecognizedClientException', 'InvalidClientTokenId', 'OptInRequired')
+# Of those, these are about the credentials themselves - new credentials for the same account may well work
+CREDENTIAL_ERRORS = ('UnrecognizedClientException', 'InvalidClientTokenId')
+# These only mean we're not allowed to make this particular call
+ACCESS_DENIED_ERRORS = ('AccessDenied', 'AccessDeniedException', 'UnauthorizedOperation')
+_access_failures = None
+_access_failures_file = os.path.join(CACHE_DIR, 'access_failures.json') if os.getenv('INVENTORY_NEGATIVE_CACHE', '').lower() == 'disk' else None
+_skipped_access = {}
+_access_failures_lock = threading.RLock()
+
+
+def load_access_failures():
+	"""
+	Reads the remembered failures from disk (if INVENTORY_NEGATIVE_CACHE=disk) - only once per process - and arranges for
+	them to be written back, and for the skipped report to be printed, when the script exits.
+	"""
+	import atexit
+	global _access_failures
+
+	with _access_failures_lock:
+		if _access_failures is None:
+			_access_failures = {}
+			if _access_failures_file is not None:
+				for FailureKey, Failure in (read_cache_file(_access_failures_file) or {}).items():
+					_access_failures[tuple(FailureKey.split('|'))] = Failure
+			atexit.register(save_access_failures)
+			atexit.register(print_skipped_report)
+		return(_access_failures)
+
+
+def save_access_failures():
+	import logging, time
+
+	with _access_failures_lock:
+		if _access_failures is None or _access_failures_file is None:
+			return()
+		try:
+			write_cache_file(_access_failures_file, {'|'.join(FailureKey): Failure for FailureKey, Failure in _access_failures.items()
+			                                         if time.time() - Failure['Timestamp'] <= NEGATIVE_CACHE_TTL})
+		except OSError as my_Error:
+			logging.warning("Couldn't save the negative cache: %s", my_Error)
+
+
+def record_access_failure(fKey, fReason):
+	"""
+	- fKey is a tuple of strings - either ('AssumeRole', root profile, account, role) or ('Call', account, region, service, operation),
+	  where the operation is '*' when none of the service's operations will work, and the account can be an access key
+	- fReason is the error code we got
+	"""
+	import time
+
+	if NEGATIVE_CACHE_TTL <= 0:
+		return()
+	with _access_failures_lock:
+		load_access_failures()[tuple(str(x) for x in fKey)] = {'Timestamp': time.time(), 'Reason': fReason}
+
+
+def get_access_failure(fKey):
+	"""
+	Returns the error code we remember for fKey (as described in record_access_failure), or None if we don't remember one
+	(or it's older than NEGATIVE_CACHE_TTL). Each time it returns one, that counts as a skip for print_skipped_report.
+	"""
+	import time
+
+	if NEGATIVE_CACHE_TTL <= 0:
+		return(None)
+	fKey = tuple(str(x) for x in fKey)
+	with _access_failures_lock:
+		Failure = load_access_failures().get(fKey)
+		if Failure is None:
+			return(None)
+		if time.time() - Failure['Timestamp'] > NEGATIVE_CACHE_TTL:
+			del _access_failures[fKey]
+			return(None)
+		Skipped = _skipped_access.setdefault(fKey, {'Reason': Failure['Reason'], 'Count': 0})
+		Skipped['Count'] += 1
+		return(Failure['Reason'])
+
+
+def clear_access_failures(fAccount=None):
+	"""
+	Forgets the failures remembered for fAccount - or for every account, if fAccount is None.
+	"""
+	with _access_failures_lock:
+		for FailureKey in list(load_access_failures()):
+			# The account is the third part of an 'AssumeRole' key, and the second part of a 'Call' key
+			if fAccount is None or str(fAccount) == FailureKey[2 if FailureKey[0] == 'AssumeRole' else 1]:
+				del _access_failures[FailureKey]
+		save_access_failures()
+
+
+def get_skipped_access():
+	"""
+	Returns a copy of what was skipped, as {key: {'Reason': error code, 'Count': times skipped}}
+	"""
+	with _access_failures_lock:
+		return({FailureKey: dict(Skipped) for FailureKey, Skipped in _skipped_access.items()})
+
+
+def print_skipped_report(fFile=None):
+	"""
+	Prints what we didn't try (since it failed recently) - nothing at all if we didn't skip anything.
+	"""
+	import sys
+
+	fFile = fFile or sys.stderr
+	Skipped = get_skipped_access()
+	if not Skipped:
+		return
+	fmt='%-10s %-15s %-15s %-40s %-28s %7s'
+	print(file=fFile)
+	print("These were skipped, since they failed within the last {} seconds:".format(NEGATIVE_CACHE_TTL), file=fFile)
+	print(fmt % ("Kind", "Account", "Region", "Role / Operation", "Reason", "Skipped"), file=fFile)
+	print(fmt % ("----", "-------", "------", "----------------", "------", "-------"), file=fFile)
+	for key in sorted(Skipped):
+		if key[0] == 'AssumeRole':
+			print(fmt % (key[0], key[2], "-", key[3], Skipped[key]['Reason'], Skipped[key]['Count']), file=fFile)
+		else:
+			print(fmt % (key[0], key[1], key[2], "{}:{}".format(key[3], key[4]), Skipped[key]['Reason'], Skipped[key]['Count']), file=fFile)
+
+
+def negative_cache_client(fClient, ocredentials=None, fProfile=None):
+	"""
+	Hooks the negative cache into one client's events. This is registered as a client hook unless INVENTORY_NEGATIVE_CACHE_TTL=0.
+	"""
+	from botocore.exceptions import ClientError
+
+	Service = fClient.meta.service_model.service_name
+	Region = fClient.meta.region_name
+	SessionKey = get_session_key(ocredentials, fProfile)
+	# Credentials without an AccountNumber (straight from sts.assume_role, say) would all be labelled 'default', and one
+	# account's failure would be replayed to every other account - so those are remembered by their access key instead
+	if SessionKey[0] == 'AccessKeyId':
+		Credentials = SessionKey[1]
+		Account = str(ocredentials['AccountNumber']) if ocredentials.get('AccountNumber') is not None else Credentials
+	else:
+		Credentials = Account = get_call_account(ocredentials, fProfile)
+
+	def before_call(model, **kwargs):
+		for who, operation in ((Account, '*'), (Account, model.name), (Credentials, '*')):
+			Reason = get_access_failure(('Call', who, Region, Service, operation))
+			if Reason is not None:
+				raise ClientError({'Error': {'Code': Reason,
+				                             'Message': "Not tried, since this failed within the last {} seconds".format(NEGATIVE_CACHE_TTL)}},
+				                  model.name)
+
+	def after_call(http_response, parsed, model, **kwargs):
+		Error = parsed.get('Error', {}).get('Code') if http_response.status_code >= 300 else None
+		if Error in CREDENTIAL_ERRORS:
+			record_access_failure(('Call', Credentials, Region, Service, '*'), Error)
+		elif Error in DENIED_ERRORS:
+			record_access_failure(('Call', Account, Region, Service, '*'), Error)
+		elif Error in ACCESS_DENIED_ERRORS:
+			record_access_failure(('Call', Account, Region, Service, model.name), Error)
+
+	fClient.meta.events.register('before-call', before_call, unique_id='inventory-negative-cache-before-call')
+	fClient.meta.events.register('after-call', after_call, unique_id='inventory-negative-cache-after-call')
+
+
+if NEGATIVE_CACHE_TTL > 0:
+	register_client_hook(negative_cache_client)
+
+
 def get_regions(fkey, fprofile="default"):
-	import boto3, logging
-	session_ec2=boto3.Session(profile_name=fprofile)
-	region_info=session_ec2.client('ec2')
+	import logging
+	region_info=get_client('ec2', fProfile=fprofile)
 	regions=region_info.describe_regions()
 	RegionNames=[]
 	for x in range(len(regions['Regions'])):
@@ -37,9 +895,8 @@ def get_regions(fkey, fprofile="default"):
 
 
 def get_ec2_regions(fkey, fprofile="default"):
-	import boto3, logging
-	session_ec2=boto3.Session(profile_name=fprofile)
-	region_info=session_ec2.client('ec2')
+	import logging
+	region_info=get_client('ec2', fProfile=fprofile)
 	regions=region_info.describe_regions(
 		Filters=[{
 			'Name': 'opt-in-status',
@@ -67,8 +924,8 @@ def get_service_regions(service, fkey):
 		service=the AWS service we're trying to get regions for. This is useful since not all services are supported in all regions.
 		fkey=A string fragment of what region we're looking for. If 'all', then we send back all regions for that service. If they send "us-" (for example), we would send back only those regions which matched that fragment. This is good for focusing a search on only those regions you're searching within.
 	"""
-	import boto3, logging
-	s=boto3.Session()
+	import logging
+	s=get_session()
 	regions=s.get_available_regions(service, partition_name='aws', allow_non_regional=False)
 	if "all" in fkey or "ALL" in fkey:
 		return(regions)
@@ -86,14 +943,13 @@ def get_profiles(fSkipProfiles=None, fprofiles=None):
 	We assume that the user of this function wants all profiles.
 	If they provide a list of profile strings (in fprofiles), then we compare those strings to the full list of profiles we have, and return those profiles that contain the strings they sent.
 	'''
-	import boto3
 	import logging
 
 	if fSkipProfiles==None:
 		fSkipProfiles=['default']
 	if fprofiles==None:
 		fprofiles=['all']
-	my_Session=boto3.Session()
+	my_Session=get_session()
 	my_profiles=my_Session._session.available_profiles
 	if "all" in fprofiles or "ALL" in fprofiles:
 		return(my_profiles)
@@ -112,13 +968,11 @@ def get_profiles2(fSkipProfiles=None, fprofiles=None):
 	We assume that the user of this function wants all profiles.
 	If they provide a list of profile strings (in fprofiles), then we compare those strings to the full list of profiles we have, and return those profiles that contain the strings they sent.
 	'''
-	import boto3
-
 	if fSkipProfiles==None:
 		fSkipProfiles=['default']
 	if fprofiles==None:
 		fprofiles=['all']
-	my_Session=boto3.Session()
+	my_Session=get_session()
 	my_profiles=my_Session._session.available_profiles
 	if "all" in fprofiles or "ALL" in fprofiles:
 		my_profiles=list(set(my_profiles)-set(fSkipProfiles))
@@ -127,14 +981,71 @@ def get_profiles2(fSkipProfiles=None, fprofiles=None):
 	return(my_profiles)
 
 
-def get_parent_profiles(fprofiles=None, fSkipProfiles=None):
+def run_with_timeouts(fFunction, fItems, fWorkers=10, fTimeout=None):
+	"""
+	- fFunction is called once for each item in fItems
+	- fWorkers is how many to run at the same time
+	- fTimeout is the most time (in seconds) we'll wait for any single item, once it's started. None means wait forever.
+
+	This is a generator, which yields (item, result, error) tuples as each item finishes. Error is the exception raised (or a
+	TimeoutError if the item took too long), and result is None if there was an error.
+	Unlike a ThreadPoolExecutor, the threads are daemon threads, so an item that hangs forever (like a credential_process
+	that never returns) can't stop the script from exiting - and a replacement thread is started so the rest keep moving.
+	"""
+	import queue, time
+
+	fItems = list(fItems)
+	WorkQueue = queue.Queue()
+	ResultQueue = queue.Queue()
+	StartTimes = {}
+	for index, item in enumerate(fItems):
+		WorkQueue.put((index, item))
+
+	def worker():
+		while True:
+			try:
+				index, item = WorkQueue.get_nowait()
+			except queue.Empty:
+				return()
+			StartTimes[index] = time.time()
+			try:
+				ResultQueue.put((index, fFunction(item), None))
+			except Exception as my_Error:
+				ResultQueue.put((index, None, my_Error))
+
+	def start_worker():
+		threading.Thread(target=worker, daemon=True).start()
+
+	for i in range(min(max(fWorkers, 1), len(fItems))):
+		start_worker()
+	Outstanding = set(range(len(fItems)))
+	while Outstanding:
+		try:
+			index, result, my_Error = ResultQueue.get(timeout=0.5)
+		except queue.Empty:
+			if fTimeout is None:
+				continue
+			for index in [i for i in Outstanding if i in StartTimes and time.time() - StartTimes[i] > fTimeout]:
+				Outstanding.discard(index)
+				# The thread stuck on this item is abandoned, so start another to pick up the remaining work
+				start_worker()
+				yield((fItems[index], None, TimeoutError("Gave up after {} seconds".format(fTimeout))))
+			continue
+		if index in Outstanding:	# Otherwise it already timed out, and we've moved on
+			Outstanding.discard(index)
+			yield((fItems[index], result, my_Error))
+
+
+def get_parent_profiles(fprofiles=None, fSkipProfiles=None, fWorkers=10, fTimeout=PROFILE_TIMEOUT, fFile=None):
 	'''
 	This function should only return profiles from Master Payer Accounts.
 	If they provide a list of profile strings (in fprofiles), then we compare those
 	strings to the full list of profiles we have, and return those profiles that
 	contain the strings AND are Master Payer Accounts.
+	The profiles are checked fWorkers at a time, and any profile that takes longer than fTimeout seconds is skipped.
+	Our progress (and any profile that didn't work) is printed to fFile - stdout, unless you say otherwise.
 	'''
-	import boto3, logging
+	import logging, sys
 	from botocore.exceptions import ClientError
 
 	ERASE_LINE='\x1b[2K'
@@ -142,7 +1053,8 @@ def get_parent_profiles(fprofiles=None, fSkipProfiles=None):
 		fSkipProfiles=['default']
 	if fprofiles==None:
 		fprofiles=['all']
-	my_Session=boto3.Session()
+	fFile=fFile or sys.stdout
+	my_Session=get_session()
 	my_profiles=my_Session._session.available_profiles
 	logging.info("Profile string sent: %s", fprofiles)
 	if "all" in fprofiles or "ALL" in fprofiles or "All" in fprofiles:
@@ -152,21 +1064,20 @@ def get_parent_profiles(fprofiles=None, fSkipProfiles=None):
 		my_profiles=list(set(fprofiles)-set(fSkipProfiles))
 	my_profiles2=[]
 	NumOfProfiles=len(my_profiles)
-	for profile in my_profiles:
-		print(ERASE_LINE, "Checking {} Profile - {} more profiles to go".format(profile, NumOfProfiles), end='\r')
-		logging.warning("Finding whether %s is a root profile", profile)
-		try:
-			AcctResult=find_if_org_root(profile)
-		except ClientError as my_Error:
-			print(my_Error)
-			continue
+	for profile, AcctResult, my_Error in run_with_timeouts(find_if_org_root, my_profiles, fWorkers, fTimeout):
 		NumOfProfiles-=1
+		print(ERASE_LINE, "Checked {} Profile - {} more profiles to go".format(profile, NumOfProfiles), end='\r', file=fFile)
+		if isinstance(my_Error, (ClientError, TimeoutError)):
+			print(profile, my_Error, file=fFile)
+			continue
+		elif my_Error is not None:
+			raise my_Error
 		if AcctResult in ['Root', 'StandAlone']:
 			logging.warning("%s is a %s Profile", profile, AcctResult)
 			my_profiles2.append(profile)
 		else:
 			logging.warning("%s is a %s Profile", profile, AcctResult)
-	return(my_profiles2)
+	return(sorted(my_profiles2))
 
 
 def find_if_org_root(fProfile):
@@ -188,10 +1099,7 @@ def find_if_org_root(fProfile):
 		return('Child')
 
 def find_if_alz(fProfile):
-	import boto3
-
-	session_org=boto3.Session(profile_name=fProfile)
-	client_org=session_org.client('s3')
+	client_org=get_client('s3', fProfile=fProfile)
 	bucket_list=client_org.list_buckets()
 	response={}
 	response['BucketName'] = None
@@ -205,12 +1113,10 @@ def find_if_alz(fProfile):
 
 
 def find_bucket_location(fProfile, fBucketname):
-	import boto3
 	import logging
 	from botocore.exceptions import ClientError
 
-	session_org=boto3.Session(profile_name=fProfile)
-	client_org=session_org.client('s3')
+	client_org=get_client('s3', fProfile=fProfile)
 	try:
 		response=client_org.get_bucket_location(
 			Bucket=fBucketname
@@ -227,28 +1133,29 @@ def find_bucket_location(fProfile, fBucketname):
 
 
 def find_acct_email(fOrgRootProfile, fAccountId):
-	import boto3
 	"""
 	This function *unfortunately* only works with organization accounts.
 	"""
 
-	session_org=boto3.Session(profile_name=fOrgRootProfile)
-	client_org=session_org.client('organizations')
+	client_org=get_client('organizations', fProfile=fOrgRootProfile)
 	email_addr=client_org.describe_account(AccountId=fAccountId)['Account']['Email']
 	# email_addr=response['Account']['Email']
 	return (email_addr)
 
 
 def find_account_number(fProfile):
-	import boto3, logging
+	import logging
 	from botocore.exceptions import ClientError, CredentialRetrievalError, InvalidConfigError
 
+	response=get_org_snapshot_item(fProfile, 'AccountNumber')
+	if response is not None:
+		return(response)
 	response='123456789012'
 	try:
-		session_sts=boto3.Session(profile_name=fProfile)
 		logging.info("Looking for profile %s", fProfile)
-		client_sts=session_sts.client('sts')
+		client_sts=get_client('sts', fProfile=fProfile, fTimeouts=PROFILE_PROBE_TIMEOUTS)
 		response=client_sts.get_caller_identity()['Account']
+		set_org_snapshot_item(fProfile, 'AccountNumber', response)
 	except ClientError as my_Error:
 		if str(my_Error).find("UnrecognizedClientException") > 0:
 			print("{}: Security Issue".format(fProfile))
@@ -271,13 +1178,12 @@ def find_account_number(fProfile):
 
 
 def find_calling_identity(fProfile):
-	import boto3, logging
+	import logging
 	from botocore.exceptions import ClientError
 
 	try:
-		session_sts=boto3.Session(profile_name=fProfile)
 		logging.info("Getting creds used within profile %s", fProfile)
-		client_sts=session_sts.client('sts')
+		client_sts=get_client('sts', fProfile=fProfile)
 		response=client_sts.get_caller_identity()
 		creds={}
 		creds['Arn']=response['Arn']
@@ -296,7 +1202,7 @@ def find_calling_identity(fProfile):
 
 
 def find_org_attr(fProfile):
-	import boto3, logging
+	import logging
 	from botocore.exceptions import ClientError, CredentialRetrievalError
 	"""
 	Response is a dict that looks like this:
@@ -316,18 +1222,23 @@ def find_org_attr(fProfile):
 	}
 
 	"""
+	response=get_org_snapshot_item(fProfile, 'OrgAttr')
+	if response is not None:
+		return(response)
 	try:
 		Success = False
 		FailResponse = {'MasterAccountId': 'StandAlone', 'Id': 'None'}
-		session_org=boto3.Session(profile_name=fProfile)
-		client_org=session_org.client('organizations')
+		client_org=get_client('organizations', fProfile=fProfile, fTimeouts=PROFILE_PROBE_TIMEOUTS)
 		response=client_org.describe_organization()['Organization']
 		Success=True
+		set_org_snapshot_item(fProfile, 'OrgAttr', response)
 	except ClientError as my_Error:
 		if str(my_Error).find("UnrecognizedClientException") > 0:
 			print(fProfile+": Security Issue")
 		elif str(my_Error).find("AWSOrganizationsNotInUseException") > 0:
 			logging.warning("%s: Account isn't a part of an Organization", fProfile)	# Stand-alone account
+			# This is a real answer (not a failure), so it's worth remembering
+			set_org_snapshot_item(fProfile, 'OrgAttr', FailResponse)
 			# Need to figure out how to provide the account's own number here as MasterAccountId
 		elif str(my_Error).find("InvalidClientTokenId") > 0:
 			print(fProfile+": Security Token is bad - probably a bad entry in config")
@@ -345,16 +1256,37 @@ def find_org_attr(fProfile):
 		return (FailResponse)
 
 def find_org_attr2(fProfile):
-	import boto3
 	# Unused... and renamed
-	session_org=boto3.Session(profile_name=fProfile)
-	client_org=session_org.client('organizations')
+	client_org=get_client('organizations', fProfile=fProfile)
 	response=client_org.describe_organization()
 	root_org=response['Organization']['MasterAccountId']
 	org_id=response['Organization']['Id']
 	return (root_org, org_id)
 
 
+def find_org_accounts(fProfile):
+	"""
+	Returns the list of accounts within the Organization that fProfile is the root of, like this:
+		[{'Id': 'xxxxxxxxxxxx', 'Email': 'EmailAddr1@example.com', 'Name': 'Account Name', 'Status': 'ACTIVE'},
+		 {'Id': 'yyyyyyyyyyyy', 'Email': 'EmailAddr2@example.com', 'Name': 'Account Name', 'Status': 'SUSPENDED'}]
+	This comes from the org snapshot when it's fresh enough. Raises ClientError if the profile isn't an Org root.
+	"""
+	Accounts=get_org_snapshot_item(fProfile, 'Accounts')
+	if Accounts is not None:
+		return(Accounts)
+	client_org=get_client('organizations', fProfile=fProfile)
+	Accounts=[]
+	for account in paginate(client_org, 'list_accounts', 'Accounts'):
+		Accounts.append({
+			'Id': account['Id'],
+			'Email': account['Email'],
+			'Name': account.get('Name'),
+			'Status': account['Status']
+		})
+	set_org_snapshot_item(fProfile, 'Accounts', Accounts)
+	return(Accounts)
+
+
 def find_child_accounts2(fProfile):
 	"""
 	This is an example of the list response from this call:
@@ -363,20 +1295,12 @@ def find_child_accounts2(fProfile):
 		 {'ParentProfile':'LZRoot', 'AccountId': 'zzzzzzzzzzzz', 'AccountEmail': 'EmailAddr3@example.com'}]
 	This can be convenient for appending and removing.
 	"""
-	import boto3, logging
+	import logging
 	from botocore.exceptions import ClientError
 	# Renamed since I'm using the one below instead.
 	child_accounts=[]
-	session_org=boto3.Session(profile_name=fProfile)
-	client_org=session_org.client('organizations')
 	try:
-		response=client_org.list_accounts()
-	except ClientError as my_Error:
-		logging.warning("Profile %s doesn't represent an Org Root account", fProfile)
-		return()
-	theresmore=True
-	while theresmore:
-		for account in response['Accounts']:
+		for account in find_org_accounts(fProfile):
 			logging.warning("Profile: %s | Account ID: %s | Account Email: %s" % (fProfile, account['Id'], account['Email']))
 			child_accounts.append({
 				'ParentProfile': fProfile,
@@ -384,11 +1308,9 @@ def find_child_accounts2(fProfile):
 				'AccountEmail': account['Email'],
 				'AccountStatus': account['Status']
 			})
-		if 'NextToken' in response:
-			theresmore=True
-			response=client_org.list_accounts(NextToken=response['NextToken'])
-		else:
-			theresmore=False
+	except ClientError as my_Error:
+		logging.warning("Profile %s doesn't represent an Org Root account", fProfile)
+		return()
 	return (child_accounts)
 
 
@@ -401,28 +1323,17 @@ def find_child_accounts(fProfile="default"):
 		 'zzzzzzzzzzzz': 'EmailAddr3@example.com'}
 	This is convenient because it is easily sortable.
 	"""
-	import boto3, logging
+	import logging
 	from botocore.exceptions import ClientError
 
 	child_accounts={}
-	session_org=boto3.Session(profile_name=fProfile)
-	theresmore=False
 	try:
-		client_org=session_org.client('organizations')
-		response=client_org.list_accounts()
-		theresmore=True
+		for account in find_org_accounts(fProfile):
+			# Create a key/value pair with the AccountID:AccountEmail
+			child_accounts[account['Id']]=account['Email']
 	except ClientError as my_Error:
 		logging.warning("Profile %s doesn't represent an Org Root account", fProfile)
 		return()
-	while theresmore:
-		for account in response['Accounts']:
-			# Create a key/value pair with the AccountID:AccountEmail
-			child_accounts[account['Id']]=account['Email']
-		if 'NextToken' in response:
-			theresmore=True
-			response=client_org.list_accounts(NextToken=response['NextToken'])
-		else:
-			theresmore=False
 	return (child_accounts)
 
 
@@ -490,48 +1401,1233 @@ def RemoveCoreAccounts(MainList, AccountsToRemove=None):
 # 	return(return_string)
 
 
-def get_child_access2(fRootProfile, fChildAccount, fRegion='us-east-1',  fRoleList=None):
+def write_cache_file(fFileName, fContents):
+	"""
+	- fFileName is the full path of the file to write
+	- fContents is anything json can serialize
+
+	The file is readable only by the owner (since some of what we cache are credentials), and is replaced atomically.
+	"""
+	import json
+
+	os.makedirs(os.path.dirname(fFileName), mode=0o700, exist_ok=True)
+	TempFileName = "{}.{}.tmp".format(fFileName, os.getpid())
+	FileHandle = os.open(TempFileName, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+	with os.fdopen(FileHandle, 'w') as f:
+		json.dump(fContents, f, default=json_default)
+	os.replace(TempFileName, fFileName)
+
+
+def read_cache_file(fFileName):
+	"""
+	Returns whatever was saved by write_cache_file, or None if the file isn't there (or isn't readable).
+	"""
+	import json, logging
+
+	try:
+		with open(fFileName) as f:
+			return(json.load(f))
+	except (OSError, ValueError) as my_Error:
+		logging.info("Couldn't read cache file %s: %s", fFileName, my_Error)
+		return(None)
+
+
+def load_org_snapshot():
+	"""
+	Reads the org snapshot from disk - only once per process - and arranges for it to be written back when the script exits.
+	"""
+	import atexit
+	global _org_snapshot
+
+	with _org_snapshot_lock:
+		if _org_snapshot is None:
+			if os.getenv('INVENTORY_REFRESH_ORG_SNAPSHOT'):
+				_org_snapshot = {}
+			else:
+				_org_snapshot = read_cache_file(os.path.join(CACHE_DIR, 'org_snapshot.json')) or {}
+			atexit.register(save_org_snapshot)
+		return(_org_snapshot)
+
+
+def save_org_snapshot():
+	import logging
+
+	with _org_snapshot_lock:
+		if _org_snapshot is None:
+			return()
+		try:
+			write_cache_file(os.path.join(CACHE_DIR, 'org_snapshot.json'), _org_snapshot)
+		except OSError as my_Error:
+			logging.warning("Couldn't save the org snapshot: %s", my_Error)
+
+
+def get_org_snapshot_item(fProfile, fItem):
+	"""
+	- fProfile is the profile name
+	- fItem is what we want to know about it ('AccountNumber', 'OrgAttr' or 'Accounts')
+
+	Returns what we remembered, or None if we don't know it (or it's older than ORG_SNAPSHOT_TTL).
+	Nothing is remembered for the default credentials (fProfile of None), since they can change from run to run.
+	"""
+	import time
+
+	if fProfile is None:
+		return(None)
+	with _org_snapshot_lock:
+		Entry = load_org_snapshot().get(fProfile, {}).get(fItem)
+		if Entry is None or time.time() - Entry['Timestamp'] > ORG_SNAPSHOT_TTL:
+			return(None)
+		return(Entry['Value'])
+
+
+def set_org_snapshot_item(fProfile, fItem, fValue):
+	import time
+
+	if fProfile is None:
+		return()
+	with _org_snapshot_lock:
+		load_org_snapshot().setdefault(fProfile, {})[fItem] = {'Timestamp': time.time(), 'Value': fValue}
+
+
+def invalidate_org_snapshot(fProfile=None):
+	"""
+	Forgets what we know about fProfile - or about every profile, if fProfile is None.
+	"""
+	with _org_snapshot_lock:
+		if fProfile is None:
+			load_org_snapshot().clear()
+		else:
+			load_org_snapshot().pop(fProfile, None)
+		save_org_snapshot()
+
+
+def enable_credential_disk_cache(fFileName=None):
+	"""
+	- fFileName is where to keep the credentials. Defaults to 'credentials.json' within CACHE_DIR
+
+	Once enabled, credentials from get_child_access2 survive between runs (until they expire).
+	The file is created readable only by its owner.
+	"""
+	global _credential_cache_file, _credential_cache_loaded
+	with _credential_cache_lock:
+		_credential_cache_file = fFileName if fFileName is not None else os.path.join(CACHE_DIR, 'credentials.json')
+		_credential_cache_loaded = False
+
+
+def load_credential_cache():
+	"""
+	Pulls the role preferences (and the credentials, if the disk cache is enabled) in from disk - only once per process.
+	Whatever we learn during the run is written back out when the script exits.
+	"""
+	import atexit, datetime
+	global _role_preferences, _credential_cache_loaded
+
+	with _credential_cache_lock:
+		if _role_preferences is None:
+			_role_preferences = read_cache_file(os.path.join(CACHE_DIR, 'role_preferences.json')) or {}
+			atexit.register(save_credential_cache)
+		if _credential_cache_loaded or _credential_cache_file is None:
+			return()
+		_credential_cache_loaded = True
+		for CacheKey, Credentials in (read_cache_file(_credential_cache_file) or {}).items():
+			Credentials['Expiration'] = datetime.datetime.fromisoformat(Credentials['Expiration'])
+			_credential_cache[tuple(CacheKey.split('|'))] = Credentials
+
+
+def save_credential_cache():
+	"""
+	Writes the role preferences (and the credentials, if the disk cache is enabled) to disk.
+	"""
+	import logging
+
+	with _credential_cache_lock:
+		try:
+			write_cache_file(os.path.join(CACHE_DIR, 'role_preferences.json'), _role_preferences)
+			if _credential_cache_file is not None:
+				write_cache_file(_credential_cache_file, {'|'.join(CacheKey): Credentials for CacheKey, Credentials in _credential_cache.items()})
+		except OSError as my_Error:
+			logging.warning("Couldn't save the credential cache: %s", my_Error)
+
+
+def get_cached_credentials(fRootProfile, fChildAccount, fRole):
+	"""
+	Returns a copy of the cached credentials for this profile/ account/ role, or None if they're not cached or are about to expire.
+	"""
+	import datetime
+
+	load_credential_cache()
+	with _credential_cache_lock:
+		Credentials = _credential_cache.get((str(fRootProfile), fChildAccount, fRole))
+		if Credentials is None:
+			return(None)
+		if Credentials['Expiration'] - datetime.timedelta(seconds=CREDENTIAL_EXPIRY_MARGIN) <= datetime.datetime.now(datetime.timezone.utc):
+			del _credential_cache[(str(fRootProfile), fChildAccount, fRole)]
+			return(None)
+		return(dict(Credentials))
+
+
+def clear_credential_cache():
+	"""
+	Forgets all cached credentials (in memory and on disk). The role preferences are kept.
+	"""
+	with _credential_cache_lock:
+		_credential_cache.clear()
+		save_credential_cache()
+
+
+def get_child_access2(fRootProfile, fChildAccount, fRegion='us-east-1',  fRoleList=None, fUseCache=True, fParallel=None):
+	"""
+	- fRootProfile is a string
+	- fChildAccount expects an AWS account number (ostensibly of a Child Account)
+	- rRegion expects a string representing one of the AWS regions ('us-east-1', 'eu-west-1', etc.)
+	- fRoleList expects a list of roles to try, but defaults to a list of typical roles, in case you don't provide
+	- fUseCache determines whether we can hand back credentials we've already gotten for this account (which haven't expired yet)
+	- fParallel determines whether the roles are tried all at once (the first to work wins), or one after the other.
+	  Defaults to PARALLEL_ROLE_PROBING.
+
+	The first response object is a dict with account_credentials to pass onto other functions
+	The second response object is the rolename that worked to gain access to the target account
+
+	Whichever role worked last time for this account is tried first - on its own, since it almost always works again.
+	Roles that failed within the last NEGATIVE_CACHE_TTL seconds aren't tried again (unless fUseCache is False).
+	"""
+	import logging
+	from botocore.exceptions import ClientError
+	from concurrent.futures import ThreadPoolExecutor, as_completed
+
+	if fRoleList == None:
+		fRoleList = ['AWSCloudFormationStackSetExecutionRole', 'AWSControlTowerExecution', 'OrganizationAccountAccessRole',
+	             'AdministratorAccess', 'Owner']
+	if not isinstance(fChildAccount, str):  # Make sure the passed in account number is a string
+		fChildAccount=str(fChildAccount)
+	load_credential_cache()
+	PreferenceKey = "{}|{}".format(fRootProfile, fChildAccount)
+	with _credential_cache_lock:
+		PreferredRole = _role_preferences.get(PreferenceKey)
+	if PreferredRole in fRoleList:
+		fRoleList = [PreferredRole] + [role for role in fRoleList if not role == PreferredRole]
+	if fUseCache:
+		for role in fRoleList:
+			account_credentials = get_cached_credentials(fRootProfile, fChildAccount, role)
+			if account_credentials is not None:
+				logging.info("Using cached credentials for account %s with role %s", fChildAccount, role)
+				return(account_credentials, role)
+	sts_client=get_client('sts', fRegion, fProfile=fRootProfile)
+	account_credentials = {'Profile': fRootProfile,
+	                       'AccessKeyId': None,
+	                       'SecretAccessKey': None,
+	                       'SessionToken': None,
+	                       'AccountNumber': None}
+	return_string="{} failed. Try Again".format(str(fRoleList))
+	if fParallel is None:
+		fParallel = PARALLEL_ROLE_PROBING
+
+	def try_role(role):
+		try:
+			logging.info("Trying to access account %s using %s profile assuming role: %s", fChildAccount, fRootProfile, role)
+			role_arn='arn:aws:iam::'+fChildAccount+':role/'+role
+			Credentials=sts_client.assume_role(
+				RoleArn=role_arn,
+				RoleSessionName="Find-ChildAccount-Things")['Credentials']
+		except ClientError as my_Error:
+			if my_Error.response['Error']['Code'] == 'ClientError':
+				logging.info(my_Error)
+			if my_Error.response['Error']['Code'] not in THROTTLING_ERRORS:
+				record_access_failure(('AssumeRole', fRootProfile, fChildAccount, role), my_Error.response['Error']['Code'])
+			return(None)
+		with _credential_cache_lock:
+			_credential_cache[(str(fRootProfile), fChildAccount, role)] = dict(Credentials)
+		return(Credentials)
+
+	Roles = []
+	for role in fRoleList:
+		if fUseCache and get_access_failure(('AssumeRole', fRootProfile, fChildAccount, role)) is not None:
+			logging.info("Not trying role %s in account %s, since it failed recently", role, fChildAccount)
+			continue
+		Roles.append(role)
+	while Roles:
+		if not fParallel or Roles[0] == PreferredRole or len(Roles) == 1:
+			role = Roles.pop(0)
+			Credentials = try_role(role)
+		else:
+			# Whichever role comes back first wins. The others can't be called back once they're sent, but any that also
+			# work are cached all the same.
+			executor = ThreadPoolExecutor(max_workers=len(Roles))
+			Probes = {executor.submit(try_role, role): role for role in Roles}
+			Roles = []
+			Credentials = None
+			try:
+				for future in as_completed(Probes):
+					Credentials = future.result()
+					if Credentials is not None:
+						role = Probes[future]
+						break
+			finally:
+				for future in Probes:
+					future.cancel()
+				executor.shutdown(wait=False)
+		if Credentials is not None:
+			with _credential_cache_lock:
+				_role_preferences[PreferenceKey] = role
+			return(Credentials, role)
+	# Returns a dict object since that's what's expected
+	# It will only get to the part below if the child isn't accessed properly using the roles already defined
+	return(account_credentials, return_string)
+
+
+def get_service_semaphore(fService, fWorkers=10):
+	"""
+	- fService is the boto3 service name ('ec2', 'cloudformation', etc.)
+	- fWorkers is the cap we'll use if the service isn't listed within SERVICE_CONCURRENCY_LIMITS
+
+	Returns a semaphore shared by every fan-out within this process, so two fan-outs against the same service still respect the cap.
+	"""
+	with _service_semaphores_lock:
+		if fService not in _service_semaphores:
+			_service_semaphores[fService] = threading.BoundedSemaphore(SERVICE_CONCURRENCY_LIMITS.get(fService, fWorkers))
+		return(_service_semaphores[fService])
+
+
+def get_account_credentials(fAccount, fRoleList=None):
+	"""
+	- fAccount is a single account record, as returned by find_child_accounts2
+	- fRoleList is passed along to get_child_access2
+
+	If the account record already carries a 'Credentials' dict (like for a standalone or child profile), that's returned as-is.
+	Otherwise we assume a role into the child account from the 'ParentProfile'. Those credentials also say which role
+	they came from, so sessions made from them renew themselves (see get_session).
+	Returns None if we couldn't gain access to the account.
+	"""
+	import logging
+
+	if 'Credentials' in fAccount and fAccount['Credentials'] is not None:
+		return(fAccount['Credentials'])
+	with get_service_semaphore('sts'):
+		account_credentials, role = get_child_access2(fAccount['ParentProfile'], fAccount['AccountId'], fRoleList=fRoleList)
+	if account_credentials['AccessKeyId'] is None:
+		logging.error("%s: Couldn't access account %s using any of the roles tried", fAccount['ParentProfile'], fAccount['AccountId'])
+		return(None)
+	account_credentials['AccountNumber'] = fAccount['AccountId']
+	account_credentials['Profile'] = None
+	account_credentials['ParentProfile'] = fAccount['ParentProfile']
+	account_credentials['Role'] = role
+	return(account_credentials)
+
+
+def get_profile_accounts(fProfile):
+	"""
+	- fProfile is a profile name
+
+	Returns the accounts to look through for this profile, as account records (like find_child_accounts2 returns):
+	all of the Organization's accounts if it's a Management Account, otherwise just its own account - with the profile's
+	credentials already attached, since there's no role to assume.
+	"""
+	import logging
+
+	ProfileIsRoot = find_if_org_root(fProfile)
+	if ProfileIsRoot == 'Root':
+		logging.info("Profile %s is a Root account", fProfile)
+		return(find_child_accounts2(fProfile))
+	Creds = find_calling_identity(fProfile)
+	if Creds == "Failure":
+		return([])
+	logging.info("Profile %s is a %s account", fProfile, ProfileIsRoot)
+	return([{'ParentProfile': fProfile,
+	         'AccountId': Creds['AccountId'],
+	         'Arn': Creds['Arn'],
+	         'AccountEmail': 'noonecares@doesntmatter.com',
+	         'Credentials': {'Profile': fProfile,
+	                         'AccessKeyId': None,
+	                         'SecretAccessKey': None,
+	                         'SessionToken': None,
+	                         'AccountNumber': Creds['AccountId']}}])
+
+
+def prefetch_credentials(fAccountList, fRoleList=None, fWorkers=10):
+	"""
+	- fAccountList is a list of account records, as returned by find_child_accounts2
+	- fRoleList is passed along to get_child_access2
+	- fWorkers is the number of threads assuming roles at the same time
+
+	This is a generator. Credentials for all the accounts are gathered in the background, in parallel, and each account is
+	yielded as soon as its credentials come back - *not* in account order - as (account, ocredentials). ocredentials is
+	None if we couldn't gain access to the account. SUSPENDED accounts are skipped.
+	The credentials renew themselves (see get_account_credentials), so they're good for however long the scan runs.
+	"""
+	import logging
+	from concurrent.futures import ThreadPoolExecutor, as_completed
+
+	executor = ThreadPoolExecutor(max_workers=max(1, fWorkers))
+	pending = {}
+	try:
+		for account in fAccountList:
+			if account.get('AccountStatus') == 'SUSPENDED':
+				logging.info("Skipping suspended account %s", account['AccountId'])
+				continue
+			pending[executor.submit(get_account_credentials, account, fRoleList)] = account
+		for future in as_completed(pending):
+			try:
+				ocredentials = future.result()
+			except Exception as my_Error:
+				logging.error("Couldn't get credentials for account %s: %s", pending[future]['AccountId'], my_Error)
+				ocredentials = None
+			yield(pending[future], ocredentials)
+	finally:
+		# If the caller stopped early, don't keep assuming roles
+		for future in pending:
+			future.cancel()
+		executor.shutdown(wait=False)
+
+
+def load_enabled_regions():
+	"""
+	Reads the enabled regions from disk - only once per process - and arranges for them to be written back when the script exits.
+	"""
+	import atexit
+	global _enabled_regions
+
+	with _enabled_regions_lock:
+		if _enabled_regions is None:
+			if os.getenv('INVENTORY_REFRESH_ENABLED_REGIONS'):
+				_enabled_regions = {}
+			else:
+				_enabled_regions = read_cache_file(os.path.join(CACHE_DIR, 'enabled_regions.json')) or {}
+			atexit.register(save_enabled_regions)
+		return(_enabled_regions)
+
+
+def save_enabled_regions():
+	"""
+	Writes the enabled regions back to disk. Whatever is already in the file (from the worker processes of
+	process_fan_out_finder, or another run) is kept, unless we have something newer for that account.
+	"""
+	import logging
+
+	with _enabled_regions_lock:
+		if _enabled_regions is None:
+			return()
+		FileName = os.path.join(CACHE_DIR, 'enabled_regions.json')
+		Merged = read_cache_file(FileName) or {}
+		for account, entry in _enabled_regions.items():
+			if account not in Merged or Merged[account]['Timestamp'] <= entry['Timestamp']:
+				Merged[account] = entry
+		try:
+			write_cache_file(FileName, Merged)
+		except OSError as my_Error:
+			logging.warning("Couldn't save the enabled regions: %s", my_Error)
+
+
+def invalidate_enabled_regions(fAccount=None):
+	"""
+	Forgets the enabled regions for fAccount - or for every account, if fAccount is None.
+	"""
+	import time
+
+	with _enabled_regions_lock:
+		Accounts = list(load_enabled_regions()) if fAccount is None else [str(fAccount)]
+		for account in Accounts:
+			# Left in place (rather than removed), so the saved copy gets forgotten too
+			_enabled_regions[account] = {'Timestamp': time.time(), 'Regions': None}
+
+
+def find_enabled_regions(ocredentials):
+	"""
+	- ocredentials is as described in get_session, with ['AccountNumber'] holding the account number
+
+	Returns the list of regions the account can use (those that don't need opting into, and those it's opted into),
+	or None if we couldn't find out. This comes from the cache when it's fresh enough.
+	"""
+	import logging, time
+	from botocore.exceptions import BotoCoreError, ClientError
+
+	Account = ocredentials.get('AccountNumber')
+	if Account is not None:
+		with _enabled_regions_lock:
+			Entry = load_enabled_regions().get(str(Account))
+			if Entry is not None and Entry['Regions'] is not None and time.time() - Entry['Timestamp'] <= ENABLED_REGIONS_TTL:
+				return(Entry['Regions'])
+	try:
+		# us-east-1 can't be opted out of, so we can always ask there
+		client_ec2=get_client('ec2', 'us-east-1', ocredentials)
+		Regions=sorted(region['RegionName'] for region in client_ec2.describe_regions(
+			Filters=[{
+				'Name': 'opt-in-status',
+				'Values': ['opt-in-not-required', 'opted-in']
+			}]
+		)['Regions'])
+	except (ClientError, BotoCoreError) as my_Error:
+		# Including not getting an answer at all (like an EndpointConnectionError or ReadTimeoutError)
+		logging.info("Couldn't find the enabled regions for account %s: %s", Account, my_Error)
+		return(None)
+	if Account is not None:
+		with _enabled_regions_lock:
+			load_enabled_regions()[str(Account)] = {'Timestamp': time.time(), 'Regions': Regions}
+	return(Regions)
+
+
+def filter_enabled_regions(ocredentials, fRegionList):
+	"""
+	Returns the regions in fRegionList that the account can actually use - or all of fRegionList, if we can't tell.
+	"""
+	import logging
+
+	Enabled = find_enabled_regions(ocredentials)
+	if Enabled is None:
+		return(list(fRegionList))
+	Skipped = [region for region in fRegionList if region not in Enabled]
+	if Skipped:
+		logging.info("Skipping regions %s for account %s, since they're not enabled", Skipped, ocredentials.get('AccountNumber'))
+	return([region for region in fRegionList if region in Enabled])
+
+
+def fan_out_finder(fAccountList, fRegionList, fFinder, fFinderArgs=None, fFinderKwargs=None, fWorkers=10, fService=None, fRoleList=None, fEnabledRegionsOnly=True):
+	"""
+	- fAccountList is a list of account records, as returned by find_child_accounts2
+	- fRegionList is a list of regions, as returned by get_regions or get_service_regions
+	- fFinder is a function that takes (ocredentials, fRegion) as its first two parameters - like find_account_instances
+	- fFinderArgs / fFinderKwargs are any additional parameters to pass to fFinder
+	- fWorkers is the number of threads to use
+	- fService is the boto3 service fFinder talks to, so we can apply the per-service cap from SERVICE_CONCURRENCY_LIMITS
+	- fRoleList is passed along to get_child_access2
+	- fEnabledRegionsOnly skips the regions (from fRegionList) that each account hasn't enabled - see find_enabled_regions
+
+	This is a generator. Credentials for each account are gathered in parallel, and each account's regions are queued up as
+	soon as its credentials come back. Results are yielded as they complete - *not* in account or region order.
+	SUSPENDED accounts are skipped, as are regions an account hasn't opted into (no results are yielded for those).
+
+	Each result yielded looks like this:
+		{'ParentProfile': 'LZRoot',
+		 'AccountId': 'xxxxxxxxxxxx',
+		 'Region': 'us-east-1',		# None if we couldn't get into the account at all
+		 'Credentials': {...},			# The credentials used - suitable for passing to other functions
+		 'Result': <whatever fFinder returned>,
+		 'Error': None}					# The exception raised, or a string if we couldn't access the account
+	"""
+	import logging
+	from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+	if fFinderArgs is None:
+		fFinderArgs = ()
+	if fFinderKwargs is None:
+		fFinderKwargs = {}
+	if fWorkers < 1:
+		fWorkers = 1
+
+	def run_finder(ocredentials, fRegion):
+		if fService is None:
+			return(fFinder(ocredentials, fRegion, *fFinderArgs, **fFinderKwargs))
+		with get_service_semaphore(fService, fWorkers):
+			return(fFinder(ocredentials, fRegion, *fFinderArgs, **fFinderKwargs))
+
+	def get_credentials(account):
+		ocredentials = get_account_credentials(account, fRoleList)
+		if ocredentials is None or not fEnabledRegionsOnly:
+			return(ocredentials, fRegionList)
+		return(ocredentials, filter_enabled_regions(ocredentials, fRegionList))
+
+	executor = ThreadPoolExecutor(max_workers=fWorkers)
+	pending = {}
+	try:
+		for account in fAccountList:
+			if account.get('AccountStatus') == 'SUSPENDED':
+				logging.info("Skipping suspended account %s", account['AccountId'])
+				continue
+			pending[executor.submit(get_credentials, account)] = (account, None, None)
+		while pending:
+			done, not_done = wait(pending, return_when=FIRST_COMPLETED)
+			for future in done:
+				account, region, ocredentials = pending.pop(future)
+				result = {'ParentProfile': account['ParentProfile'],
+				          'AccountId': account['AccountId'],
+				          'Region': region,
+				          'Credentials': ocredentials,
+				          'Result': None,
+				          'Error': None}
+				if region is None:
+					# This was the credentials lookup for the account
+					try:
+						ocredentials, Regions = future.result()
+					except Exception as my_Error:
+						ocredentials = None
+						result['Error'] = my_Error
+					if ocredentials is None:
+						if result['Error'] is None:
+							result['Error'] = "Couldn't gain access to account {}".format(account['AccountId'])
+						yield(result)
+						continue
+					logging.info("Got credentials for account %s - queuing up %s regions", account['AccountId'], len(Regions))
+					for region in Regions:
+						pending[executor.submit(run_finder, ocredentials, region)] = (account, region, ocredentials)
+				else:
+					try:
+						result['Result'] = future.result()
+					except Exception as my_Error:
+						result['Error'] = my_Error
+					yield(result)
+	finally:
+		# If the caller stopped early, don't leave the remaining work running
+		for future in pending:
+			future.cancel()
+		executor.shutdown(wait=False)
+
+
+"""
+Output sinks - where the inventory scripts send the rows they find. Rows are dicts, written out one at a time as
+they're found (rather than collected up and printed at the end), so memory stays flat and whatever's reading the
+output can start before the scan has finished.
+	- table is the fixed-width output we've always printed
+	- ndjson is one json object per line
+	- csv has a header row, then one line per row
+	- parquet is columnar, and needs pyarrow (pip install pyarrow). Rows are buffered up to PARQUET_ROW_GROUP_SIZE
+	  and then written as a row group. Every column is stored as a string.
+"""
+OUTPUT_FORMATS = ['table', 'ndjson', 'csv', 'parquet']
+PARQUET_ROW_GROUP_SIZE = int(os.getenv('INVENTORY_PARQUET_ROW_GROUP_SIZE', '10000'))
+
+
+class OutputSink(abc.ABC):
+	"""
+	- fColumns is the list of keys (in order) to take from each row
+	- fFileName is where to write. If it's None, we write to stdout.
+
+	The "console" attribute is where the script should print its progress and summary lines, so they don't get mixed
+	in with the rows - stdout for the table (or when the rows are going to a file), otherwise stderr.
+	"""
+	def __init__(self, fColumns, fFileName=None, fBinary=False):
+		import sys
+
+		self.columns = list(fColumns)
+		self.rows_written = 0
+		self._lock = threading.Lock()
+		if fFileName is None:
+			self.file = sys.stdout.buffer if fBinary else sys.stdout
+			self._close_file = False
+		else:
+			self.file = open(fFileName, 'wb' if fBinary else 'w', newline=None if fBinary else '')
+			self._close_file = True
+		self.console = sys.stdout if self._close_file else sys.stderr
+
+	def write(self, fRow, fFmt=None):
+		"""
+		- fRow is a dict with (at least) the keys in self.columns
+		- fFmt lets the table sink use a different format string for this one row (for colors, mostly). Others ignore it.
+		"""
+		with self._lock:
+			self._write(fRow, fFmt)
+			self.rows_written += 1
+
+	@abc.abstractmethod
+	def _write(self, fRow, fFmt):
+		"""
+		Writes one row - each kind of sink does this its own way. It's called with self._lock held.
+		"""
+
+	def close(self):
+		with self._lock:
+			self._flush()
+			if self._close_file:
+				self.file.close()
+			else:
+				self.file.flush()
+
+	def _flush(self):
+		pass
+
+	def __enter__(self):
+		return(self)
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+
+class TableSink(OutputSink):
+	"""
+	- fFmt is the "%" format string for each row
+	- fHeaders are the column titles. They're printed (and underlined) as soon as the sink is created.
+	"""
+	def __init__(self, fColumns, fFmt, fHeaders=None, fFileName=None):
+		OutputSink.__init__(self, fColumns, fFileName)
+		self.console = self.file if fFileName is None else self.console
+		self.fmt = fFmt
+		if fHeaders is not None:
+			print(self.fmt % tuple(fHeaders), file=self.file)
+			print(self.fmt % tuple('-' * len(header) for header in fHeaders), file=self.file)
+
+	def _write(self, fRow, fFmt):
+		print((fFmt or self.fmt) % tuple(fRow.get(column) for column in self.columns), file=self.file)
+
+
+class NdjsonSink(OutputSink):
+
+	def _write(self, fRow, fFmt):
+		import json
+
+		self.file.write(json.dumps({column: fRow.get(column) for column in self.columns}, default=json_default) + "\n")
+		self.file.flush()
+
+
+class CsvSink(OutputSink):
+
+	def __init__(self, fColumns, fFileName=None):
+		import csv
+
+		OutputSink.__init__(self, fColumns, fFileName)
+		self._writer = csv.DictWriter(self.file, fieldnames=self.columns, extrasaction='ignore')
+		self._writer.writeheader()
+
+	def _write(self, fRow, fFmt):
+		self._writer.writerow(fRow)
+		self.file.flush()
+
+
+class ParquetSink(OutputSink):
+
+	def __init__(self, fColumns, fFileName):
+		try:
+			import pyarrow
+			import pyarrow.parquet
+		except ImportError:
+			raise ImportError("The parquet output format needs pyarrow. Try 'pip install pyarrow'")
+		if fFileName is None:
+			raise ValueError("The parquet output format needs a file to write to")
+		OutputSink.__init__(self, fColumns, fFileName, fBinary=True)
+		self._pyarrow = pyarrow
+		self._schema = pyarrow.schema([(column, pyarrow.string()) for column in self.columns])
+		self._writer = pyarrow.parquet.ParquetWriter(self.file, self._schema)
+		self._buffer = {column: [] for column in self.columns}
+		self._buffered = 0
+
+	def _write(self, fRow, fFmt):
+		for column in self.columns:
+			value = fRow.get(column)
+			self._buffer[column].append(None if value is None else str(value))
+		self._buffered += 1
+		if self._buffered >= PARQUET_ROW_GROUP_SIZE:
+			self._flush()
+
+	def _flush(self):
+		if self._buffered > 0:
+			self._writer.write_table(self._pyarrow.Table.from_pydict(self._buffer, schema=self._schema))
+			self._buffer = {column: [] for column in self.columns}
+			self._buffered = 0
+
+	def close(self):
+		with self._lock:
+			self._flush()
+			self._writer.close()
+			self.file.close()
+
+
+def get_output_sink(fFormat, fColumns, fFileName=None, fFmt=None, fHeaders=None):
+	"""
+	- fFormat is one of OUTPUT_FORMATS
+	- fColumns is the list of keys (in order) to take from each row
+	- fFileName is where to write. None means stdout (parquet always needs a file).
+	- fFmt and fHeaders are only used by the table format
+
+	Returns a sink with write(row) and close() methods. It can also be used with "with".
+	"""
+	if fFormat == 'table':
+		return(TableSink(fColumns, fFmt, fHeaders, fFileName))
+	elif fFormat == 'ndjson':
+		return(NdjsonSink(fColumns, fFileName))
+	elif fFormat == 'csv':
+		return(CsvSink(fColumns, fFileName))
+	elif fFormat == 'parquet':
+		return(ParquetSink(fColumns, fFileName))
+	else:
+		raise ValueError("Output format {} isn't one of {}".format(fFormat, OUTPUT_FORMATS))
+
+
+"""
+Record types for what the scripts find - one small object per row, instead of a dict. They use __slots__, so each one
+is a fraction of the size of the equivalent dict, and none of them carry their own copy of the credentials: the
+Credentials attribute is a reference to the one ocredentials dict for the account, shared by every row from it.
+They behave enough like a (read-only) dict - row['AccountId'], row.get(), keys() - to go straight into the output sinks,
+and Credentials is left out of keys(), so it never ends up in the output (or a cache file).
+"""
+class InventoryRecord(object):
+	__slots__ = ('Credentials',)
+	fields = ()
+
+	def __init__(self, *args, **kwargs):
+		if len(args) > len(self.fields):
+			raise TypeError("{} takes at most {} fields".format(type(self).__name__, len(self.fields)))
+		self.Credentials = kwargs.pop('Credentials', None)
+		for field, value in zip(self.fields, args):
+			setattr(self, field, value)
+		for field in self.fields[len(args):]:
+			setattr(self, field, kwargs.pop(field, None))
+		if kwargs:
+			raise TypeError("{} has no field(s) {}".format(type(self).__name__, ", ".join(kwargs)))
+
+	def __getitem__(self, fKey):
+		if fKey in self.fields or fKey == 'Credentials':
+			return(getattr(self, fKey))
+		raise KeyError(fKey)
+
+	def get(self, fKey, fDefault=None):
+		try:
+			return(self[fKey])
+		except KeyError:
+			return(fDefault)
+
+	def keys(self):
+		return(self.fields)
+
+	def __iter__(self):
+		return(iter(self.fields))
+
+	def __len__(self):
+		return(len(self.fields))
+
+	def __contains__(self, fKey):
+		return(fKey in self.fields)
+
+	def __eq__(self, fOther):
+		return(type(self) is type(fOther) and self.as_tuple() == fOther.as_tuple())
+
+	def __hash__(self):
+		return(hash((type(self).__name__,) + tuple(str(value) for value in self.as_tuple())))
+
+	def __repr__(self):
+		return("{}({})".format(type(self).__name__, ", ".join("{}={!r}".format(field, getattr(self, field)) for field in self.fields)))
+
+	def as_tuple(self):
+		return(tuple(getattr(self, field) for field in self.fields))
+
+	def as_dict(self):
+		return({field: getattr(self, field) for field in self.fields})
+
+
+class AccountRecord(InventoryRecord):
+	__slots__ = fields = ('ParentProfile', 'AccountId', 'AccountEmail', 'AccountStatus')
+
+
+class InstanceRecord(InventoryRecord):
+	__slots__ = fields = ('ParentProfile', 'AccountId', 'Region', 'InstanceType', 'Name', 'InstanceId', 'PublicDnsName', 'State')
+
+
+class VpcRecord(InventoryRecord):
+	__slots__ = fields = ('AccountId', 'Region', 'VpcId', 'CidrBlock', 'IsDefault', 'VpcName')
+
+
+class StackRecord(InventoryRecord):
+	__slots__ = fields = ('Account', 'Region', 'StackName', 'StackStatus', 'StackArn')
+
+
+class StackInstanceRecord(InventoryRecord):
+	__slots__ = fields = ('Account', 'Region', 'StackSetName', 'StackId', 'Status')
+
+
+class RecorderRecord(InventoryRecord):
+	__slots__ = fields = ('AccountId', 'Region', 'ConfigurationRecorder')
+
+
+class ChannelRecord(InventoryRecord):
+	__slots__ = fields = ('AccountId', 'Region', 'DeliveryChannel')
+
+
+class TrailRecord(InventoryRecord):
+	__slots__ = fields = ('AccountId', 'Region', 'TrailName', 'HomeRegion', 'S3BucketName')
+
+
+class GuardDutyInviteRecord(InventoryRecord):
+	__slots__ = fields = ('AccountId', 'Region', 'InvitationId')
+
+
+class GuardDutyDetectorRecord(InventoryRecord):
+	__slots__ = fields = ('AccountId', 'Region', 'DetectorIds')
+
+
+def json_default(fObject):
+	"""
+	For json.dump(s) - records are written as dicts of their fields, and anything else json doesn't know (dates, mostly) as a string.
+	"""
+	if isinstance(fObject, InventoryRecord):
+		return(fObject.as_dict())
+	return(str(fObject))
+
+
+"""
+Incremental inventory - what each script found last time is kept in CACHE_DIR/inventory/<name>.json, split up into
+partitions (account, region, resource type) with a hash of each partition and of each item within it. On the next run
+a partition whose hash hasn't changed is skipped entirely; otherwise we report only what was added, removed or modified.
+Partitions we didn't look at this time (other regions, accounts we couldn't get into) are left alone.
+"""
+INVENTORY_SNAPSHOT_VERSION = 1
+
+
+def hash_content(fContents):
+	"""
+	Returns a stable hash of anything json can serialize (dates and such are hashed as strings).
+	"""
+	import hashlib, json
+
+	return(hashlib.sha256(json.dumps(fContents, sort_keys=True, default=str).encode('utf-8')).hexdigest())
+
+
+def get_inventory_snapshot_file(fName):
+	return(os.path.join(CACHE_DIR, 'inventory', "{}.json".format(fName)))
+
+
+def load_inventory_snapshot(fName):
+	"""
+	- fName is the name of the inventory (usually the script name)
+
+	Returns the snapshot from the last run, or an empty one if there wasn't one (or it's from an older version).
+	"""
+	Snapshot = read_cache_file(get_inventory_snapshot_file(fName))
+	if Snapshot is None or not Snapshot.get('Version') == INVENTORY_SNAPSHOT_VERSION:
+		Snapshot = {'Version': INVENTORY_SNAPSHOT_VERSION, 'Partitions': {}}
+	return(Snapshot)
+
+
+def save_inventory_snapshot(fName, fSnapshot):
+	write_cache_file(get_inventory_snapshot_file(fName), fSnapshot)
+
+
+def diff_inventory_partition(fSnapshot, fPartition, fItems):
+	"""
+	- fSnapshot is what load_inventory_snapshot returned. It's updated in place with what we found this time.
+	- fPartition is a tuple of strings, like (account, region, resource type)
+	- fItems is a list of (id, item, row) tuples:
+		- id is unique within the partition (an instance id, a stack id)
+		- item is what we hash to tell whether it's changed - usually what the API returned
+		- row is what we'd display for it
+
+	Returns a list of (change, row) where change is 'Added', 'Removed' or 'Modified'.
+	If the partition hasn't changed at all, you get back an empty list without comparing the individual items.
+	"""
+	import time
+
+	PartitionKey = "|".join(str(x) for x in fPartition)
+	Items = {}
+	for ItemId, Item, Row in fItems:
+		Items[str(ItemId)] = {'Hash': hash_content(Item), 'Row': Row}
+	PartitionHash = hash_content(sorted((ItemId, Items[ItemId]['Hash']) for ItemId in Items))
+	Previous = fSnapshot['Partitions'].get(PartitionKey, {'Hash': None, 'Items': {}})
+	fSnapshot['Partitions'][PartitionKey] = {'Timestamp': time.time(), 'Hash': PartitionHash, 'Items': Items}
+	if Previous['Hash'] == PartitionHash:
+		return([])
+	Changes = []
+	for ItemId in Items:
+		if ItemId not in Previous['Items']:
+			Changes.append(('Added', Items[ItemId]['Row']))
+		elif not Previous['Items'][ItemId]['Hash'] == Items[ItemId]['Hash']:
+			Changes.append(('Modified', Items[ItemId]['Row']))
+	for ItemId in Previous['Items']:
+		if ItemId not in Items:
+			Changes.append(('Removed', Previous['Items'][ItemId]['Row']))
+	return(Changes)
+
+
+"""
+Inventory store - everything the finders below (find_role_names, find_sns_topics, find_cw_log_group_names,
+find_lambda_functions, find_stacksets) get back from AWS is also kept in a SQLite file, by (account, region, resource
+type). It's indexed by account, region, type, name and tag - and by every three-character piece of each name, so
+query_inventory can find "anything with ControlTower in its name" across every account without reading every row.
+Each finder looks in the store first, if what's there is less than INVENTORY_STORE_TTL seconds old (by default it always
+asks AWS, and just keeps the store up to date). Only then is each item kept whole (the data column) - otherwise it's just
+what the indexes need (id, name and tags), so things like role trust policies aren't written out for nothing. Keeping the
+store up to date is left to a writer thread, so a scan never waits on SQLite. Set the environment variable
+INVENTORY_STORE=off to leave it alone entirely.
+"""
+INVENTORY_STORE_FILE = os.getenv('INVENTORY_STORE_FILE', os.path.join(CACHE_DIR, 'inventory.db'))
+INVENTORY_STORE_TTL = int(os.getenv('INVENTORY_STORE_TTL', '0'))
+INVENTORY_STORE_ENABLED = not os.getenv('INVENTORY_STORE', '').lower() == 'off'
+INVENTORY_STORE_TYPES = ['iam-role', 'sns-topic', 'log-group', 'lambda-function', 'stackset']
+INVENTORY_STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS partitions (
+	account TEXT NOT NULL, region TEXT NOT NULL, type TEXT NOT NULL, timestamp REAL NOT NULL,
+	PRIMARY KEY (account, region, type));
+CREATE TABLE IF NOT EXISTS resources (
+	id INTEGER PRIMARY KEY, account TEXT NOT NULL, region TEXT NOT NULL, type TEXT NOT NULL,
+	resource_id TEXT, name TEXT, tags TEXT, data TEXT, timestamp REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS resources_by_partition ON resources (account, region, type);
+CREATE INDEX IF NOT EXISTS resources_by_type_region ON resources (type, region);
+CREATE INDEX IF NOT EXISTS resources_by_type_name ON resources (type, name);
+CREATE INDEX IF NOT EXISTS resources_by_name ON resources (name);
+CREATE TABLE IF NOT EXISTS tags (
+	resource INTEGER NOT NULL REFERENCES resources (id) ON DELETE CASCADE, key TEXT NOT NULL, value TEXT);
+CREATE INDEX IF NOT EXISTS tags_by_key_value ON tags (key, value);
+CREATE INDEX IF NOT EXISTS tags_by_resource ON tags (resource);
+CREATE TABLE IF NOT EXISTS trigrams (
+	trigram TEXT NOT NULL, resource INTEGER NOT NULL REFERENCES resources (id) ON DELETE CASCADE,
+	PRIMARY KEY (trigram, resource)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS trigrams_by_resource ON trigrams (resource);
+"""
+_inventory_store = None
+_inventory_store_pid = None
+_inventory_store_lock = threading.RLock()
+# Finders only queue what they found - one writer thread (per process) saves it, a batch to a transaction
+_inventory_store_queue = None
+_inventory_store_queue_pid = None
+
+
+def get_inventory_store():
+	"""
+	Returns the (one, shared) connection to the inventory store, creating the file if it isn't there yet.
+	Anything that uses it should hold _inventory_store_lock while it does.
+	"""
+	import sqlite3
+
+	global _inventory_store, _inventory_store_pid
+	with _inventory_store_lock:
+		# A connection can't be shared with a forked process (process_fan_out_finder), so each process opens its own
+		if _inventory_store is None or not _inventory_store_pid == os.getpid():
+			os.makedirs(os.path.dirname(INVENTORY_STORE_FILE), mode=0o700, exist_ok=True)
+			os.close(os.open(INVENTORY_STORE_FILE, os.O_WRONLY | os.O_CREAT, 0o600))
+			Store = sqlite3.connect(INVENTORY_STORE_FILE, timeout=30, check_same_thread=False)
+			Store.execute("PRAGMA journal_mode=WAL")
+			Store.execute("PRAGMA foreign_keys=ON")
+			Store.executescript(INVENTORY_STORE_SCHEMA)
+			_inventory_store = Store
+			_inventory_store_pid = os.getpid()
+		return(_inventory_store)
+
+
+def get_name_trigrams(fName):
+	"""
+	Returns the set of (lower-cased) three-character pieces of fName.
+	"""
+	Name = str(fName).lower()
+	return(set(Name[x:x + 3] for x in range(len(Name) - 2)))
+
+
+def get_item_tags(fItem):
+	"""
+	Returns an item's tags as a dict - whether the API gave them to us as [{'Key': k, 'Value': v}] or as {k: v}.
+	"""
+	if not isinstance(fItem, dict):
+		return({})
+	Tags = fItem.get('Tags', fItem.get('tags'))
+	if isinstance(Tags, dict):
+		return(dict(Tags))
+	if isinstance(Tags, list):
+		return({tag['Key']: tag.get('Value') for tag in Tags if isinstance(tag, dict) and 'Key' in tag})
+	return({})
+
+
+def store_inventory_partition(fAccount, fRegion, fType, fItems, fNameKey=None, fIdKey=None):
+	"""
+	- fAccount, fRegion and fType say which partition this is, like ('123456789012', 'us-east-1', 'sns-topic')
+	- fItems is everything that's in the partition now - as the API returned it (dicts, or strings)
+	- fNameKey is the key within each item that holds its name. If None, the item itself is the name.
+	- fIdKey is the key within each item that holds its unique id. If None, the name is used.
+
+	Replaces whatever we had for the partition - not straight away, but from the writer thread (see
+	write_inventory_partitions), so the finders don't wait on SQLite. Never raises. If fAccount is None (we don't know
+	whose these are), nothing is stored. The items themselves are only kept if INVENTORY_STORE_TTL says the finders
+	will want them back.
+	"""
+	if not INVENTORY_STORE_ENABLED or fAccount is None:
+		return()
+	import logging
+
+	KeepData = INVENTORY_STORE_TTL > 0
+	Rows = []
+	try:
+		for item in fItems:
+			Name = item if fNameKey is None else item.get(fNameKey)
+			# A copy, so whatever the caller does with the item afterwards doesn't change what gets saved
+			Data = (dict(item) if isinstance(item, dict) else item) if KeepData else None
+			Rows.append((str(Name if fIdKey is None else item.get(fIdKey)), Name, get_item_tags(item), Data))
+	except Exception as my_Error:
+		logging.warning("Couldn't save %s for account %s in region %s to the inventory store: %s", fType, fAccount, fRegion, my_Error)
+		return()
+	get_inventory_store_queue().put((fAccount, fRegion, fType, Rows))
+
+
+def get_inventory_store_queue():
 	"""
-	- fRootProfile is a string
-	- fChildAccount expects an AWS account number (ostensibly of a Child Account)
-	- rRegion expects a string representing one of the AWS regions ('us-east-1', 'eu-west-1', etc.)
-	- fRoleList expects a list of roles to try, but defaults to a list of typical roles, in case you don't provide
+	Returns the queue store_inventory_partition puts partitions on - starting the writer thread that empties it, the
+	first time (in each process) it's asked for.
+	"""
+	import atexit, queue
 
-	The first response object is a dict with account_credentials to pass onto other functions
-	The second response object is the rolename that worked to gain access to the target account
+	global _inventory_store_queue, _inventory_store_queue_pid
+	with _inventory_store_lock:
+		# A forked process (process_fan_out_finder) doesn't get the parent's writer thread, so it starts its own
+		if _inventory_store_queue is None or not _inventory_store_queue_pid == os.getpid():
+			_inventory_store_queue = queue.Queue()
+			_inventory_store_queue_pid = os.getpid()
+			threading.Thread(target=write_inventory_partitions, args=(_inventory_store_queue,), daemon=True).start()
+			atexit.register(flush_inventory_store)
+		return(_inventory_store_queue)
+
+
+def write_inventory_partitions(fQueue):
 	"""
-	import boto3
-	import logging
-	from botocore.exceptions import ClientError
+	The writer thread - saves whatever partitions are waiting on fQueue, all of them in one transaction, and then waits
+	for more. If that transaction fails, each partition is tried on its own, so one bad one doesn't lose the rest.
+	"""
+	import logging, queue
 
-	if fRoleList == None:
-		fRoleList = ['AWSCloudFormationStackSetExecutionRole', 'AWSControlTowerExecution', 'OrganizationAccountAccessRole',
-	             'AdministratorAccess', 'Owner']
-	if not isinstance(fChildAccount, str):  # Make sure the passed in account number is a string
-		fChildAccount=str(fChildAccount)
-	sts_session=boto3.Session(profile_name=fRootProfile)
-	sts_client=sts_session.client('sts', region_name=fRegion)
-	account_credentials = {'Profile': fRootProfile,
-	                       'AccessKeyId': None,
-	                       'SecretAccessKey': None,
-	                       'SessionToken': None,
-	                       'AccountNumber': None}
-	for role in fRoleList:
+	while True:
+		Batch = [fQueue.get()]
+		while True:
+			try:
+				Batch.append(fQueue.get_nowait())
+			except queue.Empty:
+				break
 		try:
-			logging.info("Trying to access account %s using %s profile assuming role: %s", fChildAccount, fRootProfile, role)
-			role_arn='arn:aws:iam::'+fChildAccount+':role/'+role
-			account_credentials=sts_client.assume_role(
-				RoleArn=role_arn,
-				RoleSessionName="Find-ChildAccount-Things")['Credentials']
-			return(account_credentials, role)
-		except ClientError as my_Error:
-			if my_Error.response['Error']['Code'] == 'ClientError':
-				logging.info(my_Error)
-			return_string="{} failed. Try Again".format(str(fRoleList))
-			continue
-	# Returns a dict object since that's what's expected
-	# It will only get to the part below if the child isn't accessed properly using the roles already defined
-	return(account_credentials, return_string)
+			save_inventory_partitions(Batch)
+		except Exception:
+			for fAccount, fRegion, fType, fRows in Batch:
+				try:
+					save_inventory_partitions([(fAccount, fRegion, fType, fRows)])
+				except Exception as my_Error:
+					# Whatever it was, this thread has to carry on - flush_inventory_store waits on it
+					logging.warning("Couldn't save %s for account %s in region %s to the inventory store: %s", fType, fAccount, fRegion, my_Error)
+		finally:
+			for x in range(len(Batch)):
+				fQueue.task_done()
+
+
+def save_inventory_partitions(fPartitions):
+	"""
+	- fPartitions is a list of (account, region, type, rows), as store_inventory_partition queues them
+
+	Replaces what's in the store for each partition, all in one transaction - so if it raises, none of them are saved.
+	"""
+	import json, time
+
+	Now = time.time()
+	with _inventory_store_lock:
+		Store = get_inventory_store()
+		with Store:
+			for fAccount, fRegion, fType, fRows in fPartitions:
+				Store.execute("DELETE FROM resources WHERE account=? AND region=? AND type=?", (fAccount, fRegion, fType))
+				for ResourceId, Name, Tags, Data in fRows:
+					Cursor = Store.execute(
+						"INSERT INTO resources (account, region, type, resource_id, name, tags, data, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+						(fAccount, fRegion, fType, ResourceId, Name, json.dumps(Tags, default=str),
+						 None if Data is None else json.dumps(Data, default=str), Now))
+					Store.executemany("INSERT OR IGNORE INTO trigrams (trigram, resource) VALUES (?, ?)",
+					                  [(trigram, Cursor.lastrowid) for trigram in get_name_trigrams(Name or '')])
+					Store.executemany("INSERT INTO tags (resource, key, value) VALUES (?, ?, ?)",
+					                  [(Cursor.lastrowid, key, value) for key, value in Tags.items()])
+				Store.execute("INSERT OR REPLACE INTO partitions (account, region, type, timestamp) VALUES (?, ?, ?, ?)",
+				              (fAccount, fRegion, fType, Now))
+
+
+def flush_inventory_store():
+	"""
+	Waits until everything store_inventory_partition was given (in this process) has been saved. Reading the store does
+	this first, and it's done when the script exits.
+	"""
+	with _inventory_store_lock:
+		Queue = _inventory_store_queue if _inventory_store_queue_pid == os.getpid() else None
+	# Not while holding the lock - the writer needs it
+	if Queue is not None:
+		Queue.join()
+
+
+def get_inventory_partition(fAccount, fRegion, fType, fMaxAge=None):
+	"""
+	- fAccount, fRegion and fType are as for store_inventory_partition
+	- fMaxAge is how old (in seconds) the partition can be. Defaults to INVENTORY_STORE_TTL.
+
+	Returns the items (as they were given to store_inventory_partition, though dates come back as strings), or None if
+	we don't have the partition, it's too old, or it was saved without the items (see INVENTORY_STORE_TTL).
+	"""
+	import json, logging, sqlite3, time
+
+	fMaxAge = INVENTORY_STORE_TTL if fMaxAge is None else fMaxAge
+	if not INVENTORY_STORE_ENABLED or fMaxAge <= 0 or fAccount is None:
+		return(None)
+	flush_inventory_store()
+	try:
+		with _inventory_store_lock:
+			Store = get_inventory_store()
+			Partition = Store.execute("SELECT timestamp FROM partitions WHERE account=? AND region=? AND type=?",
+			                          (fAccount, fRegion, fType)).fetchone()
+			if Partition is None or time.time() - Partition[0] > fMaxAge:
+				return(None)
+			Rows = Store.execute("SELECT data FROM resources WHERE account=? AND region=? AND type=? ORDER BY id",
+			                     (fAccount, fRegion, fType)).fetchall()
+	except (OSError, sqlite3.Error) as my_Error:
+		logging.warning("Couldn't read %s for account %s in region %s from the inventory store: %s", fType, fAccount, fRegion, my_Error)
+		return(None)
+	if any(row[0] is None for row in Rows):
+		return(None)
+	logging.info("Found %s %s for account %s in region %s in the inventory store", len(Rows), fType, fAccount, fRegion)
+	return([json.loads(row[0]) for row in Rows])
+
+
+def query_inventory(fType=None, fFragment=None, fAccount=None, fRegion=None, fTags=None, fIgnoreCase=False, fMaxAge=None):
+	"""
+	- fType is the resource type ('iam-role', 'sns-topic', 'log-group', 'lambda-function', 'stackset'). None means any.
+	- fFragment only returns resources with this in their name
+	- fAccount only returns resources in this account
+	- fRegion only returns resources in regions with this in their name
+	- fTags is a dict of tags the resources must have - {key: value}, or {key: None} for any value
+	- fIgnoreCase makes fFragment match regardless of case
+	- fMaxAge leaves out anything we found more than this many seconds ago
+
+	Returns a list of dicts, each with Account, Region, Type, Id, Name, Tags, Data (the item as the API returned it, or
+	None if it wasn't kept - see INVENTORY_STORE_TTL) and Timestamp (when we found it). Nothing here talks to AWS - it's only what the finders have already found.
+	"""
+	import json, time
+
+	Conditions = []
+	Parameters = []
+	if fType is not None:
+		Conditions.append("type=?")
+		Parameters.append(fType)
+	if fAccount is not None:
+		Conditions.append("account=?")
+		Parameters.append(str(fAccount))
+	if fRegion is not None:
+		Conditions.append("instr(region, ?) > 0")
+		Parameters.append(fRegion)
+	if fMaxAge is not None:
+		Conditions.append("timestamp >= ?")
+		Parameters.append(time.time() - fMaxAge)
+	for key, value in (fTags or {}).items():
+		if value is None:
+			Conditions.append("id IN (SELECT resource FROM tags WHERE key=?)")
+			Parameters.append(key)
+		else:
+			Conditions.append("id IN (SELECT resource FROM tags WHERE key=? AND value=?)")
+			Parameters.extend([key, value])
+	if fFragment:
+		Trigrams = get_name_trigrams(fFragment)
+		# The trigrams narrow it down to (at most) a handful of candidates through the index; instr makes sure the fragment is really there
+		if Trigrams:
+			Conditions.append("id IN (SELECT resource FROM trigrams WHERE trigram IN ({}) GROUP BY resource HAVING COUNT(*)=?)".format(
+				", ".join("?" * len(Trigrams))))
+			Parameters.extend(sorted(Trigrams) + [len(Trigrams)])
+		if fIgnoreCase:
+			Conditions.append("instr(lower(name), ?) > 0")
+			Parameters.append(fFragment.lower())
+		else:
+			Conditions.append("instr(name, ?) > 0")
+			Parameters.append(fFragment)
+	Query = "SELECT account, region, type, resource_id, name, tags, data, timestamp FROM resources"
+	if Conditions:
+		Query += " WHERE " + " AND ".join(Conditions)
+	flush_inventory_store()
+	with _inventory_store_lock:
+		Rows = get_inventory_store().execute(Query + " ORDER BY account, region, type, id", Parameters).fetchall()
+	return([{'Account': row[0],
+	         'Region': row[1],
+	         'Type': row[2],
+	         'Id': row[3],
+	         'Name': row[4],
+	         'Tags': json.loads(row[5]),
+	         'Data': None if row[6] is None else json.loads(row[6]),
+	         'Timestamp': row[7]} for row in Rows])
+
+
+def match_fragments(fItems, fFragments, fFragmentKey=None):
+	"""
+	Returns the items that contain one of fFragments - the same way paginate matches them ('all' matches everything).
+	"""
+	if fFragments is None or 'all' in fFragments or 'ALL' in fFragments or 'All' in fFragments:
+		return(list(fItems))
+	return([item for item in fItems if any((item if fFragmentKey is None else item[fFragmentKey]).find(fragment) >= 0 for fragment in fFragments)])
 
 
 def find_if_Isengard_registered(ocredentials):
@@ -541,30 +2637,20 @@ def find_if_Isengard_registered(ocredentials):
 		- ['SecretAccessKey'] holds the AWS_SECRET_ACCESS_KEY
 		- ['SessionToken'] holds the AWS_SESSION_TOKEN
 	"""
-	import boto3, logging
+	import logging
 	logging.warning("Key ID #: %s ", str(ocredentials['AccessKeyId']))
-	session_iam=boto3.Session(
-		aws_access_key_id=ocredentials['AccessKeyId'],
-		aws_secret_access_key=ocredentials['SecretAccessKey'],
-		aws_session_token=ocredentials['SessionToken']
-	)
-	iam_info=session_iam.client('iam')
-	roles=iam_info.list_roles()['Roles']
-	for y in range(len(roles)):
-		if roles[y]['RoleName']=='IsengardRole-DO-NOT-DELETE':
+	iam_info=get_client('iam', None, ocredentials)
+	# We stop paging through the roles as soon as we find it
+	for role in paginate(iam_info, 'list_roles', 'Roles'):
+		if role['RoleName']=='IsengardRole-DO-NOT-DELETE':
 			return(True)
 	return(False)
 
 
 def enable_drift_on_stacks(ocredentials, fRegion, fStackName):
-	import boto3, logging
-
-	session_cfn=boto3.Session(
-		aws_access_key_id=ocredentials['AccessKeyId'],
-		aws_secret_access_key=ocredentials['SecretAccessKey'],
-		aws_session_token=ocredentials['SessionToken'],
-		region_name=fRegion)
-	client_cfn=session_cfn.client('cloudformation')
+	import logging
+
+	client_cfn=get_client('cloudformation', fRegion, ocredentials)
 	logging.warning("Enabling drift detection on Stack %s in Account %s in region %s", fStackName, ocredentials['AccountNumber'], fRegion)
 	response=client_cfn.detect_stack_drift(
 		StackName=fStackName
@@ -585,37 +2671,24 @@ def find_sns_topics(ocredentials, fRegion, fTopicFrag=None):
 	Returns:
 		List of Topic ARNs found that match the fragment sent
 """
-	import boto3
 	import logging
 	if fTopicFrag == None:
 		fTopicFrag = ['all']
-	session_sns=boto3.Session(
-		aws_access_key_id=ocredentials['AccessKeyId'],
-		aws_secret_access_key=ocredentials['SecretAccessKey'],
-		aws_session_token=ocredentials['SessionToken'],
-		region_name=fRegion)
-	client_sns=session_sns.client('sns')
-	#TODO: Enable pagination
-	response=client_sns.list_topics()
-	TopicList=[]
-	for item in response['Topics']:
-		TopicList.append(item['TopicArn'])
 	if 'all' in fTopicFrag:
 		logging.warning("Looking for all SNS Topics in account %s from Region %s", ocredentials['AccountNumber'], fRegion)
-		logging.info("Topic Arns Returned: %s", TopicList)
-		logging.warning("We found %s SNS Topics", len(TopicList))
-		return(TopicList)
 	else:
 		logging.warning("Looking for specific SNS Topics in account %s from Region %s", ocredentials['AccountNumber'], fRegion)
-		TopicList2=[]
-		for item in fTopicFrag:
-			for Topic in TopicList:
-				logging.info('Have %s | Looking for %s', Topic, item)
-				if Topic.find(item) >=0:
-					logging.error('Found %s', Topic)
-					TopicList2.append(Topic)
-		logging.warning("We found %s SNS Topics", len(TopicList2))
-		return(TopicList2)
+	Topics=get_inventory_partition(ocredentials['AccountNumber'], fRegion, 'sns-topic')
+	if Topics is None:
+		client_sns=get_client('sns', fRegion, ocredentials)
+		Topics=list(paginate(client_sns, 'list_topics', 'Topics'))
+		store_inventory_partition(ocredentials['AccountNumber'], fRegion, 'sns-topic', Topics, 'TopicArn')
+	TopicList=[]
+	for item in match_fragments(Topics, fTopicFrag, 'TopicArn'):
+		logging.info('Found %s', item['TopicArn'])
+		TopicList.append(item['TopicArn'])
+	logging.warning("We found %s SNS Topics", len(TopicList))
+	return(TopicList)
 
 
 def find_role_names(ocredentials, fRegion, fRoleNameFrag=None):
@@ -629,38 +2702,26 @@ def find_role_names(ocredentials, fRegion, fRoleNameFrag=None):
 	Returns:
 		List of Role Names found that match the fragment list sent
 """
-	import boto3
 	import logging
 
 	if fRoleNameFrag==None:
 		fRoleNameFrag=['all']
-	session_iam=boto3.Session(
-		aws_access_key_id=ocredentials['AccessKeyId'],
-		aws_secret_access_key=ocredentials['SecretAccessKey'],
-		aws_session_token=ocredentials['SessionToken'],
-		region_name=fRegion)
-	client_iam=session_iam.client('iam')
-	#TODO: Enable pagination
-	response=client_iam.list_roles()['Roles']
-	RoleNameList=[]
-	for item in response:
-		RoleNameList.append(item['RoleName'])
 	if 'all' in fRoleNameFrag:
 		logging.warning("Looking for all RoleNames in account %s from Region %s", ocredentials['AccountNumber'], fRegion)
-		logging.info("RoleName Arns Returned: %s", RoleNameList)
-		logging.warning("We found %s RoleNames", len(RoleNameList))
-		return(RoleNameList)
 	else:
 		logging.warning("Looking for specific RoleNames in account %s from Region %s", ocredentials['AccountNumber'], fRegion)
-		RoleNameList2=[]
-		for item in fRoleNameFrag:
-			for RoleName in RoleNameList:
-				logging.info('Have %s | Looking for %s', RoleName, item)
-				if RoleName.find(item) >=0:
-					logging.error('Found %s', RoleName)
-					RoleNameList2.append(RoleName)
-		logging.warning("We found %s Roles", len(RoleNameList2))
-		return(RoleNameList2)
+	# Roles are global, so they're kept in the store once per account - not once for every region we happen to look from
+	Roles=get_inventory_partition(ocredentials['AccountNumber'], 'global', 'iam-role')
+	if Roles is None:
+		client_iam=get_client('iam', fRegion, ocredentials)
+		Roles=list(paginate(client_iam, 'list_roles', 'Roles'))
+		store_inventory_partition(ocredentials['AccountNumber'], 'global', 'iam-role', Roles, 'RoleName', 'Arn')
+	RoleNameList=[]
+	for item in match_fragments(Roles, fRoleNameFrag, 'RoleName'):
+		logging.info('Found %s', item['RoleName'])
+		RoleNameList.append(item['RoleName'])
+	logging.warning("We found %s Roles", len(RoleNameList))
+	return(RoleNameList)
 
 def find_cw_log_group_names(ocredentials, fRegion, fCWLogGroupFrag=None):
 	"""
@@ -673,42 +2734,26 @@ def find_cw_log_group_names(ocredentials, fRegion, fCWLogGroupFrag=None):
 	Returns:
 		List of CloudWatch Log Group Names found that match the fragment list
 """
-	import boto3
 	import logging
 
 	if fCWLogGroupFrag==None:
 		fCWLogGroupFrag=['all']
-	session_cw=boto3.Session(
-		aws_access_key_id=ocredentials['AccessKeyId'],
-		aws_secret_access_key=ocredentials['SecretAccessKey'],
-		aws_session_token=ocredentials['SessionToken'],
-		region_name=fRegion)
-	client_cw=session_cw.client('logs')
-	# TODO: Enable pagination # Defaults to 50
-	CWLogGroupList=[]
-	FirstTime=True
-	response={}
-	while 'nextToken' in response.keys() or FirstTime:
-		FirstTime=False
-		response = client_cw.describe_log_groups()
-		for item in response['logGroups']:
-			CWLogGroupList.append(item['logGroupName'])
 	if 'all' in fCWLogGroupFrag:
 		logging.warning("Looking for all Log Group names in account %s from Region %s", ocredentials['AccountNumber'], fRegion)
-		logging.info("Log Group Names Returned: %s", CWLogGroupList)
-		logging.warning("We found %s Log Group names", len(CWLogGroupList))
-		return(CWLogGroupList)
 	else:
 		logging.warning("Looking for specific Log Group names in account %s from Region %s", ocredentials['AccountNumber'], fRegion)
-		CWLogGroupList2=[]
-		for item in fCWLogGroupFrag:
-			for logGroupName in CWLogGroupList:
-				logging.info('Have %s | Looking for %s', logGroupName, item)
-				if logGroupName.find(item) >=0:
-					logging.error('Found %s', logGroupName)
-					CWLogGroupList2.append(logGroupName)
-		logging.warning("We found %s Log Groups", len(CWLogGroupList2))
-		return(CWLogGroupList2)
+	LogGroups=get_inventory_partition(ocredentials['AccountNumber'], fRegion, 'log-group')
+	if LogGroups is None:
+		client_cw=get_client('logs', fRegion, ocredentials)
+		# 50 is the most the API will give us per call
+		LogGroups=list(paginate(client_cw, 'describe_log_groups', 'logGroups', fPageSize=50))
+		store_inventory_partition(ocredentials['AccountNumber'], fRegion, 'log-group', LogGroups, 'logGroupName', 'arn')
+	CWLogGroupList=[]
+	for item in match_fragments(LogGroups, fCWLogGroupFrag, 'logGroupName'):
+		logging.info('Found %s', item['logGroupName'])
+		CWLogGroupList.append(item['logGroupName'])
+	logging.warning("We found %s Log Groups", len(CWLogGroupList))
+	return(CWLogGroupList)
 
 def find_account_vpcs(ocredentials, fRegion, defaultOnly=False):
 	"""
@@ -718,30 +2763,23 @@ def find_account_vpcs(ocredentials, fRegion, defaultOnly=False):
 		- ['SessionToken'] holds the AWS_SESSION_TOKEN
 		- ['AccountNumber'] holds the account number
 	"""
-	import boto3
 	import logging
 
-	session_vpc=boto3.Session(
-		aws_access_key_id=ocredentials['AccessKeyId'],
-		aws_secret_access_key=ocredentials['SecretAccessKey'],
-		aws_session_token=ocredentials['SessionToken'],
-		region_name=fRegion)
-	client_vpc=session_vpc.client('ec2')
+	client_vpc=get_client('ec2', fRegion, ocredentials)
 	if defaultOnly:
 		logging.warning("Looking for default VPCs in account %s from Region %s", ocredentials['AccountNumber'], fRegion)
 		logging.info("defaultOnly: %s", str(defaultOnly))
-		response=client_vpc.describe_vpcs(
+		response={'Vpcs': list(paginate(client_vpc, 'describe_vpcs', 'Vpcs',
 			Filters=[
 			{
 				'Name': 'isDefault',
 				'Values': ['true']
 			} ]
-		)
+		))}
 	else:
 		logging.warning("Looking for all VPCs in account %s from Region %s", ocredentials['AccountNumber'], fRegion)
 		logging.info("defaultOnly: %s", str(defaultOnly))
-		response=client_vpc.describe_vpcs()
-	#TODO: Enable pagination
+		response={'Vpcs': list(paginate(client_vpc, 'describe_vpcs', 'Vpcs'))}
 	logging.warning("We found %s VPCs", len(response['Vpcs']))
 	return(response)
 
@@ -771,14 +2809,8 @@ def find_config_recorders(ocredentials, fRegion):
 
 	Pagination isn't an issue here since only one config recorder per account / region is allowed.
 	"""
-	import boto3
 	import logging
-	session_cfg=boto3.Session(
-		aws_access_key_id=ocredentials['AccessKeyId'],
-		aws_secret_access_key=ocredentials['SecretAccessKey'],
-		aws_session_token=ocredentials['SessionToken'],
-		region_name=fRegion)
-	client_cfg=session_cfg.client('config')
+	client_cfg=get_client('config', fRegion, ocredentials)
 	logging.warning("Looking for Config Recorders in account %s from Region %s", ocredentials['AccountNumber'], fRegion)
 	response=client_cfg.describe_configuration_recorders()
 	# logging.info(response)
@@ -795,14 +2827,8 @@ def del_config_recorder(ocredentials, fRegion, fConfig_recorder_name):
 	fRegion=region
 	fConfig_recorder_name=Config Recorder Name
 	"""
-	import boto3
 	import logging
-	session_cfg=boto3.Session(
-		aws_access_key_id=ocredentials['AccessKeyId'],
-		aws_secret_access_key=ocredentials['SecretAccessKey'],
-		aws_session_token=ocredentials['SessionToken'],
-		region_name=fRegion)
-	client_cfg=session_cfg.client('config')
+	client_cfg=get_client('config', fRegion, ocredentials)
 	logging.error("Deleting Config Recorder %s from Region %s in account %s", fConfig_recorder_name, fRegion, ocredentials['AccountNumber'])
 	response=client_cfg.delete_configuration_recorder(ConfigurationRecorderName=fConfig_recorder_name)
 	return(response) # There is no response to send back
@@ -833,13 +2859,8 @@ def find_delivery_channels(ocredentials, fRegion):
 
 	Pagination isn't an issue here since delivery channels are limited to only one / account / region
 	"""
-	import boto3, logging
-	session_cfg=boto3.Session(
-		aws_access_key_id=ocredentials['AccessKeyId'],
-		aws_secret_access_key=ocredentials['SecretAccessKey'],
-		aws_session_token=ocredentials['SessionToken'],
-		region_name=fRegion)
-	client_cfg=session_cfg.client('config')
+	import logging
+	client_cfg=get_client('config', fRegion, ocredentials)
 	logging.warning("Looking for Delivery Channels in account %s from Region %s", ocredentials['AccountNumber'], fRegion)
 
 	response=client_cfg.describe_delivery_channels()
@@ -856,13 +2877,8 @@ def del_delivery_channel(ocredentials, fRegion, fDelivery_channel_name):
 	rRegion=region
 	fDelivery_channel_name=delivery channel name
 	"""
-	import boto3, logging
-	session_cfg=boto3.Session(
-		aws_access_key_id=ocredentials['AccessKeyId'],
-		aws_secret_access_key=ocredentials['SecretAccessKey'],
-		aws_session_token=ocredentials['SessionToken'],
-		region_name=fRegion)
-	client_cfg=session_cfg.client('config')
+	import logging
+	client_cfg=get_client('config', fRegion, ocredentials)
 	logging.error("Deleting Delivery Channel %s from Region %s in account %s", fDelivery_channel_name, fRegion, ocredentials['AccountNumber'])
 	response=client_cfg.delete_delivery_channels(DeliveryChannelName=fDelivery_channel_name)
 	return(response)
@@ -902,26 +2918,15 @@ def find_cloudtrails(ocredentials, fRegion, fCloudTrailnames=None):
 		]
 	}
 	"""
-	import boto3, logging
+	import logging
 	from botocore.exceptions import ClientError
 
-	session_ct=boto3.Session(
-		aws_access_key_id=ocredentials['AccessKeyId'],
-		aws_secret_access_key=ocredentials['SecretAccessKey'],
-		aws_session_token=ocredentials['SessionToken'],
-		region_name=fRegion)
-	client_ct=session_ct.client('cloudtrail')
+	client_ct=get_client('cloudtrail', fRegion, ocredentials)
 	logging.info("Looking for CloudTrail trails in account %s from Region %s", ocredentials['AccountNumber'], fRegion)
 	if fCloudTrailnames == None:    # Therefore - they're really looking for a list of trails
+		trailname = "Various"
 		try:
-			response=client_ct.list_trails()
-			trailname = "Various"
-			fullresponse = response['Trails']
-			if 'NextToken' in response.keys():
-				while 'NextToken' in response.keys():
-					response=client_ct.list_trails()
-					for i in range(len(response['Trails'])):
-						fullresponse.append(response['Trails'][i])
+			fullresponse=list(paginate(client_ct, 'list_trails', 'Trails'))
 		except ClientError as my_Error:
 			if str(my_Error).find("InvalidTrailNameException") > 0:
 				logging.error("Bad CloudTrail name provided")
@@ -952,13 +2957,8 @@ def del_cloudtrails(ocredentials, fRegion, fCloudTrail):
 	fRegion=region
 	fCloudTrail=CloudTrail we're deleting
 	"""
-	import boto3, logging
-	session_ct=boto3.Session(
-		aws_access_key_id=ocredentials['AccessKeyId'],
-		aws_secret_access_key=ocredentials['SecretAccessKey'],
-		aws_session_token=ocredentials['SessionToken'],
-		region_name=fRegion)
-	client_ct=session_ct.client('cloudtrail')
+	import logging
+	client_ct=get_client('cloudtrail', fRegion, ocredentials)
 	logging.info("Deleting CloudTrail %s in account %s from Region %s", fCloudTrail, ocredentials['AccountNumber'], fRegion)
 	response=client_ct.delete_trail(Name=fCloudTrail)
 	return(response)
@@ -973,18 +2973,13 @@ def find_gd_invites(ocredentials, fRegion):
 		- ['AccountNumber'] holds the account number
 	fRegion=region
 	"""
-	import boto3, logging
+	import logging
 	from botocore.exceptions import ClientError
 
-	session_gd=boto3.Session(
-		aws_access_key_id=ocredentials['AccessKeyId'],
-		aws_secret_access_key=ocredentials['SecretAccessKey'],
-		aws_session_token=ocredentials['SessionToken'],
-		region_name=fRegion)
-	client_gd=session_gd.client('guardduty')
+	client_gd=get_client('guardduty', fRegion, ocredentials)
 	logging.info("Looking for GuardDuty invitations in account %s from Region %s", ocredentials['AccountNumber'], fRegion)
 	try:
-		response=client_gd.list_invitations()
+		response={'Invitations': list(paginate(client_gd, 'list_invitations', 'Invitations'))}
 	except ClientError as my_Error:
 		if str(my_Error).find("AuthFailure") > 0:
 			print(ocredentials['AccountNumber']+": Authorization Failure for account {}".format(ocredentials['AccountNumber']))
@@ -1005,15 +3000,10 @@ def delete_gd_invites(ocredentials, fRegion, fAccountId):
 		- ['AccountNumber'] holds the account number
 	fRegion=region
 	"""
-	import boto3, logging
+	import logging
 	from botocore.exceptions import ClientError
 
-	session_gd=boto3.Session(
-		aws_access_key_id=ocredentials['AccessKeyId'],
-		aws_secret_access_key=ocredentials['SecretAccessKey'],
-		aws_session_token=ocredentials['SessionToken'],
-		region_name=fRegion)
-	client_gd=session_gd.client('guardduty')
+	client_gd=get_client('guardduty', fRegion, ocredentials)
 	logging.info("Looking for GuardDuty invitations in account %s from Region %s", ocredentials['AccountNumber'], fRegion)
 	try:
 		response=client_gd.delete_invitations(
@@ -1029,7 +3019,49 @@ def delete_gd_invites(ocredentials, fRegion, fAccountId):
 	return(response['Invitations'])
 
 
-def find_account_instances(ocredentials, fRegion='us-east-1'):
+"""
+describe_instances can do the filtering for us (get_instance_filters builds the Filters), and we only need to hang on to
+a few fields of each instance. INSTANCE_SUMMARY_FIELDS are the ones the inventory scripts show. INSTANCE_PAGE_SIZE is
+the most instances we ask for in each call - 1000 is as many as the API will give us.
+"""
+INSTANCE_SUMMARY_FIELDS = ['InstanceId', 'InstanceType', 'State', 'PublicDnsName', 'VpcId', 'Tags']
+INSTANCE_PAGE_SIZE = int(os.getenv('INVENTORY_INSTANCE_PAGE_SIZE', '1000'))
+
+
+def get_instance_filters(fStates=None, fInstanceTypes=None, fTags=None, fVpcIds=None):
+	"""
+	- fStates is a list of instance states ('running', 'stopped', etc.)
+	- fInstanceTypes is a list of instance types. Wildcards work, like 't3.*'
+	- fTags is a dict of tags the instances must have - {key: value}, or {key: None} for any value
+	- fVpcIds is a list of VPC ids
+
+	Returns the Filters to pass to describe_instances (an empty list, if there's nothing to filter on).
+	"""
+	Filters=[]
+	if fStates:
+		Filters.append({'Name': 'instance-state-name', 'Values': list(fStates)})
+	if fInstanceTypes:
+		Filters.append({'Name': 'instance-type', 'Values': list(fInstanceTypes)})
+	for key, value in (fTags or {}).items():
+		if value is None:
+			Filters.append({'Name': 'tag-key', 'Values': [key]})
+		else:
+			Filters.append({'Name': "tag:{}".format(key), 'Values': [value]})
+	if fVpcIds:
+		Filters.append({'Name': 'vpc-id', 'Values': list(fVpcIds)})
+	return(Filters)
+
+
+def project_reservation(fReservation, fFields=None):
+	"""
+	Returns the reservation with only the fFields of each of its instances (and nothing else) - or as it is, if fFields is None.
+	"""
+	if fFields is None:
+		return(fReservation)
+	return({'Instances': [{field: instance[field] for field in fFields if field in instance} for instance in fReservation['Instances']]})
+
+
+def find_account_instances(ocredentials, fRegion='us-east-1', fFilters=None, fFields=None, fPageSize=INSTANCE_PAGE_SIZE):
 	"""
 	ocredentials is an object with the following structure:
 		- ['AccessKeyId'] holds the AWS_ACCESS_KEY
@@ -1037,33 +3069,27 @@ def find_account_instances(ocredentials, fRegion='us-east-1'):
 		- ['SessionToken'] holds the AWS_SESSION_TOKEN
 		- ['AccountNumber'] holds the account number
 		- ['Profile'] can hold the profile, instead of the session credentials
+	fFilters are the describe_instances Filters (see get_instance_filters) - so only the instances we want come back
+	fFields are the fields to keep from each instance (like INSTANCE_SUMMARY_FIELDS). None keeps all of them.
+	fPageSize is how many instances to ask for in each call
+
+	Returns {'Reservations': [{'Instances': [...]}, ...]}. Each page is trimmed down to fFields as it arrives, so
+	we never hold on to more than one page of full instance descriptions.
 	"""
-	import boto3, logging
+	import logging
 
 	if 'Profile' in ocredentials.keys() and ocredentials['Profile'] is not None:
 		ProfileAccountNumber = find_account_number(ocredentials['Profile'])
 		logging.info("Profile: %s | Profile Account Number: %s | Account Number passed in: %s" % (ocredentials['Profile'], ProfileAccountNumber, ocredentials['AccountNumber']))
 		if ProfileAccountNumber == ocredentials['AccountNumber']:
-			session_ec2 = boto3.Session(profile_name=ocredentials['Profile'], region_name=fRegion)
+			instance_info=get_client('ec2', fRegion, fProfile=ocredentials['Profile'])
 		else:
-			session_ec2 = boto3.Session(
-				aws_access_key_id=ocredentials['AccessKeyId'],
-				aws_secret_access_key=ocredentials['SecretAccessKey'],
-				aws_session_token=ocredentials['SessionToken'],
-				region_name=fRegion)
+			instance_info=get_client('ec2', fRegion, ocredentials)
 	else:
-		session_ec2=boto3.Session(
-			aws_access_key_id=ocredentials['AccessKeyId'],
-			aws_secret_access_key=ocredentials['SecretAccessKey'],
-			aws_session_token=ocredentials['SessionToken'],
-			region_name=fRegion)
-	instance_info=session_ec2.client('ec2')
+		instance_info=get_client('ec2', fRegion, ocredentials)
 	logging.warning("Looking for instances in account # %s in region %s", ocredentials['AccountNumber'], fRegion)
-	instances=instance_info.describe_instances()
-	AllInstances = instances
-	while 'NextToken' in instances.keys():
-		instances=instance_info.describe_instances(NextToken=instances['NextToken'])
-		AllInstances['Reservations'].extend(instances['Reservations'])
+	AllInstances={'Reservations': [project_reservation(reservation, fFields) for reservation in
+	                               paginate(instance_info, 'describe_instances', 'Reservations', fPageSize=fPageSize, Filters=fFilters or [])]}
 	return(AllInstances)
 
 
@@ -1074,34 +3100,24 @@ def find_users(ocredentials):
 		- ['SecretAccessKey'] holds the AWS_SECRET_ACCESS_KEY
 		- ['SessionToken'] holds the AWS_SESSION_TOKEN
 	"""
-	import boto3
 	import logging
 
 	logging.warning("Key ID #: %s ", str(ocredentials['AccessKeyId']))
-	session_iam=boto3.Session(
-		aws_access_key_id=ocredentials['AccessKeyId'],
-		aws_secret_access_key=ocredentials['SecretAccessKey'],
-		aws_session_token=ocredentials['SessionToken']
-	)
-	user_info=session_iam.client('iam')
-	users=user_info.list_users()['Users']
-	# TODO: Consider pagination here
+	user_info=get_client('iam', None, ocredentials)
+	users=list(paginate(user_info, 'list_users', 'Users'))
 	return(users)
 
 
 def find_profile_vpcs(fProfile, fRegion, fDefaultOnly):
 
-	import boto3
-
-	session_ec2=boto3.Session(profile_name=fProfile, region_name=fRegion)
-	vpc_info=session_ec2.client('ec2')
+	vpc_info=get_client('ec2', fRegion, fProfile=fProfile)
 	if fDefaultOnly:
-		vpcs=vpc_info.describe_vpcs(Filters=[{
+		vpcs={'Vpcs': list(paginate(vpc_info, 'describe_vpcs', 'Vpcs', Filters=[{
 			'Name': 'isDefault',
 			'Values': ['true']
-		}])
+		}]))}
 	else:
-		vpcs=vpc_info.describe_vpcs()
+		vpcs={'Vpcs': list(paginate(vpc_info, 'describe_vpcs', 'Vpcs'))}
 	# if len(vpcs['Vpcs']) == 1 and vpcs['Vpcs'][0]['IsDefault'] == True and not ('Tags' in vpcs['Vpcs'][0]):
 	# 	return()
 	# else:
@@ -1129,10 +3145,8 @@ def find_profile_vpcs(fProfile, fRegion, fDefaultOnly):
 
 def find_profile_functions(fProfile, fRegion):
 
-	import boto3
-	session_lambda=boto3.Session(profile_name=fProfile, region_name=fRegion)
-	lambda_info=session_lambda.client('lambda')
-	functions=lambda_info.list_functions()
+	lambda_info=get_client('lambda', fRegion, fProfile=fProfile)
+	functions={'Functions': list(paginate(lambda_info, 'list_functions', 'Functions'))}
 	return(functions)
 
 
@@ -1147,64 +3161,49 @@ def find_lambda_functions(ocredentials, fRegion, fSearchStrings):
 	fSearchString is a list of strings
 	"""
 
-	import boto3
-	session_lambda=boto3.Session(region_name=fRegion,
-		aws_access_key_id=ocredentials['AccessKeyId'],
-		aws_secret_access_key=ocredentials['SecretAccessKey'],
-		aws_session_token=ocredentials['SessionToken']
-	)
-	client_lambda=session_lambda.client('lambda')
-	functions=client_lambda.list_functions()['Functions']
+	Functions=get_inventory_partition(ocredentials['AccountNumber'], fRegion, 'lambda-function')
+	if Functions is None:
+		client_lambda=get_client('lambda', fRegion, ocredentials)
+		Functions=list(paginate(client_lambda, 'list_functions', 'Functions'))
+		store_inventory_partition(ocredentials['AccountNumber'], fRegion, 'lambda-function', Functions, 'FunctionName', 'FunctionArn')
 	functions2=[]
-	for i in range(len(functions)):
+	for function in Functions:
 		for searchitem in fSearchStrings:
-			if searchitem in functions[i]['FunctionName']:
+			if searchitem in function['FunctionName']:
 				functions2.append({
-					'FunctionName' : functions[i]['FunctionName'],
-					'FunctionArn' : functions[i]['FunctionArn'],
-					'Role' : functions[i]['Role']
+					'FunctionName' : function['FunctionName'],
+					'FunctionArn' : function['FunctionArn'],
+					'Role' : function['Role']
 				})
 	return(functions2)
 
 
 def get_lambda_code_url(fprofile, fregion, fFunctionName):
 
-	import boto3
-	session_lambda=boto3.Session(profile_name=fprofile, region_name=fregion)
-	client_lambda=session_lambda.client('lambda')
+	client_lambda=get_client('lambda', fregion, fProfile=fprofile)
 	code_url=client_lambda.get_function(FunctionName=fFunctionName)['Code']['Location']
 	return(code_url)
 
 def find_private_hosted_zones(fProfile, fRegion):
 
-	import boto3
-	session_r53=boto3.Session(profile_name=fProfile, region_name=fRegion)
-	phz_info=session_r53.client('route53')
-	hosted_zones=phz_info.list_hosted_zones()
+	phz_info=get_client('route53', fRegion, fProfile=fProfile)
+	hosted_zones={'HostedZones': list(paginate(phz_info, 'list_hosted_zones', 'HostedZones'))}
 	return(hosted_zones)
 
 def find_private_hosted_zones2(ocredentials, fRegion):
 
-	import boto3
-	session_r53=boto3.Session(region_name=fRegion,
-		aws_access_key_id=ocredentials['AccessKeyId'],
-		aws_secret_access_key=ocredentials['SecretAccessKey'],
-		aws_session_token=ocredentials['SessionToken']
-	)
-	phz_info=session_r53.client('route53')
-	hosted_zones=phz_info.list_hosted_zones()
+	phz_info=get_client('route53', fRegion, ocredentials)
+	hosted_zones={'HostedZones': list(paginate(phz_info, 'list_hosted_zones', 'HostedZones'))}
 	return(hosted_zones)
 
 
 def find_load_balancers(fProfile, fRegion, fStackFragment, fStatus):
 
-	import boto3
 	import logging
 
 	logging.warning("Profile: %s | Region: %s | Fragment: %s | Status: %s", fProfile, fRegion, fStackFragment, fStatus)
-	session_cfn=boto3.Session(profile_name=fProfile, region_name=fRegion)
-	lb_info=session_cfn.client('elbv2')
-	load_balancers=lb_info.describe_load_balancers()
+	lb_info=get_client('elbv2', fRegion, fProfile=fProfile)
+	load_balancers={'LoadBalancers': list(paginate(lb_info, 'describe_load_balancers', 'LoadBalancers'))}
 	load_balancers_Copy=[]
 	if (fStackFragment=='all' or fStackFragment=='ALL') and (fStatus=='active' or fStatus=='ACTIVE' or fStatus=='all' or fStatus=='ALL'):
 		logging.warning("Found all the lbs in Profile: %s in Region: %s with Fragment: %s and Status: %s", fProfile, fRegion, fStackFragment, fStatus)
@@ -1212,12 +3211,12 @@ def find_load_balancers(fProfile, fRegion, fStackFragment, fStatus):
 	elif (fStackFragment=='all' or fStackFragment=='ALL'):
 		for load_balancer in load_balancers['LoadBalancers']:
 			if fStatus in load_balancer['State']['Code']:
-				logging.warning("Found lb %s in Profile: %s in Region: %s with Fragment: %s and Status: %s", load_balancers['LoadBalancerName'], fProfile, fRegion, fStackFragment, fStatus)
+				logging.warning("Found lb %s in Profile: %s in Region: %s with Fragment: %s and Status: %s", load_balancer['LoadBalancerName'], fProfile, fRegion, fStackFragment, fStatus)
 				load_balancers_Copy.append(load_balancer)
 	elif (fStatus=='active' or fStatus=='ACTIVE'):
 		for load_balancer in load_balancers['LoadBalancers']:
 			if fStackFragment in load_balancer['LoadBalancerName']:
-				logging.warning("Found lb %s in Profile: %s in Region: %s with Fragment: %s and Status: %s", load_balancers['LoadBalancerName'], fProfile, fRegion, fStackFragment, fStatus)
+				logging.warning("Found lb %s in Profile: %s in Region: %s with Fragment: %s and Status: %s", load_balancer['LoadBalancerName'], fProfile, fRegion, fStackFragment, fStatus)
 				load_balancers_Copy.append(load_balancer)
 	return(load_balancers_Copy)
 
@@ -1253,35 +3252,23 @@ def find_stacks(fProfile, fRegion, fStackFragment="all", fStatus="active"):
 		}
 
 	"""
-	import boto3
 	import logging
 	logging.warning("Profile: %s | Region: %s | Fragment: %s | Status: %s", fProfile, fRegion, fStackFragment, fStatus)
-	session_cfn=boto3.Session(profile_name=fProfile, region_name=fRegion)
-	client_cfn=session_cfn.client('cloudformation')
-	AllStacks=[]
-	response=client_cfn.describe_stacks()
-	AllStacks = response['Stacks']
-	logging.info("Found %s stacks this time around", len(response['Stacks']))
-	while 'NextToken' in response.keys():
-		response = client_cfn.describe_stacks()
-		AllStacks.append(response['Stacks'])
-		logging.info("Found %s stacks this time around", len(response['Stacks']))
-	logging.info("Done with loops and found a total of %s stacks", len(AllStacks))
+	client_cfn=get_client('cloudformation', fRegion, fProfile=fProfile)
 	stacksCopy=[]
 	if fStatus.lower()=='active' and not fStackFragment.lower()=='all':
-		# Send back stacks that are active, check the fragment further down.
+		# Send back stacks that are active, checking the fragment as each page comes in.
 		# stacks=client_cfn.list_stacks(StackStatusFilter=["CREATE_COMPLETE", "DELETE_FAILED", "UPDATE_COMPLETE", "UPDATE_ROLLBACK_COMPLETE", "DELETE_IN_PROGRESS"])
-		logging.warning("1 - Found %s stacks. Looking for fragment %s", len(AllStacks), fStackFragment)
-		for stack in AllStacks:
-			if fStackFragment in stack['StackName']:
-				# Check the fragment now - only send back those that match
-				logging.warning("Found stack %s in Profile: %s in Region: %s with Fragment: %s and Status: %s", stack['StackName'], fProfile, fRegion, fStackFragment, fStatus)
-				stacksCopy.append(stack)
+		logging.warning("1 - Looking for fragment %s", fStackFragment)
+		for stack in paginate(client_cfn, 'describe_stacks', 'Stacks', [fStackFragment], 'StackName'):
+			# Only those that match the fragment get here
+			logging.warning("Found stack %s in Profile: %s in Region: %s with Fragment: %s and Status: %s", stack['StackName'], fProfile, fRegion, fStackFragment, fStatus)
+			stacksCopy.append(stack)
 	elif fStackFragment.lower()=='all' and fStatus.lower()=='active':
 		# Send back all stacks regardless of fragment, check the status further down.
-		stacks=client_cfn.list_stacks(StackStatusFilter=["CREATE_COMPLETE", "DELETE_FAILED", "UPDATE_COMPLETE", "UPDATE_ROLLBACK_COMPLETE"])
-		logging.warning("2 - Found ALL %s stacks in 'active' status.", len(stacks['StackSummaries']))
-		for stack in stacks['StackSummaries']:
+		stacks=list(paginate(client_cfn, 'list_stacks', 'StackSummaries', StackStatusFilter=["CREATE_COMPLETE", "DELETE_FAILED", "UPDATE_COMPLETE", "UPDATE_ROLLBACK_COMPLETE"]))
+		logging.warning("2 - Found ALL %s stacks in 'active' status.", len(stacks))
+		for stack in stacks:
 			# if fStatus in stack['StackStatus']:
 			# Check the status now - only send back those that match a single status
 			# I don't see this happening unless someone wants Stacks in a "Deleted" or "Rollback" type status
@@ -1289,22 +3276,19 @@ def find_stacks(fProfile, fRegion, fStackFragment="all", fStatus="active"):
 			stacksCopy.append(stack)
 	elif fStackFragment.lower()=='all' and fStatus.lower()=='all':
 		# Send back all stacks.
-		stacks=client_cfn.list_stacks()
-		logging.warning("3 - Found ALL %s stacks in ALL statuses", len(stacks['StackSummaries']))
-		return(stacks['StackSummaries'])
+		stacks=list(paginate(client_cfn, 'list_stacks', 'StackSummaries'))
+		logging.warning("3 - Found ALL %s stacks in ALL statuses", len(stacks))
+		return(stacks)
 	elif not fStatus.lower()=='active':
-		# Send back stacks that match the single status, check the fragment further down.
+		# Send back stacks that match the single status, checking the fragment as each page comes in.
 		try:
-			stacks=client_cfn.list_stacks()
-			logging.warning("4 - Found %s stacks ", len(stacks['StackSummaries']))
-		except Exception as e:
-			print(e)
-		for stack in stacks['StackSummaries']:
-			# pprint.pprint(stack)
-			if fStackFragment in stack['StackName']:
-				# Check the fragment now - only send back those that match
+			for stack in paginate(client_cfn, 'list_stacks', 'StackSummaries', [fStackFragment], 'StackName'):
+				# Only those that match the fragment get here
 				logging.warning("Found stack %s in Profile: %s in Region: %s with Fragment: %s and Status: %s", stack['StackName'], fProfile, fRegion, fStackFragment, stack['StackStatus'])
 				stacksCopy.append(stack)
+		except Exception as e:
+			print(e)
+		logging.warning("4 - Found %s stacks ", len(stacksCopy))
 	return(stacksCopy)
 
 
@@ -1316,15 +3300,13 @@ def delete_stack(fprofile, fRegion, fStackName, **kwargs):
 	RetainResources should be a boolean
 	ResourcesToRetain should be a list
 	"""
-	import boto3
 	import logging
 	if "RetainResources" in kwargs:
 		RetainResources=True
 		ResourcesToRetain=kwargs['ResourcesToRetain']
 	else:
 		RetainResources=False
-	session_cfn=boto3.Session(profile_name=fprofile, region_name=fRegion)
-	client_cfn=session_cfn.client('cloudformation')
+	client_cfn=get_client('cloudformation', fRegion, fProfile=fprofile)
 	if RetainResources:
 		logging.warning("Profile: %s | Region: %s | StackName: %s", fprofile, fRegion, fStackName)
 		logging.warning("	Retaining Resources: %s", ResourcesToRetain)
@@ -1347,19 +3329,13 @@ def delete_stack2(ocredentials, fRegion, fStackName, **kwargs):
 	RetainResources should be a boolean
 	ResourcesToRetain should be a list
 	"""
-	import boto3
 	import logging
 	if "RetainResources" in kwargs:
 		RetainResources=True
 		ResourcesToRetain=kwargs['ResourcesToRetain']
 	else:
 		RetainResources=False
-	session_cfn=boto3.Session(region_name=fRegion,
-		aws_access_key_id=ocredentials['AccessKeyId'],
-		aws_secret_access_key=ocredentials['SecretAccessKey'],
-		aws_session_token=ocredentials['SessionToken']
-	)
-	client_cfn=session_cfn.client('cloudformation')
+	client_cfn=get_client('cloudformation', fRegion, ocredentials)
 	if RetainResources:
 		logging.warning("Account: %s | Region: %s | StackName: %s", ocredentials['AccountNumber'], fRegion, fStackName)
 		logging.warning("	Retaining Resources: %s", ResourcesToRetain)
@@ -1382,33 +3358,24 @@ def find_stacks_in_acct(ocredentials, fRegion, fStackFragment="all", fStatus="ac
 	fStackFragment is a string - default to "all"
 	fStatus is a string - default to "active"
 	"""
-	import boto3
 	import logging
 	logging.error("Acct ID #: %s | Region: %s | Fragment: %s | Status: %s", str(ocredentials['AccountNumber']), fRegion, fStackFragment, fStatus)
-	session_cfn=boto3.Session(region_name=fRegion,
-		aws_access_key_id=ocredentials['AccessKeyId'],
-		aws_secret_access_key=ocredentials['SecretAccessKey'],
-		aws_session_token=ocredentials['SessionToken']
-	)
-	client_cfn=session_cfn.client('cloudformation')
+	client_cfn=get_client('cloudformation', fRegion, ocredentials)
 	stacksCopy=[]
 	if fStatus.lower()=='active' and not fStackFragment.lower()=='all':
-		# Send back stacks that are active, check the fragment further down.
-		stacks=client_cfn.list_stacks(StackStatusFilter=["CREATE_COMPLETE", "UPDATE_COMPLETE", "UPDATE_ROLLBACK_COMPLETE"])
-		for stack in stacks['StackSummaries']:
-			if fStackFragment in stack['StackName']:
-				# Check the fragment now - only send back those that match
-				logging.error("1-Found stack %s in Account: %s in Region: %s with Fragment: %s and Status: %s", stack['StackName'], ocredentials['AccountNumber'], fRegion, fStackFragment, fStatus)
-				stacksCopy.append(stack)
+		# Send back stacks that are active, checking the fragment as each page comes in.
+		for stack in paginate(client_cfn, 'list_stacks', 'StackSummaries', [fStackFragment], 'StackName', StackStatusFilter=["CREATE_COMPLETE", "UPDATE_COMPLETE", "UPDATE_ROLLBACK_COMPLETE"]):
+			# Only those that match the fragment get here
+			logging.error("1-Found stack %s in Account: %s in Region: %s with Fragment: %s and Status: %s", stack['StackName'], ocredentials['AccountNumber'], fRegion, fStackFragment, fStatus)
+			stacksCopy.append(stack)
 	elif fStackFragment.lower()=='all' and fStatus.lower()=='all':
 		# Send back all stacks.
-		stacks=client_cfn.list_stacks()
-		logging.error("4-Found %s the stacks in Account: %s in Region: %s", len(stacks), ocredentials['AccessKeyId'], fRegion)
-		return(stacks['StackSummaries'])
+		stacks=list(paginate(client_cfn, 'list_stacks', 'StackSummaries'))
+		logging.error("4-Found %s the stacks in Account: %s in Region: %s", len(stacks), ocredentials['AccountNumber'], fRegion)
+		return(stacks)
 	elif fStackFragment.lower()=='all' and fStatus.lower()=='active':
 		# Send back all stacks regardless of fragment, check the status further down.
-		stacks=client_cfn.list_stacks(StackStatusFilter=["CREATE_COMPLETE", "UPDATE_COMPLETE", "UPDATE_ROLLBACK_COMPLETE"])
-		for stack in stacks['StackSummaries']:
+		for stack in paginate(client_cfn, 'list_stacks', 'StackSummaries', StackStatusFilter=["CREATE_COMPLETE", "UPDATE_COMPLETE", "UPDATE_ROLLBACK_COMPLETE"]):
 			logging.error("2-Found stack %s in Account: %s in Region: %s with Fragment: %s and Status: %s", stack['StackName'], ocredentials['AccountNumber'], fRegion, fStackFragment, fStatus)
 			stacksCopy.append(stack)
 			# logging.warning("StackStatus: %s | My status: %s", stack['StackStatus'], fStatus)
@@ -1416,14 +3383,13 @@ def find_stacks_in_acct(ocredentials, fRegion, fStackFragment="all", fStatus="ac
 		# Send back stacks that match the single status, check the fragment further down.
 		try:
 			logging.warning("Not looking for active stacks... Looking for Status: %s", fStatus)
-			stacks=client_cfn.list_stacks(StackStatusFilter=[fStatus])
+			for stack in paginate(client_cfn, 'list_stacks', 'StackSummaries', [fStackFragment], 'StackName', StackStatusFilter=[fStatus]):
+				if fStatus in stack['StackStatus']:
+					# Only those that match the fragment get here
+					logging.error("5-Found stack %s in Account: %s in Region: %s with Fragment: %s and Status: %s", stack['StackName'], ocredentials['AccountNumber'], fRegion, fStackFragment, fStatus)
+					stacksCopy.append(stack)
 		except Exception as e:
 			print(e)
-		for stack in stacks['StackSummaries']:
-			if fStackFragment in stack['StackName'] and fStatus in stack['StackStatus']:
-				# Check the fragment now - only send back those that match
-				logging.error("5-Found stack %s in Account: %s in Region: %s with Fragment: %s and Status: %s", stack['StackName'], ocredentials['AccountNumber'], fRegion, fStackFragment, fStatus)
-				stacksCopy.append(stack)
 	return(stacksCopy)
 
 
@@ -1437,15 +3403,9 @@ def find_saml_components_in_acct(ocredentials, fRegion):
 
 	fRegion is a string
 	"""
-	import boto3
 	import logging
 	logging.error("Acct ID #: %s | Region: %s ", str(ocredentials['AccountNumber']), fRegion)
-	session_aws=boto3.Session(region_name=fRegion,
-		aws_access_key_id=ocredentials['AccessKeyId'],
-		aws_secret_access_key=ocredentials['SecretAccessKey'],
-		aws_session_token=ocredentials['SessionToken']
-	)
-	iam_info=session_aws.client('iam')
+	iam_info=get_client('iam', fRegion, ocredentials)
 	saml_providers=iam_info.list_saml_providers()['SAMLProviderList']
 	return(saml_providers)
 
@@ -1470,13 +3430,18 @@ def find_stacksets(fProfile, fRegion, fStackFragment):
 	},
 	]
 	"""
-	import boto3
 	import logging
 
 	logging.info("Profile: %s | Region: %s | Fragment: %s", fProfile, fRegion, fStackFragment)
-	session_cfn=boto3.Session(profile_name=fProfile, region_name=fRegion)
-	client_cfn=session_cfn.client('cloudformation')
-	stacksets=client_cfn.list_stack_sets(Status='ACTIVE')
+	AccountNumber=find_account_number(fProfile)
+	if AccountNumber == '123456789012':
+		# That's what find_account_number gives back when it couldn't find out - and these aren't that account's
+		AccountNumber=None
+	stacksets={'Summaries': get_inventory_partition(AccountNumber, fRegion, 'stackset')}
+	if stacksets['Summaries'] is None:
+		client_cfn=get_client('cloudformation', fRegion, fProfile=fProfile)
+		stacksets={'Summaries': list(paginate(client_cfn, 'list_stack_sets', 'Summaries', Status='ACTIVE'))}
+		store_inventory_partition(AccountNumber, fRegion, 'stackset', stacksets['Summaries'], 'StackSetName', 'StackSetId')
 	stacksetsCopy=[]
 	# if fStackFragment=='all' or fStackFragment=='ALL':
 	if 'all' in fStackFragment or 'ALL' in fStackFragment or 'All' in fStackFragment:
@@ -1502,18 +3467,14 @@ def find_stacksets2(facct_creds, fRegion, faccount, fStackFragment=""):
 	fRegion is a string
 	fStackFragment is a string
 	"""
-	import boto3
 	import logging
 
 	logging.info("Account: %s | Region: %s | Fragment: %s", faccount, fRegion, fStackFragment)
-	session_aws=boto3.Session(
-		aws_access_key_id=facct_creds['AccessKeyId'],
-		aws_secret_access_key=facct_creds['SecretAccessKey'],
-		aws_session_token=facct_creds['SessionToken'],
-		region_name=fRegion)
-	client_cfn=session_aws.client('cloudformation')
-
-	stacksets=client_cfn.list_stack_sets(Status='ACTIVE')
+	stacksets={'Summaries': get_inventory_partition(faccount, fRegion, 'stackset')}
+	if stacksets['Summaries'] is None:
+		client_cfn=get_client('cloudformation', fRegion, facct_creds)
+		stacksets={'Summaries': list(paginate(client_cfn, 'list_stack_sets', 'Summaries', Status='ACTIVE'))}
+		store_inventory_partition(faccount, fRegion, 'stackset', stacksets['Summaries'], 'StackSetName', 'StackSetId')
 	stacksetsCopy=[]
 	# if fStackFragment=='all' or fStackFragment=='ALL':
 	if 'all' in fStackFragment or 'ALL' in fStackFragment or 'All' in fStackFragment:
@@ -1538,10 +3499,8 @@ def delete_stackset(fProfile, fRegion, fStackSetName):
 	fRegion is a string
 	fStackSetName is a string
 	"""
-	import boto3
 	import logging
-	session_cfn=boto3.Session(profile_name=fProfile, region_name=fRegion)
-	client_cfn=session_cfn.client('cloudformation')
+	client_cfn=get_client('cloudformation', fRegion, fProfile=fProfile)
 	logging.warning("Profile: %s | Region: %s | StackSetName: %s", fProfile, fRegion, fStackSetName)
 	response=client_cfn.delete_stack_set(StackSetName=fStackSetName)
 	return(response)
@@ -1553,22 +3512,49 @@ def find_stack_instances(fProfile, fRegion, fStackSetName, fStatus='CURRENT'):
 	fRegion is a string
 	fStackSetName is a string
 	"""
-	import boto3
 	import logging
 
 	logging.warning("Profile: %s | Region: %s | StackSetName: %s", fProfile, fRegion, fStackSetName)
-	session_cfn=boto3.Session(profile_name=fProfile, region_name=fRegion)
-	client_cfn=session_cfn.client('cloudformation')
-	stack_instances=client_cfn.list_stack_instances(StackSetName=fStackSetName)
-	stack_instances_list=stack_instances['Summaries']
-	while 'NextToken' in stack_instances.keys(): # Get all instance names
-		stack_instances=client_cfn.list_stack_instances(StackSetName=fStackSetName, NextToken=stack_instances['NextToken'])
-		for i in range(len(stack_instances)):
-			stack_instances_list.append(stack_instances['Summaries'][i])
+	client_cfn=get_client('cloudformation', fRegion, fProfile=fProfile)
+	stack_instances_list=list(paginate(client_cfn, 'list_stack_instances', 'Summaries', StackSetName=fStackSetName))
 	return(stack_instances_list)
 
 
-def delete_stack_instances(fProfile, fRegion, lAccounts, lRegions, fStackSetName, fRetainStacks=False, fOperationName="StackDelete"):
+"""
+How each stackset operation we start is spread out - every region at once, and every account within a region at once.
+CloudFormation normally runs only as many accounts at a time as the failure tolerance allows (plus one), so the
+SOFT_FAILURE_TOLERANCE concurrency mode is used to keep the concurrency without tolerating any failures - the first one
+stops the operation, and it ends up FAILED rather than SUCCEEDED. (Botocore that's too old for ConcurrencyMode gets
+CloudFormation's default instead - one account at a time - see get_stackset_operation_preferences.)
+"""
+STACKSET_OPERATION_PREFERENCES = {
+	'RegionConcurrencyType': 'PARALLEL',
+	'ConcurrencyMode': 'SOFT_FAILURE_TOLERANCE',
+	'MaxConcurrentPercentage': 100,
+	'FailureTolerancePercentage': 0,
+}
+STACKSET_OPERATION_DONE = ['SUCCEEDED', 'FAILED', 'STOPPED']
+
+
+def get_stackset_operation_preferences(fClient, fOperationPreferences=None):
+	"""
+	- fClient is a cloudformation client
+	- fOperationPreferences are the OperationPreferences we'd like. Defaults to STACKSET_OPERATION_PREFERENCES.
+
+	Returns fOperationPreferences without anything this version of botocore doesn't know about (older ones don't have
+	RegionConcurrencyType, and would refuse the whole call), so those operations just get CloudFormation's default.
+	"""
+	import logging
+
+	OperationPreferences = STACKSET_OPERATION_PREFERENCES if fOperationPreferences is None else fOperationPreferences
+	Known = fClient.meta.service_model.shape_for('StackSetOperationPreferences').members
+	for key in OperationPreferences:
+		if key not in Known:
+			logging.info("This version of botocore doesn't support the %s stackset operation preference, so it's left out", key)
+	return({key: value for key, value in OperationPreferences.items() if key in Known})
+
+
+def delete_stack_instances(fProfile, fRegion, lAccounts, lRegions, fStackSetName, fRetainStacks=False, fOperationName="StackDelete", fOperationPreferences=None):
 	"""
 	fProfile is the Root Profile that owns the stackset
 	fRegion is the region where the stackset resides
@@ -1576,20 +3562,119 @@ def delete_stack_instances(fProfile, fRegion, lAccounts, lRegions, fStackSetName
 	lRegion is a list of regions
 	fStackSetName is a string
 	fOperationName is a string (to identify the operation)
+	fOperationPreferences are the OperationPreferences for the operation. Defaults to STACKSET_OPERATION_PREFERENCES (see get_stackset_operation_preferences).
+
+	Returns the OperationId - wait_for_stackset_operation can wait for it to finish.
 	"""
-	import boto3
 	import logging
 
 	logging.warning("Deleting %s stackset over %s accounts across %s regions" % (fStackSetName, len(lAccounts), len(lRegions)))
-	session_cfn=boto3.Session(profile_name=fProfile, region_name=fRegion)
-	client_cfn=session_cfn.client('cloudformation')
+	client_cfn=get_client('cloudformation', fRegion, fProfile=fProfile)
 	response=client_cfn.delete_stack_instances(
 		StackSetName=fStackSetName,
 		Accounts=lAccounts,
 		Regions=lRegions,
 		RetainStacks=fRetainStacks,
-		OperationId=fOperationName
+		OperationId=fOperationName,
+		OperationPreferences=get_stackset_operation_preferences(client_cfn, fOperationPreferences)
 	)
+	return(response['OperationId'])
+
+
+def wait_for_stackset_operation(fProfile, fRegion, fStackSetName, fOperationId, fTimeout=None, fMinDelay=2, fMaxDelay=30, ocredentials=None):
+	"""
+	- fProfile is the Root Profile that owns the stackset (or ocredentials, if fProfile is None)
+	- fRegion is the region where the stackset resides
+	- fStackSetName and fOperationId say which operation to wait for
+	- fTimeout, fMinDelay and fMaxDelay are as described in wait_for_stackset_operations
+
+	Returns the StackSetOperation (from describe_stack_set_operation) once its Status is one of STACKSET_OPERATION_DONE.
+	Raises TimeoutError if it isn't done within fTimeout, or the ClientError if we couldn't check on it.
+	"""
+	Errors={}
+	Operations=wait_for_stackset_operations(fProfile, fRegion, [(fStackSetName, fOperationId)], fTimeout, fMinDelay, fMaxDelay, ocredentials, fErrors=Errors)
+	if (fStackSetName, fOperationId) in Errors:
+		raise Errors[(fStackSetName, fOperationId)]
+	if (fStackSetName, fOperationId) not in Operations:
+		raise TimeoutError("StackSet {} operation {} was still running after {} seconds".format(fStackSetName, fOperationId, fTimeout))
+	return(Operations[(fStackSetName, fOperationId)])
+
+
+def wait_for_stackset_operations(fProfile, fRegion, fOperations, fTimeout=None, fMinDelay=2, fMaxDelay=30, ocredentials=None, fCallback=None, fErrors=None):
+	"""
+	- fProfile is the Root Profile that owns the stacksets (or ocredentials, if fProfile is None)
+	- fRegion is the region where the stacksets reside
+	- fOperations is a list of (StackSetName, OperationId) - the operations to wait for
+	- fTimeout is how long (in seconds) to wait, at most. None waits for as long as it takes.
+	- fMinDelay / fMaxDelay bound how long we wait between checks of each operation - starting at fMinDelay, and doubling
+	  each time its status hasn't changed (up to fMaxDelay), since a quick operation finishes in seconds but a big one can
+	  take an hour. When an operation moves on (from QUEUED to RUNNING, say) it's checked more often again.
+	- fCallback, if provided, is called with (StackSetName, OperationId, StackSetOperation) as each operation finishes
+	- fErrors, if provided, is a dict that gets {(StackSetName, OperationId): ClientError} for each operation we gave up on.
+	  Being throttled (or not reaching CloudFormation at all) only means that operation is checked less often - any other
+	  error means we stop waiting on that one, but carry on with the rest.
+
+	All the operations are checked from one loop, on this thread - each one when it's due - so waiting on a hundred
+	operations costs no more threads than waiting on one, and the slow ones don't hold up the checks on the quick ones.
+
+	Returns {(StackSetName, OperationId): StackSetOperation} once every Status is one of STACKSET_OPERATION_DONE.
+	Operations still running when fTimeout runs out (or that we gave up on) are left out of what's returned.
+	"""
+	import logging, random, time
+	from botocore.exceptions import BotoCoreError, ClientError
+
+	client_cfn=get_client('cloudformation', fRegion, ocredentials, fProfile)
+	StartTime=time.time()
+	# For each operation we're still waiting on: [when to check it next, how long we waited last time, its last status]
+	Pending={operation: [StartTime, fMinDelay, None] for operation in fOperations}
+	Finished={}
+	while Pending:
+		Now=time.time()
+		for operation in [operation for operation in Pending if Pending[operation][0] <= Now]:
+			StackSetName, OperationId = operation
+			NextCheck, Delay, Status = Pending[operation]
+			try:
+				Operation=client_cfn.describe_stack_set_operation(StackSetName=StackSetName, OperationId=OperationId)['StackSetOperation']
+			except (ClientError, BotoCoreError) as my_Error:
+				if isinstance(my_Error, ClientError) and my_Error.response['Error']['Code'] not in THROTTLING_ERRORS:
+					logging.error("Couldn't check on StackSet %s operation %s: %s", StackSetName, OperationId, my_Error)
+					del Pending[operation]
+					if fErrors is not None:
+						fErrors[operation]=my_Error
+					continue
+				logging.info("Checking on StackSet %s operation %s failed (%s), so we'll wait longer", StackSetName, OperationId, my_Error)
+				Delay=min(Delay * 2, fMaxDelay)
+				Pending[operation]=[time.time() + Delay * random.uniform(0.8, 1.2), Delay, Status]
+				continue
+			logging.info("StackSet %s operation %s is %s", StackSetName, OperationId, Operation['Status'])
+			if Operation['Status'] in STACKSET_OPERATION_DONE:
+				Finished[operation]=Operation
+				del Pending[operation]
+				if fCallback is not None:
+					fCallback(StackSetName, OperationId, Operation)
+				continue
+			Delay=fMinDelay if not Operation['Status'] == Status else min(Delay * 2, fMaxDelay)
+			# A little jitter, so operations started together don't all get checked at the same moment
+			Pending[operation]=[time.time() + Delay * random.uniform(0.8, 1.2), Delay, Operation['Status']]
+		if not Pending:
+			break
+		NextCheck=min(check for check, delay, status in Pending.values())
+		if fTimeout is not None and NextCheck - StartTime > fTimeout:
+			logging.warning("%s StackSet operations were still running after %s seconds", len(Pending), fTimeout)
+			break
+		time.sleep(max(0, NextCheck - time.time()))
+	return(Finished)
+
+
+def find_stackset_operation_failures(fProfile, fRegion, fStackSetName, fOperationId, ocredentials=None):
+	"""
+	Returns the results (account, region, status and reason) of a stackset operation, for the stack instances it failed on.
+	An operation that tolerates failures can still end up SUCCEEDED, so this is worth checking whatever its Status says.
+	ocredentials is used instead of fProfile, if fProfile is None.
+	"""
+	client_cfn=get_client('cloudformation', fRegion, ocredentials, fProfile)
+	return([result for result in paginate(client_cfn, 'list_stack_set_operation_results', 'Summaries', StackSetName=fStackSetName, OperationId=fOperationId)
+	        if not result['Status'] == 'SUCCEEDED'])
 
 
 def find_sc_products(fProfile, fRegion, fStatus="ERROR", flimit=100):
@@ -1625,31 +3710,15 @@ def find_sc_products(fProfile, fRegion, fStatus="ERROR", flimit=100):
 		}
 	]
 	"""
-	import boto3
-
-	response2=[]
-	session_sc=boto3.Session(profile_name=fProfile, region_name=fRegion)
-	client_sc=session_sc.client('servicecatalog')
+	client_sc=get_client('servicecatalog', fRegion, fProfile=fProfile)
 	if fStatus.lower()=='all':
-		response=client_sc.search_provisioned_products(PageSize=flimit)
-		while 'NextPageToken' in response.keys():
-			response2.extend(response['ProvisionedProducts'])
-			response=client_sc.search_provisioned_products(PageToken=response['NextPageToken'],PageSize=flimit)
+		response2=list(paginate(client_sc, 'search_provisioned_products', 'ProvisionedProducts', fPageSize=flimit))
 	else:	# We filter down to only the statuses asked for
-		response=client_sc.search_provisioned_products(PageSize=flimit,
+		response2=list(paginate(client_sc, 'search_provisioned_products', 'ProvisionedProducts', fPageSize=flimit,
 			Filters={
 				'SearchQuery': ['status:'+fStatus]
 			}
-		)
-		while 'NextPageToken' in response.keys():
-			response2.extend(response['ProvisionedProducts'])
-			response=client_sc.search_provisioned_products(PageSize=flimit,
-				Filters={
-					'SearchQuery': ['status:'+fStatus]
-				},
-				PageToken=response['NextPageToken']
-			)
-	response2.extend(response['ProvisionedProducts'])
+		))
 	return(response2)
 
 
@@ -1672,34 +3741,505 @@ def find_ssm_parameters(fProfile, fRegion):
 		},
 	]
 	"""
-	import boto3
 	import logging
 	from botocore.exceptions import ClientError
 	ERASE_LINE='\x1b[2K'
 
 	logging.warning("Finding ssm parameters for profile %s in Region %s", fProfile, fRegion)
-	session_ssm=boto3.Session(profile_name=fProfile, region_name=fRegion)
-	client_ssm=session_ssm.client('ssm')
-	response={}
+	client_ssm=get_client('ssm', fRegion, fProfile=fProfile)
 	response2=[]
-	TotalParameters=0
 	try:
-		response=client_ssm.describe_parameters(MaxResults=50)
+		# 50 is the most the API will give us per call
+		for parameter in paginate(client_ssm, 'describe_parameters', 'Parameters', fPageSize=50):
+			response2.append(parameter)
+			if (len(response2) % 500 == 0) and (logging.getLogger().getEffectiveLevel() > 30):
+				print(ERASE_LINE, "Sorry this is taking a while - we've already found {} parameters!".format(len(response2)), end="\r")
 	except ClientError as my_Error:
 		print(my_Error)
-	TotalParameters=TotalParameters+len(response['Parameters'])
-	logging.warning("Found another %s parameters, bringing the total up to %s", len(response['Parameters']), TotalParameters)
-	for i in range(len(response['Parameters'])):
-		response2.append(response['Parameters'][i])
-	while 'NextToken' in response.keys():
-		response=client_ssm.describe_parameters(MaxResults=50, NextToken=response['NextToken'])
-		TotalParameters=TotalParameters+len(response['Parameters'])
-		logging.warning("Found another %s parameters, bringing the total up to %s", len(response['Parameters']), TotalParameters)
-		for i in range(len(response['Parameters'])):
-			response2.append(response['Parameters'][i])
-		if (len(response2) % 500 == 0) and (logging.getLogger().getEffectiveLevel() > 30):
-			print(ERASE_LINE, "Sorry this is taking a while - we've already found {} parameters!".format(len(response2)), end="\r")
 
 	print()
 	logging.error("Found %s parameters", len(response2))
 	return(response2)
+
+
+"""
+asyncio backend - async_fan_out_finder works just like fan_out_finder (same parameters, same results), but runs the
+finders on an asyncio event loop, so thousands of account/ region requests can be in flight at once without a thread
+(and a set of boto3 clients) for each. The finders in ASYNC_FINDERS have async versions that use aiobotocore
+(pip install aiobotocore) - their clients are made once per (credentials, region, service) and shared for the whole run
+(see AsyncClientCache). Any other finder - or every finder, if aiobotocore isn't installed - is run in a small thread
+pool from the event loop instead, so the results are the same either way.
+"""
+ASYNC_CONCURRENCY = int(os.getenv('INVENTORY_ASYNC_CONCURRENCY', '100'))
+ASYNC_POOL_CONNECTIONS = 10
+
+
+def get_aio_session(ocredentials=None):
+	"""
+	- ocredentials are as described in get_session. If None, the session finds its own (default) credentials.
+
+	Returns an aiobotocore session, or None if aiobotocore isn't installed. This can block (to get the credentials), so
+	from the event loop, run it in an executor.
+	"""
+	import logging
+
+	try:
+		from aiobotocore.session import get_session as get_aiobotocore_session
+	except ImportError:
+		logging.warning("aiobotocore isn't installed, so the finders will be run in threads from the event loop")
+		return(None)
+	AioSession = get_aiobotocore_session()
+	AioSession.register_component('data_loader', get_data_loader())
+	if ocredentials is not None:
+		AioSession._credentials = get_async_credentials(ocredentials)
+	return(AioSession)
+
+
+def get_async_credentials(ocredentials):
+	"""
+	Returns aiobotocore credentials for ocredentials. They come from the boto3 session get_session makes for the same
+	ocredentials - so when that session's credentials renew themselves (assumed roles, SSO profiles and so on), these do too.
+	"""
+	import asyncio
+	from botocore.exceptions import NoCredentialsError
+	from aiobotocore.credentials import AioCredentials, AioRefreshableCredentials
+
+	Credentials = get_session(ocredentials).get_credentials()
+	if Credentials is None:
+		raise NoCredentialsError()
+	if not hasattr(Credentials, 'refresh_needed'):
+		Frozen = Credentials.get_frozen_credentials()
+		return(AioCredentials(Frozen.access_key, Frozen.secret_key, Frozen.token, method=Credentials.method))
+
+	def get_metadata():
+		# This renews them first, if they need it
+		Frozen = Credentials.get_frozen_credentials()
+		return({'access_key': Frozen.access_key,
+		        'secret_key': Frozen.secret_key,
+		        'token': Frozen.token,
+		        'expiry_time': Credentials._expiry_time.isoformat()})
+
+	async def refresh():
+		# Renewing them means calling STS (or the like) with the sync session, which mustn't hold up the event loop
+		return(await asyncio.get_event_loop().run_in_executor(None, get_metadata))
+
+	return(AioRefreshableCredentials.create_from_metadata(get_metadata(), refresh, Credentials.method))
+
+
+class AsyncClientCache:
+	"""
+	The aiobotocore clients (and sessions) for one async_fan_out_finder run - one client per (credentials, region, service),
+	made the first time it's needed and shared by everything that needs it after that. close() closes them all.
+	"""
+	def __init__(self, fExecutor=None):
+		"""
+		- fExecutor is where the sessions get their credentials (which can block). Defaults to the loop's default executor.
+		"""
+		import contextlib
+
+		self._executor = fExecutor
+		self._sessions = {}
+		self._clients = {}
+		self._session_locks = {}
+		self._client_locks = {}
+		self._exit_stack = contextlib.AsyncExitStack()
+
+	async def get_client(self, fService, fRegion, ocredentials):
+		"""
+		Returns the aiobotocore client, with the same client hooks (profiling, rate limiting) as get_client.
+		"""
+		import asyncio
+		from aiobotocore.config import AioConfig
+
+		SessionKey = get_session_key(ocredentials)
+		ClientKey = (SessionKey, fRegion, fService)
+		if ClientKey in self._clients:
+			return(self._clients[ClientKey])
+		async with self._client_locks.setdefault(ClientKey, asyncio.Lock()):
+			if ClientKey in self._clients:
+				return(self._clients[ClientKey])
+			async with self._session_locks.setdefault(SessionKey, asyncio.Lock()):
+				if SessionKey not in self._sessions:
+					self._sessions[SessionKey] = await asyncio.get_event_loop().run_in_executor(self._executor, get_aio_session, ocredentials)
+			my_Client = await self._exit_stack.enter_async_context(
+				self._sessions[SessionKey].create_client(fService, region_name=fRegion, config=AioConfig(max_pool_connections=ASYNC_POOL_CONNECTIONS)))
+			for hook in _client_hooks:
+				_async_client_hooks.get(hook, hook)(my_Client, ocredentials, None)
+			self._clients[ClientKey] = my_Client
+		return(my_Client)
+
+	async def close(self):
+		"""
+		Closes every client (and its connections).
+		"""
+		self._clients.clear()
+		await self._exit_stack.aclose()
+
+
+def get_async_client(fAioClients, fService, fRegion, ocredentials):
+	"""
+	- fAioClients is the AsyncClientCache the clients are kept in
+
+	Returns an async context manager for the aiobotocore client - use it like "async with get_async_client(...) as client:".
+	The client is shared, so it isn't closed when you're done - fAioClients.close() does that.
+	"""
+	from contextlib import asynccontextmanager
+
+	@asynccontextmanager
+	async def client_context():
+		yield(await fAioClients.get_client(fService, fRegion, ocredentials))
+	return(client_context())
+
+
+async def paginate_async(fClient, fOperation, fResultKey, fFragments=None, fFragmentKey=None, **kwargs):
+	"""
+	The async version of paginate (without the page size or item limits) - an async generator of the items.
+	"""
+	if fFragments is not None and ('all' in fFragments or 'ALL' in fFragments or 'All' in fFragments):
+		fFragments = None
+	async for page in fClient.get_paginator(fOperation).paginate(**kwargs):
+		for item in page.get(fResultKey, []):
+			if fFragments is not None:
+				ItemName = item if fFragmentKey is None else item[fFragmentKey]
+				if not any(ItemName.find(fragment) >= 0 for fragment in fFragments):
+					continue
+			yield(item)
+
+
+async def find_account_instances_async(fAioClients, ocredentials, fRegion='us-east-1', fFilters=None, fFields=None, fPageSize=INSTANCE_PAGE_SIZE):
+	async with get_async_client(fAioClients, 'ec2', fRegion, ocredentials) as instance_info:
+		return({'Reservations': [project_reservation(reservation, fFields) async for reservation in
+		                         paginate_async(instance_info, 'describe_instances', 'Reservations', PaginationConfig={} if fPageSize is None else {'PageSize': fPageSize}, Filters=fFilters or [])]})
+
+
+async def find_account_vpcs_async(fAioClients, ocredentials, fRegion, defaultOnly=False):
+	Filters = [{'Name': 'isDefault', 'Values': ['true']}] if defaultOnly else []
+	async with get_async_client(fAioClients, 'ec2', fRegion, ocredentials) as client_vpc:
+		return({'Vpcs': [vpc async for vpc in paginate_async(client_vpc, 'describe_vpcs', 'Vpcs', Filters=Filters)]})
+
+
+async def find_stacks_in_acct_async(fAioClients, ocredentials, fRegion, fStackFragment="all", fStatus="active"):
+	ActiveStatuses = ["CREATE_COMPLETE", "UPDATE_COMPLETE", "UPDATE_ROLLBACK_COMPLETE"]
+	async with get_async_client(fAioClients, 'cloudformation', fRegion, ocredentials) as client_cfn:
+		if fStatus.lower()=='active' and not fStackFragment.lower()=='all':
+			return([stack async for stack in paginate_async(client_cfn, 'list_stacks', 'StackSummaries', [fStackFragment], 'StackName', StackStatusFilter=ActiveStatuses)])
+		elif fStackFragment.lower()=='all' and fStatus.lower()=='all':
+			return([stack async for stack in paginate_async(client_cfn, 'list_stacks', 'StackSummaries')])
+		elif fStackFragment.lower()=='all' and fStatus.lower()=='active':
+			return([stack async for stack in paginate_async(client_cfn, 'list_stacks', 'StackSummaries', StackStatusFilter=ActiveStatuses)])
+		elif not fStatus.lower()=='active':
+			try:
+				return([stack async for stack in paginate_async(client_cfn, 'list_stacks', 'StackSummaries', [fStackFragment], 'StackName', StackStatusFilter=[fStatus]) if fStatus in stack['StackStatus']])
+			except Exception as e:
+				print(e)
+	return([])
+
+
+async def find_config_recorders_async(fAioClients, ocredentials, fRegion):
+	async with get_async_client(fAioClients, 'config', fRegion, ocredentials) as client_cfg:
+		return(await client_cfg.describe_configuration_recorders())
+
+
+async def find_cloudtrails_async(fAioClients, ocredentials, fRegion, fCloudTrailnames=None):
+	import asyncio
+	from botocore.exceptions import ClientError
+
+	if fCloudTrailnames is not None:
+		# Looking for specific trails is rare enough (and doesn't work properly anyway) that we leave it to the sync version
+		return(await asyncio.get_event_loop().run_in_executor(None, find_cloudtrails, ocredentials, fRegion, fCloudTrailnames))
+	trailname = "Various"
+	async with get_async_client(fAioClients, 'cloudtrail', fRegion, ocredentials) as client_ct:
+		try:
+			fullresponse = [trail async for trail in paginate_async(client_ct, 'list_trails', 'Trails')]
+		except ClientError as my_Error:
+			fullresponse = trailname+" didn't work. Try Again"
+	return(fullresponse, trailname)
+
+
+ASYNC_FINDERS = {
+	find_account_instances: find_account_instances_async,
+	find_account_vpcs: find_account_vpcs_async,
+	find_stacks_in_acct: find_stacks_in_acct_async,
+	find_config_recorders: find_config_recorders_async,
+	find_cloudtrails: find_cloudtrails_async,
+}
+
+
+async def rate_limit_async(fLimiter):
+	import asyncio
+
+	while True:
+		Wait = fLimiter.take()
+		if Wait is None:
+			return
+		await asyncio.sleep(Wait)
+
+
+def rate_limit_async_client(fClient, ocredentials=None, fProfile=None):
+	rate_limit_client(fClient, ocredentials, fProfile, fAsync=True)
+
+
+# The async clients use these in place of the matching hooks in _client_hooks
+_async_client_hooks = {rate_limit_client: rate_limit_async_client}
+
+
+def async_fan_out_finder(fAccountList, fRegionList, fFinder, fFinderArgs=None, fFinderKwargs=None, fWorkers=None, fService=None, fRoleList=None, fEnabledRegionsOnly=True):
+	"""
+	Takes the same parameters - and yields the same results - as fan_out_finder, except:
+	- fWorkers is the number of finders running at the same time (on the event loop). Default (or 1) is ASYNC_CONCURRENCY.
+	- fService only matters for finders that don't have an async version, which are run in threads just like fan_out_finder.
+
+	The event loop runs in its own thread, and results are handed back as they complete.
+	"""
+	import asyncio, logging, queue
+	from concurrent.futures import ThreadPoolExecutor
+
+	if fFinderArgs is None:
+		fFinderArgs = ()
+	if fFinderKwargs is None:
+		fFinderKwargs = {}
+	if fWorkers is None or fWorkers <= 1:
+		fWorkers = ASYNC_CONCURRENCY
+	Results = queue.Queue()
+	Stop = threading.Event()
+	Finished = object()
+
+	def run_finder(ocredentials, fRegion):
+		if fService is None:
+			return(fFinder(ocredentials, fRegion, *fFinderArgs, **fFinderKwargs))
+		with get_service_semaphore(fService, fWorkers):
+			return(fFinder(ocredentials, fRegion, *fFinderArgs, **fFinderKwargs))
+
+	async def fan_out():
+		loop = asyncio.get_event_loop()
+		# For the credentials (STS is throttled hard anyway), and for finders without an async version
+		executor = ThreadPoolExecutor(max_workers=min(fWorkers, 32))
+		# Checking aiobotocore is there - the clients (and their sessions) are made as they're needed, and shared
+		AioClients = AsyncClientCache(executor) if fFinder in ASYNC_FINDERS and get_aio_session() is not None else None
+		Semaphore = asyncio.Semaphore(fWorkers)
+
+		async def check_region(account, ocredentials, region):
+			async with Semaphore:
+				if Stop.is_set():
+					return
+				result = {'ParentProfile': account['ParentProfile'],
+				          'AccountId': account['AccountId'],
+				          'Region': region,
+				          'Credentials': ocredentials,
+				          'Result': None,
+				          'Error': None}
+				try:
+					if AioClients is None:
+						result['Result'] = await loop.run_in_executor(executor, run_finder, ocredentials, region)
+					else:
+						result['Result'] = await ASYNC_FINDERS[fFinder](AioClients, ocredentials, region, *fFinderArgs, **fFinderKwargs)
+				except Exception as my_Error:
+					result['Error'] = my_Error
+			Results.put(result)
+
+		async def check_account(account):
+			result = {'ParentProfile': account['ParentProfile'],
+			          'AccountId': account['AccountId'],
+			          'Region': None,
+			          'Credentials': None,
+			          'Result': None,
+			          'Error': None}
+			try:
+				ocredentials = await loop.run_in_executor(executor, get_account_credentials, account, fRoleList)
+				Regions = fRegionList
+				if ocredentials is not None and fEnabledRegionsOnly:
+					Regions = await loop.run_in_executor(executor, filter_enabled_regions, ocredentials, fRegionList)
+			except Exception as my_Error:
+				ocredentials = None
+				result['Error'] = my_Error
+			if ocredentials is None:
+				if result['Error'] is None:
+					result['Error'] = "Couldn't gain access to account {}".format(account['AccountId'])
+				Results.put(result)
+				return
+			logging.info("Got credentials for account %s - queuing up %s regions", account['AccountId'], len(Regions))
+			await asyncio.gather(*[check_region(account, ocredentials, region) for region in Regions])
+
+		try:
+			Accounts = []
+			for account in fAccountList:
+				if account.get('AccountStatus') == 'SUSPENDED':
+					logging.info("Skipping suspended account %s", account['AccountId'])
+					continue
+				Accounts.append(account)
+			await asyncio.gather(*[check_account(account) for account in Accounts])
+		finally:
+			if AioClients is not None:
+				await AioClients.close()
+			executor.shutdown(wait=False)
+
+	def run_loop():
+		loop = asyncio.new_event_loop()
+		asyncio.set_event_loop(loop)
+		try:
+			loop.run_until_complete(fan_out())
+		except Exception as my_Error:
+			logging.error("The event loop failed: %s", my_Error)
+		finally:
+			loop.close()
+			Results.put(Finished)
+
+	threading.Thread(target=run_loop, daemon=True).start()
+	try:
+		while True:
+			result = Results.get()
+			if result is Finished:
+				return
+			yield(result)
+	finally:
+		# If the caller stopped early, don't start anything new
+		Stop.set()
+
+
+def _reset_after_fork():
+	"""
+	Only the thread that forked carries on in a worker process, so any lock another of the parent's threads held at the
+	time would never be released. Every lock (and whatever it guards, where that's shared with the parent) starts over.
+	"""
+	global _service_semaphores_lock, _credential_cache_lock, _org_snapshot_lock, _enabled_regions_lock, _client_cache_lock
+	global _data_loader_lock, _call_stats_lock, _rate_limiters_lock, _access_failures_lock, _inventory_store_lock
+	global _call_stats, _call_trace
+
+	_service_semaphores_lock = threading.Lock()
+	_credential_cache_lock = threading.RLock()
+	_org_snapshot_lock = threading.RLock()
+	_enabled_regions_lock = threading.RLock()
+	_client_cache_lock = threading.RLock()
+	_data_loader_lock = threading.Lock()
+	_call_stats_lock = threading.Lock()
+	_rate_limiters_lock = threading.Lock()
+	_access_failures_lock = threading.RLock()
+	_inventory_store_lock = threading.RLock()
+	# Semaphores and rate limiters the parent's threads were part way through, and the locks for making clients
+	_service_semaphores.clear()
+	_rate_limiters.clear()
+	_creation_locks.clear()
+	# Whatever clients and sessions we inherited share their connections with the parent
+	_client_cache.clear()
+	_session_cache.clear()
+	# The parent reports its own calls - this process only sends back what it makes itself
+	_call_stats = {}
+	_call_trace = None if _call_trace is None else []
+
+
+def _process_fan_out_worker(fShardNumber, fAccountList, fRegionList, fFinder, fFinderArgs, fFinderKwargs, fWorkers, fService, fRoleList, fAsync, fEnabledRegionsOnly, fResults):
+	"""
+	Runs in each worker process started by process_fan_out_finder - fans out over its share of the accounts, and sends each
+	result back through fResults as it comes in.
+	"""
+	import logging, pickle
+
+	_reset_after_fork()
+	FanOut = async_fan_out_finder if fAsync else fan_out_finder
+	try:
+		for result in FanOut(fAccountList, fRegionList, fFinder, fFinderArgs, fFinderKwargs, fWorkers=fWorkers, fService=fService, fRoleList=fRoleList, fEnabledRegionsOnly=fEnabledRegionsOnly):
+			if result['Error'] is not None and not isinstance(result['Error'], str):
+				try:
+					pickle.dumps(result['Error'])
+				except Exception:
+					# Not everything botocore raises survives the trip back to the parent
+					result['Error'] = "{}: {}".format(type(result['Error']).__name__, result['Error'])
+			fResults.put(('Result', result))
+	except Exception as my_Error:
+		logging.error("Worker process %s failed: %s", fShardNumber, my_Error)
+	finally:
+		# Worker processes don't run atexit handlers
+		save_enabled_regions()
+		save_access_failures()
+		flush_inventory_store()
+		# What the profiler recorded here goes back to the parent, to be reported with everything else
+		with _call_stats_lock:
+			Trace = None if _call_trace is None else list(_call_trace)
+		fResults.put(('Done', (fShardNumber, get_call_stats(), Trace)))
+
+
+def process_fan_out_finder(fAccountList, fRegionList, fFinder, fFinderArgs=None, fFinderKwargs=None, fWorkers=10, fService=None, fRoleList=None, fProcesses=None, fAsync=False, fEnabledRegionsOnly=True):
+	"""
+	Takes the same parameters - and yields the same results - as fan_out_finder, plus:
+	- fProcesses is the number of worker processes to split the accounts across. Defaults to the number of CPUs.
+	- fAsync runs async_fan_out_finder (instead of fan_out_finder) within each process
+
+	Each process runs its own pool of fWorkers threads (and its own clients), so parsing the responses - which is what
+	keeps a single process busy - is spread across all the CPUs. Results come back through a pipe as they complete.
+	Whatever fFinder returns has to survive pickling (anything boto3 returns does).
+
+	Worker processes are forked, so this only works where fork does. Elsewhere, it's the same as fan_out_finder.
+	"""
+	import logging, multiprocessing, queue
+
+	if fProcesses is None:
+		fProcesses = os.cpu_count() or 1
+	fProcesses = max(1, min(fProcesses, len(fAccountList)))
+	if 'fork' not in multiprocessing.get_all_start_methods() or fProcesses == 1:
+		logging.warning("Not using separate processes - fork isn't available, or there's only one process's worth of work")
+		FanOut = async_fan_out_finder if fAsync else fan_out_finder
+		for result in FanOut(fAccountList, fRegionList, fFinder, fFinderArgs, fFinderKwargs, fWorkers=fWorkers, fService=fService, fRoleList=fRoleList, fEnabledRegionsOnly=fEnabledRegionsOnly):
+			yield(result)
+		return
+	Context = multiprocessing.get_context('fork')
+	Results = Context.Queue()
+	Processes = {}
+	for x in range(fProcesses):
+		# Spread the accounts round-robin, so one Organization's accounts don't all land in the same process
+		Processes[x] = Context.Process(target=_process_fan_out_worker, daemon=True,
+		                               args=(x, fAccountList[x::fProcesses], fRegionList, fFinder, fFinderArgs, fFinderKwargs,
+		                                     fWorkers, fService, fRoleList, fAsync, fEnabledRegionsOnly, Results))
+		Processes[x].start()
+	Running = set(Processes)
+	try:
+		while Running:
+			try:
+				Kind, Item = Results.get(timeout=1)
+			except queue.Empty:
+				for x in list(Running):
+					if not Processes[x].is_alive():
+						logging.error("Worker process %s ended with exit code %s, without finishing", x, Processes[x].exitcode)
+						Running.discard(x)
+				continue
+			if Kind == 'Done':
+				Shard, Stats, Trace = Item
+				merge_call_stats(Stats, Trace)
+				Running.discard(Shard)
+				continue
+			yield(Item)
+	finally:
+		# If the caller stopped early (or we're done), don't leave anything running
+		for x in Processes:
+			if Processes[x].is_alive():
+				Processes[x].terminate()
+			Processes[x].join()
+
+
+"""
+inventory_daemon.py keeps its sessions, credentials and whatever it's found in memory, and answers queries about them
+over a Unix socket - DAEMON_SOCKET, unless it's told otherwise. Each request, and each response, is one line of json.
+"""
+DAEMON_SOCKET = os.getenv('INVENTORY_DAEMON_SOCKET', os.path.join(CACHE_DIR, 'daemon.sock'))
+DAEMON_TIMEOUT = 900
+
+
+def query_daemon(fRequest, fSocketFile=None, fTimeout=DAEMON_TIMEOUT):
+	"""
+	- fRequest is a dict, like {'Query': 'instances', 'Profile': 'LZRoot', 'Fragment': 'web'} - see inventory_daemon.py
+	- fSocketFile is the daemon's socket. Defaults to DAEMON_SOCKET
+	- fTimeout is how long (in seconds) to wait for the answer - which can take a while if the daemon has to go and look
+
+	Returns the daemon's response (a dict). Raises OSError (like FileNotFoundError or ConnectionRefusedError) if the
+	daemon isn't running. This doesn't need boto3 at all.
+	"""
+	import json, socket
+
+	with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as my_Socket:
+		my_Socket.settimeout(fTimeout)
+		my_Socket.connect(fSocketFile or DAEMON_SOCKET)
+		my_Socket.sendall((json.dumps(fRequest) + '\n').encode())
+		with my_Socket.makefile('rb') as f:
+			Response = f.readline()
+	if not Response:
+		raise ConnectionError("The daemon closed the connection without answering")
+	return(json.loads(Response))
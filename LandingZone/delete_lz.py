@@ -31,6 +31,11 @@ from botocore.exceptions import ClientError
 # from botocore.errorfactory import StackSetNotFoundException
 import time
 import sys
+import os
+
+# Inventory_Modules lives one directory up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import Inventory_Modules
 
 # make sure we are running with python 3
 if sys.version_info < (3, 0):
@@ -48,6 +53,28 @@ def wait_with_progress_bar(Message="", Seconds=30):
         time.sleep(1)
 
 
+def find_running_operations(client, stack_set_name):
+    """Return the ids of the operations on a stack set that haven't finished yet"""
+    return [operation['OperationId'] for operation in Inventory_Modules.paginate(client, 'list_stack_set_operations', 'Summaries', StackSetName=stack_set_name)
+            if operation['Status'] not in Inventory_Modules.STACKSET_OPERATION_DONE]
+
+
+def wait_for_operations(operations, message=""):
+    """Wait for all of the given (stack set name, operation id) pairs to finish together, printing each one as it does"""
+    def operation_finished(stack_set_name, operation_id, operation):
+        print("\r{} of {} is {}".format(operation['Action'], stack_set_name, operation['Status']))
+
+    if operations:
+        print("\n{} ({} operations), please wait".format(message, len(operations)))
+    errors = {}
+    finished_operations = Inventory_Modules.wait_for_stackset_operations(None, AWS_REGION, operations, ocredentials=CREDENTIALS,
+                                                                         fCallback=operation_finished, fErrors=errors)
+    for (stack_set_name, operation_id), e in errors.items():
+        print("\nError checking on operation {} of {} - {}".format(operation_id, stack_set_name, e))
+        input("Please investigate it and press ENTER to continue")
+    return finished_operations
+
+
 def print_debug(message):
     """Print message if debug is turned on"""
     if DEBUG:
@@ -85,6 +112,8 @@ if __name__ == "__main__":
         AWS_SESSION_TOKEN_PASSED = True
         print("Debugging enabled and Session Token passed")
 
+    CREDENTIALS = {'AccessKeyId': AWS_ACCESS_KEY, 'SecretAccessKey': AWS_SECRET_ACCESS_KEY,
+                   'SessionToken': AWS_SESSION_TOKEN if AWS_SESSION_TOKEN_PASSED else None}
     start_time = time.time()
     SECURITY_ACCOUNT_NAME = "security"
     LOGGING_ACCOUNT_NAME = "log-archive"
@@ -339,19 +368,60 @@ if __name__ == "__main__":
                        "AWS-Landing-Zone-Baseline-ConfigRole",
                        "AWS-Landing-Zone-Baseline-EnableConfigRulesGlobal"]
 
+    user_input = input(
+        "\nDo you want to delete the stack instances of each stack set in one go, and wait for all of the stack sets at once (rather than one account and region at a time)? [y/n]:")
+    bulk_delete = user_input != 'n'
+
+    # first check which stack sets exist at all
+    active_stack_sets = [stack_set['StackSetName'] for stack_set in Inventory_Modules.paginate(client, 'list_stack_sets', 'Summaries', Status='ACTIVE')]
+    stack_sets_found = []
     for stack_set_name in stack_set_names:
-        # first check if stack set exists at all
-        stack_set_exists = False
-        active_stack_sets = client.list_stack_sets(Status='ACTIVE')
-        for active_stack_set in active_stack_sets['Summaries']:
-            if active_stack_set['StackSetName'] == stack_set_name:
-                stack_set_exists = True
-                print("StackSet {} exists, is ACTIVE and needs to be deleted.".format(active_stack_set['StackSetName']))
-
-        if stack_set_exists:
-            instances = client.list_stack_instances(StackSetName=stack_set_name)
+        if stack_set_name in active_stack_sets:
+            print("StackSet {} exists, is ACTIVE and needs to be deleted.".format(stack_set_name))
+            stack_sets_found.append(stack_set_name)
+        else:
+            print("Stack set {} not found, skipping it".format(stack_set_name))
+
+    # anything still running on these stack sets (like the deletes from Step 1a) has to finish before we start our own
+    wait_for_operations([(stack_set_name, operation_id) for stack_set_name in stack_sets_found
+                         for operation_id in find_running_operations(client, stack_set_name)],
+                        "Waiting for earlier stack set operations to finish")
+
+    if bulk_delete:
+        # one operation per stack set, covering every account and region it has instances in
+        operations = []
+        for stack_set_name in stack_sets_found:
+            accounts = set()
+            regions = set()
+            for instance in Inventory_Modules.paginate(client, 'list_stack_instances', 'Summaries', StackSetName=stack_set_name):
+                if instance['Status'] == 'CURRENT' or instance['Status'] == 'OUTDATED' or instance['Status'] == 'INOPERABLE':
+                    accounts.add(instance['Account'])
+                    regions.add(instance['Region'])
+            if not accounts:
+                print("No instances to delete for {}".format(stack_set_name))
+                continue
+            print("Deleting stack instances in {} accounts and {} regions from {}".format(len(accounts), len(regions), stack_set_name), end=" ")
+            response = client.delete_stack_instances(StackSetName=stack_set_name,
+                                                     Accounts=sorted(accounts),
+                                                     Regions=sorted(regions), RetainStacks=False,
+                                                     OperationPreferences=Inventory_Modules.get_stackset_operation_preferences(client))
+            print_debug(response)
+            operations.append((stack_set_name, response['OperationId']))
+            print("[STARTED]")
+
+        finished_operations = wait_for_operations(operations, "Instance deletion in progress")
+        for (stack_set_name, operation_id), operation in sorted(finished_operations.items()):
+            # an operation can be SUCCEEDED and still have failed on some instances (within its failure tolerance), so always look
+            failures = Inventory_Modules.find_stackset_operation_failures(None, AWS_REGION, stack_set_name, operation_id, CREDENTIALS)
+            if operation['Status'] != 'SUCCEEDED' or failures:
+                for result in failures:
+                    print("Stack instance in account {}, region {} from {} is {} - {}".format(result['Account'], result['Region'], stack_set_name,
+                                                                                             result['Status'], result.get('StatusReason', '')))
+                input("Stack Instance delete failed for {} - please fix the problem, delete the instances manually and press ENTER to continue".format(stack_set_name))
+    else:
+        for stack_set_name in stack_sets_found:
             deleted_instances = False
-            for instance in instances['Summaries']:
+            for instance in Inventory_Modules.paginate(client, 'list_stack_instances', 'Summaries', StackSetName=stack_set_name):
                 if instance['Status'] == 'CURRENT' or instance['Status'] == 'OUTDATED' or instance['Status'] == 'INOPERABLE':
                     print("Deleting stack instance in account {}, region {} from {}".format(instance['Account'],
                                                                                             instance['Region'],
@@ -360,46 +430,25 @@ if __name__ == "__main__":
                                                              Accounts=[instance['Account']],
                                                              Regions=[instance['Region']], RetainStacks=False)
                     print_debug(response)
-                    delete_in_progress = True
-                    while delete_in_progress:
-                        operation_status = client.describe_stack_set_operation(StackSetName=stack_set_name,OperationId=response['OperationId'])
-                        if operation_status['StackSetOperation']['Status'] == 'SUCCEEDED':
-                            delete_in_progress = False
-                        if operation_status['StackSetOperation']['Status'] == 'FAILED':
-                            print('Stack Instance delete failed - fix the problem and try again')
-                            exit()
-                        print(".",end="")
-                        time.sleep(5)
-                        print_debug("Still deleting stackset "+stack_set_name+" in region "+instance['Region']+" in account "+instance['Account'])
+                    operation = Inventory_Modules.wait_for_stackset_operation(None, AWS_REGION, stack_set_name, response['OperationId'], ocredentials=CREDENTIALS)
+                    if operation['Status'] != 'SUCCEEDED':
+                        print('Stack Instance delete failed - fix the problem and try again')
+                        exit()
+                    print("[DONE]")
                     deleted_instances = True
 
-                if not deleted_instances:
-                    print("No instances to delete for {}".format(stack_set_name))
-
-                    # wait for delete operations on this stack set to finish
-                # operations = client.list_stack_set_operations(StackSetName=stack_set_name)
-                delete_in_progress = True
-                while delete_in_progress:
-                    delete_in_progress = False
-                    operations = client.list_stack_set_operations(StackSetName=stack_set_name)
-                    for operation in operations['Summaries']:
-                        if operation['Action'] == "DELETE" and (
-                                operation['Status'] != 'SUCCEEDED' and operation['Status'] != 'FAILED'): # In other words - the status is "Running"
-                            delete_in_progress = True
-                            wait_with_progress_bar(Message="Instance deletion in progress", Seconds=10)
-                print("[DONE]")
+            if not deleted_instances:
+                print("No instances to delete for {}".format(stack_set_name))
 
-            # delete the stack set
-            print("Deleting stack set {}".format(stack_set_name), end=" ")
-            try:
-                client.delete_stack_set(StackSetName=stack_set_name)
-                deleted_stack_set = True
-                print('[DONE]')
-            except ClientError as e:
-                print("\nError deleting stack set {} - {}".format(stack_set_name, e))
-                input("Please investigate it, delete all relevant resources and press ENTER to continue")
-        else:
-            print("Stack set {} not found, skipping it".format(stack_set_name))
+    for stack_set_name in stack_sets_found:
+        # delete the stack set
+        print("Deleting stack set {}".format(stack_set_name), end=" ")
+        try:
+            client.delete_stack_set(StackSetName=stack_set_name)
+            print('[DONE]')
+        except ClientError as e:
+            print("\nError deleting stack set {} - {}".format(stack_set_name, e))
+            input("Please investigate it, delete all relevant resources and press ENTER to continue")
 
     # Step 8 - Unlock the member accounts (Skip this step: if the flag 'lock_down_stack_sets_role' is already set to 'No')
     print(
@@ -17,7 +17,7 @@ IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
 CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
 
-import os, sys, pprint, boto3
+import os, sys, pprint
 import Inventory_Modules, pprint
 import argparse
 from colorama import init,Fore,Back,Style
@@ -70,6 +70,31 @@ parser.add_argument(
 	default=False,
 	action="store_const",
 	help="This will delete the stacks found - without any opportunity to confirm. Be careful!!")
+parser.add_argument(
+	"--output-format",
+	dest="pOutputFormat",
+	choices=Inventory_Modules.OUTPUT_FORMATS,
+	default="table",
+	help="How to write out what we find. Default is a table on the screen. 'parquet' needs pyarrow, and --output-file.")
+parser.add_argument(
+	"--output-file",
+	dest="pOutputFile",
+	metavar="file name",
+	default=None,
+	help="Where to write what we find. Default is stdout.")
+parser.add_argument(
+	"--profile-calls",
+	dest="pProfileCalls",
+	metavar="trace file",
+	nargs="?",
+	const="",
+	default=None,
+	help="Print a summary of the API calls made (by service, operation, region and account) when the script finishes. Give a file name to also save every call there, as json.")
+parser.add_argument(
+	"--incremental",
+	dest="pIncremental",
+	action="store_true",
+	help="Only show the stacks that were added, removed or changed since the last time this was run with --incremental (with the same fragment and status).")
 parser.add_argument(
 	'-d', '--debug',
 	help="Print LOTS of debugging statements",
@@ -107,22 +132,39 @@ pstatus=args.pstatus
 AccountsToSkip=args.pSkipAccounts
 verbose=args.loglevel
 DeletionRun=args.DeletionRun
+pOutputFormat=args.pOutputFormat
+pOutputFile=args.pOutputFile
+pIncremental=args.pIncremental
+if pOutputFormat == 'parquet' and pOutputFile is None:
+	parser.error("--output-format parquet needs an --output-file")
+if args.pProfileCalls is not None:
+	Inventory_Modules.enable_call_profiling(args.pProfileCalls or None)
 logging.basicConfig(level=args.loglevel, format="[%(filename)s:%(lineno)s:%(levelname)s - %(funcName)30s() ] %(message)s")
+Inventory_Modules.preload_service_models(['sts', 'organizations', 'cloudformation'])
 
 ##########################
 ERASE_LINE = '\x1b[2K'
 
-print(args.loglevel)
-
-print()
-if args.loglevel < 21:	# INFO level
+if args.loglevel < 21 or not pOutputFormat == 'table':	# INFO level
 	fmt='%-20s %-15s %-15s %-50s %-50s'
-	print(fmt % ("Account","Region","Stack Status","Stack Name","Stack ID"))
-	print(fmt % ("-------","------","------------","----------","--------"))
+	Columns=["Account","Region","StackStatus","StackName","StackArn"]
+	Headers=("Account","Region","Stack Status","Stack Name","Stack ID")
 else:
 	fmt='%-20s %-15s %-15s %-50s'
-	print(fmt % ("Account","Region","Stack Status","Stack Name"))
-	print(fmt % ("-------","------","------------","----------"))
+	Columns=["Account","Region","StackStatus","StackName"]
+	Headers=("Account","Region","Stack Status","Stack Name")
+if pIncremental:
+	# We only show what's changed, so each row says how it changed
+	Snapshot=Inventory_Modules.load_inventory_snapshot("all_my_cfnstacks")
+	# The fragment and status decide which stacks we see, so they're part of what we compare against
+	StackType="stacks:{}:{}".format(pstackfrag,pstatus)
+	NumChanges=0
+	fmt='%-10s '+fmt
+	Columns=["Change"]+Columns
+	Headers=("Change",)+Headers
+Sink=Inventory_Modules.get_output_sink(pOutputFormat,Columns,pOutputFile,fmt,Headers)
+# Progress and summary lines go here, so they don't get mixed in with the rows when those are going to stdout
+Console=Sink.console
 # RegionList=Inventory_Modules.get_ec2_regions(pRegionList)
 RegionList=Inventory_Modules.get_service_regions('cloudformation',pRegionList)
 ChildAccounts=Inventory_Modules.find_child_accounts2(pProfile)
@@ -131,24 +173,11 @@ ChildAccounts=Inventory_Modules.RemoveCoreAccounts(ChildAccounts,AccountsToSkip)
 # pprint.pprint(ChildAccounts)
 # sys.exit(1)
 StacksFound=[]
-aws_session = boto3.Session(profile_name=pProfile)
-sts_client = aws_session.client('sts')
-for account in ChildAccounts:
-	role_arn = "arn:aws:iam::{}:role/AWSCloudFormationStackSetExecutionRole".format(account['AccountId'])
-	logging.info("Role ARN: %s" % role_arn)
-	try:
-		account_credentials = sts_client.assume_role(
-			RoleArn=role_arn,
-			RoleSessionName="Find-Stacks")['Credentials']
-		account_credentials['AccountNumber']=account['AccountId']
-	except ClientError as my_Error:
-		if str(my_Error).find("AuthFailure") > 0:
-			print(pProfile+": Authorization Failure for account {}".format(account['AccountId']))
-		elif str(my_Error).find("AccessDenied") > 0:
-			print(pProfile+": Access Denied Failure for account {}".format(account['AccountId']))
-		else:
-			print(pProfile+": Other kind of failure for account {}".format(account['AccountId']))
-			print (my_Error)
+AdminRole="AWSCloudFormationStackSetExecutionRole"
+# The roles are all assumed up front (in parallel), and each account is scanned as soon as its credentials are ready
+for account, account_credentials in Inventory_Modules.prefetch_credentials(ChildAccounts, fRoleList=[AdminRole]):
+	if account_credentials is None:
+		print(pProfile+": Access Denied Failure for account {}".format(account['AccountId']),file=Console)
 		continue
 	for region in RegionList:
 		Stacks=False
@@ -156,25 +185,35 @@ for account in ChildAccounts:
 			Stacks=Inventory_Modules.find_stacks_in_acct(account_credentials,region,pstackfrag,pstatus)
 			# pprint.pprint(Stacks)
 			logging.warning("Account: %s | Region: %s | Found %s Stacks", account['AccountId'], region, len(Stacks) )
-			print(ERASE_LINE,Fore.RED+"Account: {} Region: {} Found {} Stacks".format(account['AccountId'],region,len(Stacks))+Fore.RESET,end='\r')
+			print(ERASE_LINE,Fore.RED+"Account: {} Region: {} Found {} Stacks".format(account['AccountId'],region,len(Stacks))+Fore.RESET,end='\r',file=Console)
 		except ClientError as my_Error:
 			if str(my_Error).find("AuthFailure") > 0:
-				print(account['AccountId']+": Authorization Failure")
-		if Stacks and len(Stacks) > 0:
-			for y in range(len(Stacks)):
-				StackName=Stacks[y]['StackName']
-				StackStatus=Stacks[y]['StackStatus']
-				StackID=Stacks[y]['StackId']
-				if args.loglevel < 21: # INFO level
-					print(fmt % (account['AccountId'],region,StackStatus,StackName,StackID))
-				else:
-					print(fmt % (account['AccountId'],region,StackStatus,StackName))
-				StacksFound.append({
-					'Account':account['AccountId'],
-					'Region':region,
-					'StackName':StackName,
-					'StackStatus':StackStatus,
-					'StackArn':StackID})
+				print(account['AccountId']+": Authorization Failure",file=Console)
+		if Stacks is False:
+			# We couldn't look in this region, so we can't tell what's changed either
+			continue
+		Items=[]
+		for y in range(len(Stacks)):
+			StackName=Stacks[y]['StackName']
+			StackStatus=Stacks[y]['StackStatus']
+			StackID=Stacks[y]['StackId']
+			StacksFound.append(Inventory_Modules.StackRecord(
+				Account=account['AccountId'],
+				Region=region,
+				StackName=StackName,
+				StackStatus=StackStatus,
+				StackArn=StackID,
+				Credentials=account_credentials))
+			Items.append((StackID,Stacks[y],StacksFound[-1]))
+		if pIncremental:
+			# The stack summaries include LastUpdatedTime, so any update to a stack shows up as a change
+			Rows=[dict(Row,Change=Change) for Change,Row in Inventory_Modules.diff_inventory_partition(Snapshot,(account['AccountId'],region,StackType),Items)]
+			NumChanges+=len(Rows)
+		else:
+			Rows=[Row for StackID,Stack,Row in Items]
+		for Row in Rows:
+			Sink.write(Row)
+Sink.close()
 lAccounts=[]
 lRegions=[]
 lAccountsAndRegions=[]
@@ -182,24 +221,23 @@ for i in range(len(StacksFound)):
 	lAccounts.append(StacksFound[i]['Account'])
 	lRegions.append(StacksFound[i]['Region'])
 	lAccountsAndRegions.append((StacksFound[i]['Account'],StacksFound[i]['Region']))
-print(ERASE_LINE)
-print(Fore.RED+"Looked through",len(StacksFound),"Stacks across",len(ChildAccounts),"accounts across",len(RegionList),"regions"+Fore.RESET)
-print()
+print(ERASE_LINE,file=Console)
+print(Fore.RED+"Looked through",len(StacksFound),"Stacks across",len(ChildAccounts),"accounts across",len(RegionList),"regions"+Fore.RESET,file=Console)
+if pIncremental:
+	Inventory_Modules.save_inventory_snapshot("all_my_cfnstacks",Snapshot)
+	print("{} stacks were added, removed or changed since the last run".format(NumChanges),file=Console)
+print(file=Console)
 if args.loglevel < 21: # INFO level
-	print("The list of accounts and regions:")
-	pprint.pprint(list(sorted(set(lAccountsAndRegions))))
+	print("The list of accounts and regions:",file=Console)
+	pprint.pprint(list(sorted(set(lAccountsAndRegions))),stream=Console)
 # pprint.pprint(StacksFound)
 
 if DeletionRun and ('GuardDuty' in pstackfrag):
 	logging.warning("Deleting %s stacks",len(StacksFound))
 	for y in range(len(StacksFound)):
-		role_arn = "arn:aws:iam::{}:role/AWSCloudFormationStackSetExecutionRole".format(StacksFound[y]['Account'])
-		cfn_client=aws_session.client('cloudformation')
-		account_credentials = sts_client.assume_role(
-			RoleArn=role_arn,
-			RoleSessionName="Delete-Stacks")['Credentials']
-		account_credentials['AccountNumber']=StacksFound[y]['Account']
-		print("Deleting stack {} from Account {} in region {} with status: {}".format(StacksFound[y]['StackName'],StacksFound[y]['Account'],StacksFound[y]['Region'],StacksFound[y]['StackStatus']))
+		# Each stack refers to the credentials its account was searched with, which renew themselves if they've expired since
+		account_credentials=StacksFound[y]['Credentials']
+		print("Deleting stack {} from Account {} in region {} with status: {}".format(StacksFound[y]['StackName'],StacksFound[y]['Account'],StacksFound[y]['Region'],StacksFound[y]['StackStatus']),file=Console)
 		""" This next line is BAD because it's hard-coded for GuardDuty, but we'll fix that eventually """
 		if StacksFound[y]['StackStatus'] == 'DELETE_FAILED':
 			# This deletion generally fails because the Master Detector doesn't properly delete (and it's usually already deleted due to some other script) - so we just need to delete the stack anyway - and ignore the actual resource.
@@ -209,15 +247,11 @@ if DeletionRun and ('GuardDuty' in pstackfrag):
 elif DeletionRun:
 	logging.warning("Deleting %s stacks",len(StacksFound))
 	for y in range(len(StacksFound)):
-		role_arn = "arn:aws:iam::{}:role/AWSCloudFormationStackSetExecutionRole".format(StacksFound[y]['Account'])
-		cfn_client=aws_session.client('cloudformation')
-		account_credentials = sts_client.assume_role(
-			RoleArn=role_arn,
-			RoleSessionName="Delete-Stacks")['Credentials']
-		account_credentials['AccountNumber']=StacksFound[y]['Account']
-		print("Deleting stack {} from account {} in region {} with status: {}".format(StacksFound[y]['StackName'],StacksFound[y]['Account'],StacksFound[y]['Region'],StacksFound[y]['StackStatus']))
+		# Each stack refers to the credentials its account was searched with, which renew themselves if they've expired since
+		account_credentials=StacksFound[y]['Credentials']
+		print("Deleting stack {} from account {} in region {} with status: {}".format(StacksFound[y]['StackName'],StacksFound[y]['Account'],StacksFound[y]['Region'],StacksFound[y]['StackStatus']),file=Console)
 		response=Inventory_Modules.delete_stack2(account_credentials,StacksFound[y]['Region'],StacksFound[y]['StackName'])
-		pprint.pprint(response)
+		pprint.pprint(response,stream=Console)
 
-print()
-print("Thanks for using this script...")
+print(file=Console)
+print("Thanks for using this script...",file=Console)
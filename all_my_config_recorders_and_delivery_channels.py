@@ -119,15 +119,13 @@ for account in ChildAccounts:
 			RoleSessionName="Find-Configuration-Recorders")['Credentials']
 	except ClientError as my_Error:
 		if str(my_Error).find("AuthFailure") > 0:
-			print(profile+": Authorization Failure for account {}".format(account['AccountId']))
+			print(pProfile+": Authorization Failure for account {}".format(account['AccountId']))
+		continue
+	# Everything we find in this account refers to this one copy of its credentials
+	account_credentials['AccountNumber']=account['AccountId']
 	for region in cf_regions:
 		NumAccountsInvestigated += 1
-		session_aws=boto3.Session(
-			aws_access_key_id=account_credentials['AccessKeyId'],
-			aws_secret_access_key=account_credentials['SecretAccessKey'],
-			aws_session_token=account_credentials['SessionToken'],
-			region_name=region)
-		client_aws=session_aws.client('config')
+		client_aws=Inventory_Modules.get_client('config', region, account_credentials)
 		## List Configuration_Recorders
 		try: # Looking for Configuration Recorders
 			print(ERASE_LINE,"Trying account {} in region {}".format(account['AccountId'],region),end='\r')
@@ -135,41 +133,37 @@ for account in ChildAccounts:
 			logging.error("Successfully described config recorders")
 		except ClientError as my_Error:
 			if str(my_Error).find("AuthFailure") > 0:
-				print(profile+": Authorization Failure for account {}".format(account['AccountId']))
+				print(pProfile+": Authorization Failure for account {}".format(account['AccountId']))
 			response={}
 		if 'ConfigurationRecorders' in response.keys():
 		# if len(response['ConfigurationRecorders']) > 0:
 			for i in range(len(response['ConfigurationRecorders'])):
 				NumObjectsFound=NumObjectsFound + len(response['ConfigurationRecorders'])
-				all_config_recorders.append({
-					'AccountId':account['AccountId'],
-					'ConfigurationRecorder':response['ConfigurationRecorders'][i]['name'],
-					'Region':region,
-					'AccessKeyId':account_credentials['AccessKeyId'],
-					'SecretAccessKey':account_credentials['SecretAccessKey'],
-					'SessionToken':account_credentials['SessionToken']
-				})
+				all_config_recorders.append(Inventory_Modules.RecorderRecord(
+					AccountId=account['AccountId'],
+					ConfigurationRecorder=response['ConfigurationRecorders'][i]['name'],
+					Region=region,
+					Credentials=account_credentials
+				))
 				print("Found another config recorder {} in account {} in region {} bringing the total found to {} ".format(str(response['ConfigurationRecorders'][i]['name']),account['AccountId'],region,str(NumObjectsFound)))
 		try:	# Looking for Delivery Channels
 			print(ERASE_LINE,"Trying account {} in region {}".format(account['AccountId'],region),end='\r')
 			response=client_aws.describe_delivery_channels()
 			if len(response['DeliveryChannels']) > 0 and response['DeliveryChannels'][0]['name'][-13:] != "DO-NOT-DELETE":
 				NumObjectsFound=NumObjectsFound + len(response['DeliveryChannels'])
-				all_config_delivery_channels.append({
-					'AccountId':account['AccountId'],
-					'Region':region,
-					'DeliveryChannel':response['DeliveryChannels'][0]['name'],
-					'AccessKeyId':account_credentials['AccessKeyId'],
-					'SecretAccessKey':account_credentials['SecretAccessKey'],
-					'SessionToken':account_credentials['SessionToken']
-				})
+				all_config_delivery_channels.append(Inventory_Modules.ChannelRecord(
+					AccountId=account['AccountId'],
+					Region=region,
+					DeliveryChannel=response['DeliveryChannels'][0]['name'],
+					Credentials=account_credentials
+				))
 				print("Found another delivery_channel {} in account {} in region {} bringing the total found to {} ".format(str(response['DeliveryChannels'][0]['name']),account['AccountId'],region,str(NumObjectsFound)))
 				# logging.info("Found another detector ("+str(response['DeliveryChannels'][0])+") in account "+account['AccountId']+" in region "+account['AccountId']+" bringing the total found to "+str(NumObjectsFound))
 			else:
 				print(ERASE_LINE,Fore.RED+"No luck in account: {} in region {}".format(account['AccountId'],region)+Fore.RESET,end='\r')
 		except ClientError as my_Error:
 			if str(my_Error).find("AuthFailure") > 0:
-				print(profile+": Authorization Failure for account {}".format(account['AccountId']))
+				print(pProfile+": Authorization Failure for account {}".format(account['AccountId']))
 
 if args.loglevel < 50:
 	print()
@@ -177,7 +171,7 @@ if args.loglevel < 50:
 	print(fmt % ("Account ID","Region","Delivery Channel"))
 	print(fmt % ("----------","------","----------------"))
 	for i in range(len(all_config_delivery_channels)):
-		print(fmt % (all_config_delivery_channels[i]['AccountId'],all_config_delivery_channels[i]['Region'],all_config_delivery_channels[i]['DeliveryChannels']))
+		print(fmt % (all_config_delivery_channels[i]['AccountId'],all_config_delivery_channels[i]['Region'],all_config_delivery_channels[i]['DeliveryChannel']))
 
 print(ERASE_LINE)
 print("We scanned {} accounts and {} regions totalling {} possible areas for resources.".format(len(ChildAccounts),len(cf_regions),len(ChildAccounts)*len(cf_regions)))
@@ -194,12 +188,7 @@ if DeletionRun and (ReallyDelete or ForceDelete):
 	MemberList=[]
 	logging.warning("Deleting all Config Recorders")
 	for y in range(len(all_config_recorders)):
-		session_cf_child=boto3.Session(
-				aws_access_key_id=all_config_recorders[y]['AccessKeyId'],
-				aws_secret_access_key=all_config_recorders[y]['SecretAccessKey'],
-				aws_session_token=all_config_recorders[y]['SessionToken'],
-				region_name=all_config_recorders[y]['Region'])
-		client_cf_child=session_cf_child.client('config')
+		client_cf_child=Inventory_Modules.get_client('config', all_config_recorders[y]['Region'], all_config_recorders[y]['Credentials'])
 		## Delete ConfigurationRecorders
 		try:
 			print(ERASE_LINE,"Deleting recorder from Account {} in region {}".format(all_config_recorders[y]['AccountId'],all_config_recorders[y]['Region']),end="\r")
@@ -219,12 +208,7 @@ if DeletionRun and (ReallyDelete or ForceDelete):
 	for y in range(len(all_config_delivery_channels)):
 		logging.info("Deleting delivery channel: %s from account %s in region %s" % (all_config_delivery_channels[y]['DeliveryChannel'],all_config_delivery_channels[y]['AccountId'],all_config_delivery_channels[y]['Region']))
 		print("Deleting delivery channel in account {} in region {}".format(all_config_delivery_channels[y]['AccountId'],all_config_delivery_channels[y]['Region']))
-		session_cf_child=boto3.Session(
-				aws_access_key_id=all_config_delivery_channels[y]['AccessKeyId'],
-				aws_secret_access_key=all_config_delivery_channels[y]['SecretAccessKey'],
-				aws_session_token=all_config_delivery_channels[y]['SessionToken'],
-				region_name=all_config_delivery_channels[y]['Region'])
-		client_cf_child=session_cf_child.client('config')
+		client_cf_child=Inventory_Modules.get_client('config', all_config_delivery_channels[y]['Region'], all_config_delivery_channels[y]['Credentials'])
 		## List Members
 		Output=client_cf_child.delete_delivery_channel(
     		DeliveryChannelName=all_config_delivery_channels[y]['DeliveryChannel']
@@ -109,31 +109,17 @@ all_gd_detectors=[]
 all_gd_invites=[]
 print("Searching {} accounts and {} regions".format(len(ChildAccounts),len(gd_regions)))
 
-sts_session = boto3.Session(profile_name=pProfile)
-sts_client = sts_session.client('sts')
-for account in ChildAccounts:
+# The roles are all assumed up front (in parallel), and each account is checked as soon as its credentials are ready
+for account, account_credentials in Inventory_Modules.prefetch_credentials(ChildAccounts, fRoleList=['AWSCloudFormationStackSetExecutionRole']):
 	logging.info("Checking Account: %s" % account)
 	NumProfilesInvestigated = 0	# I only care about the last run - so I don't get profiles * regions.
-	role_arn = "arn:aws:iam::{}:role/AWSCloudFormationStackSetExecutionRole".format(account['AccountId'])
-	logging.info("Role ARN: %s" % role_arn)
-	try:
-		account_credentials = sts_client.assume_role(
-			RoleArn=role_arn,
-			RoleSessionName="Find-GuardDuty-Detectors")['Credentials']
-	except ClientError as my_Error:
-		if str(my_Error).find("AuthFailure") > 0:
-			print("Authorization Failure for account {}".format(account['AccountId']))
+	if account_credentials is None:
+		print("Authorization Failure for account {}".format(account['AccountId']))
 		sys.exit("Credentials failure")
 	for region in gd_regions:
 		logging.info("Checking Region: %s" % region)
 		NumAccountsInvestigated += 1
-		session_aws=boto3.Session(
-			aws_access_key_id=account_credentials['AccessKeyId'],
-			aws_secret_access_key=account_credentials['SecretAccessKey'],
-			aws_session_token=account_credentials['SessionToken'],
-			region_name=region)
-		client_aws=session_aws.client('guardduty')
-		logging.info("Token Info %s" % account_credentials)
+		client_aws=Inventory_Modules.get_client('guardduty', region, account_credentials)
 		## List Invitations
 		try:
 			logging.info("About to List invites for account: %s in region %s" % (account,region))
@@ -151,27 +137,23 @@ for account in ChildAccounts:
 		# if len(response['Invitations']) > 0:
 		if 'Invitations' in response.keys():
 			for i in range(len(response['Invitations'])):
-				all_gd_invites.append({
-					'AccountId':response['Invitations'][i]['AccountId'],
-					'InvitationId':response['Invitations'][i]['InvitationId'],
-					'Region':region,
-					'AccessKeyId':account_credentials['AccessKeyId'],
-					'SecretAccessKey':account_credentials['SecretAccessKey'],
-					'SessionToken':account_credentials['SessionToken']
-				})
+				all_gd_invites.append(Inventory_Modules.GuardDutyInviteRecord(
+					AccountId=response['Invitations'][i]['AccountId'],
+					InvitationId=response['Invitations'][i]['InvitationId'],
+					Region=region,
+					Credentials=account_credentials
+				))
 		try:
 			print(ERASE_LINE,"Trying account {} in region {}".format(account['AccountId'],region),end='\r')
 			response=client_aws.list_detectors()
 			if len(response['DetectorIds']) > 0:
 				NumObjectsFound=NumObjectsFound + len(response['DetectorIds'])
-				all_gd_detectors.append({
-					'AccountId':account['AccountId'],
-					'Region':region,
-					'DetectorIds':response['DetectorIds'],
-					'AccessKeyId':account_credentials['AccessKeyId'],
-					'SecretAccessKey':account_credentials['SecretAccessKey'],
-					'SessionToken':account_credentials['SessionToken']
-				})
+				all_gd_detectors.append(Inventory_Modules.GuardDutyDetectorRecord(
+					AccountId=account['AccountId'],
+					Region=region,
+					DetectorIds=response['DetectorIds'],
+					Credentials=account_credentials
+				))
 				print("Found another detector {} in account {} in region {} bringing the total found to {} ".format(str(response['DetectorIds'][0]),account['AccountId'],region,str(NumObjectsFound)))
 				# logging.info("Found another detector ("+str(response['DetectorIds'][0])+") in account "+account['AccountId']+" in region "+account['AccountId']+" bringing the total found to "+str(NumObjectsFound))
 			else:
@@ -203,12 +185,7 @@ if DeletionRun and (ReallyDelete or ForceDelete):
 	MemberList=[]
 	logging.warning("Deleting all invites")
 	for y in range(len(all_gd_invites)):
-		session_gd_child=boto3.Session(
-			aws_access_key_id=all_gd_invites[y]['AccessKeyId'],
-			aws_secret_access_key=all_gd_invites[y]['SecretAccessKey'],
-			aws_session_token=all_gd_invites[y]['SessionToken'],
-			region_name=all_gd_invites[y]['Region'])
-		client_gd_child=session_gd_child.client('guardduty')
+		client_gd_child=Inventory_Modules.get_client('guardduty', all_gd_invites[y]['Region'], all_gd_invites[y]['Credentials'])
 		## Delete Invitations
 		try:
 			print(ERASE_LINE,"Deleting invite for Account {}".format(all_gd_invites[y]['AccountId']),end="\r")
@@ -227,12 +204,7 @@ if DeletionRun and (ReallyDelete or ForceDelete):
 	for y in range(len(all_gd_detectors)):
 		logging.info("Deleting detector-id: %s from account %s in region %s" % (all_gd_detectors[y]['DetectorIds'],all_gd_detectors[y]['AccountId'],all_gd_detectors[y]['Region']))
 		print("Deleting detector in account {} in region {}".format(all_gd_detectors[y]['AccountId'],all_gd_detectors[y]['Region']))
-		session_gd_child=boto3.Session(
-			aws_access_key_id=all_gd_detectors[y]['AccessKeyId'],
-			aws_secret_access_key=all_gd_detectors[y]['SecretAccessKey'],
-			aws_session_token=all_gd_detectors[y]['SessionToken'],
-			region_name=all_gd_detectors[y]['Region'])
-		client_gd_child=session_gd_child.client('guardduty')
+		client_gd_child=Inventory_Modules.get_client('guardduty', all_gd_detectors[y]['Region'], all_gd_detectors[y]['Credentials'])
 		## List Members
 		Member_Dict=client_gd_child.list_members(
 			DetectorId=str(all_gd_detectors[y]['DetectorIds'][0]),
@@ -17,7 +17,7 @@ IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
 CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
 
-import os, sys, boto3
+import os, sys, functools
 import Inventory_Modules
 import argparse
 from colorama import init, Fore
@@ -43,6 +43,84 @@ parser.add_argument(
 	metavar="region name string",
 	default=["us-east-1"],
 	help="String fragment of the region(s) you want to check for resources.")
+parser.add_argument(
+	"-s", "--state",
+	nargs="*",
+	dest="pStates",
+	metavar="instance state",
+	default=None,
+	help="Only look for instances in these states (running, stopped, etc.). Default is all of them.")
+parser.add_argument(
+	"-t", "--type",
+	nargs="*",
+	dest="pInstanceTypes",
+	metavar="instance type",
+	default=None,
+	help="Only look for instances of these types. Wildcards work, like 't3.*'. Default is all of them.")
+parser.add_argument(
+	"--tag",
+	nargs="*",
+	dest="pTags",
+	metavar="key=value",
+	default=None,
+	help="Only look for instances with these tags. Leave out the '=value' to match any value.")
+parser.add_argument(
+	"--vpc",
+	nargs="*",
+	dest="pVpcIds",
+	metavar="vpc id",
+	default=None,
+	help="Only look for instances in these VPCs.")
+parser.add_argument(
+	"--page-size",
+	dest="pPageSize",
+	type=int,
+	default=Inventory_Modules.INSTANCE_PAGE_SIZE,
+	help="How many instances to ask for in each call. Default is {}, which is the most the API allows.".format(Inventory_Modules.INSTANCE_PAGE_SIZE))
+parser.add_argument(
+	"--workers",
+	dest="pWorkers",
+	metavar="number of threads",
+	type=int,
+	default=1,
+	help="How many accounts/ regions to check at the same time. Default is 1, which checks one at a time.")
+parser.add_argument(
+	"--async",
+	dest="pAsync",
+	action="store_true",
+	help="Check the accounts/ regions from an asyncio event loop (using aiobotocore, if it's installed) rather than threads. Here --workers is the number checked at the same time, and defaults to {}.".format(Inventory_Modules.ASYNC_CONCURRENCY))
+parser.add_argument(
+	"--processes",
+	dest="pProcesses",
+	metavar="number of processes",
+	type=int,
+	default=1,
+	help="Split the accounts across this many processes, each with its own --workers threads, to make use of more CPUs. Default is 1.")
+parser.add_argument(
+	"--output-format",
+	dest="pOutputFormat",
+	choices=Inventory_Modules.OUTPUT_FORMATS,
+	default="table",
+	help="How to write out what we find. Default is a table on the screen. 'parquet' needs pyarrow, and --output-file.")
+parser.add_argument(
+	"--output-file",
+	dest="pOutputFile",
+	metavar="file name",
+	default=None,
+	help="Where to write what we find. Default is stdout.")
+parser.add_argument(
+	"--profile-calls",
+	dest="pProfileCalls",
+	metavar="trace file",
+	nargs="?",
+	const="",
+	default=None,
+	help="Print a summary of the API calls made (by service, operation, region and account) when the script finishes. Give a file name to also save every call there, as json.")
+parser.add_argument(
+	"--incremental",
+	dest="pIncremental",
+	action="store_true",
+	help="Only show the instances that were added, removed or changed since the last time this was run with --incremental.")
 parser.add_argument(
 	'-d', '--debug',
 	help="Print debugging statements - only for developers",
@@ -75,7 +153,26 @@ args = parser.parse_args()
 
 pProfile=args.pProfile
 pRegionList=args.pRegion
+pWorkers=args.pWorkers
+pAsync=args.pAsync
+pProcesses=args.pProcesses
+pOutputFormat=args.pOutputFormat
+pOutputFile=args.pOutputFile
+pIncremental=args.pIncremental
+pTags={}
+for tag in args.pTags or []:
+	key, _, value = tag.partition('=')
+	pTags[key]=value if _ else None
+# AWS does the filtering, and we only keep the fields we show - so less comes back, and less is held in memory
+InstanceFilters=Inventory_Modules.get_instance_filters(args.pStates, args.pInstanceTypes, pTags, args.pVpcIds)
+# A filtered run is kept apart from an unfiltered one, so instances it leaves out don't look like they've been removed
+SnapshotType='instances' if not InstanceFilters else "instances:{}".format(Inventory_Modules.hash_content(InstanceFilters)[:12])
+if pOutputFormat == 'parquet' and pOutputFile is None:
+	parser.error("--output-format parquet needs an --output-file")
+if args.pProfileCalls is not None:
+	Inventory_Modules.enable_call_profiling(args.pProfileCalls or None)
 logging.basicConfig(level=args.loglevel, format="[%(filename)s:%(lineno)s - %(funcName)20s() ] %(message)s")
+Inventory_Modules.preload_service_models(['sts', 'organizations', 'ec2'])
 
 EnvVars= {'Profile': os.getenv('AWS_PROFILE'),
           'AccessKey': os.getenv('AWS_ACCESS_KEY_ID'),
@@ -150,15 +247,20 @@ else:
 ERASE_LINE = '\x1b[2K'
 
 NumInstancesFound = 0
-print()
-if ProfileSupplied:
-	fmt='%-12s %-15s %-10s %-15s %-25s %-20s %-42s %-12s'
-	print(fmt % ("Profile", "Account #", "Region", "InstanceType", "Name", "Instance ID", "Public DNS Name", "State"))
-	print(fmt % ("-------", "---------", "------", "------------", "----", "-----------", "---------------", "-----"))
-elif not ProfileSupplied:
-	fmt='%-15s %-10s %-15s %-25s %-20s %-42s %-12s'
-	print(fmt % ("Account #", "Region", "InstanceType", "Name", "Instance ID", "Public DNS Name", "State"))
-	print(fmt % ("---------", "------", "------------", "----", "-----------", "---------------", "-----"))
+NumChanges = 0
+Columns=["ParentProfile", "AccountId", "Region", "InstanceType", "Name", "InstanceId", "PublicDnsName", "State"]
+Headers=("Profile", "Account #", "Region", "InstanceType", "Name", "Instance ID", "Public DNS Name", "State")
+ChangeFmt=''
+if pIncremental:
+	# We only show what's changed, so each row says how it changed
+	Snapshot=Inventory_Modules.load_inventory_snapshot("all_my_instances")
+	Columns=["Change"]+Columns
+	Headers=("Change",)+Headers
+	ChangeFmt='%-10s '
+fmt=ChangeFmt+'%-12s %-15s %-10s %-15s %-25s %-20s %-42s %-12s'
+Sink=Inventory_Modules.get_output_sink(pOutputFormat, Columns, pOutputFile, fmt, Headers)
+# Progress and summary lines go here, so they don't get mixed in with the rows when those are going to stdout
+Console=Sink.console
 
 RegionList=Inventory_Modules.get_regions(pRegionList)
 AllChildAccounts=[]
@@ -189,73 +291,76 @@ elif ProfileIsRoot == 'Child':
 		'AccountEmail': 'noonecares@doesntmatter.com'}]
 	account_credentials['Profile']=pProfile
 
-Instances={}
-# Removing all accounts which are SUSPENDED
-for i in reversed(range(len(AllChildAccounts))):
-	if AllChildAccounts[i]['AccountStatus'] == 'SUSPENDED':
-		del AllChildAccounts[i]
-for i in range(len(AllChildAccounts)):
-	aws_session = boto3.Session(profile_name=AllChildAccounts[i]['ParentProfile'])
-	sts_client = aws_session.client('sts')
-	logging.info("Single account record %s:", AllChildAccounts[i])
-	"""
-	TO DO - figure a way to find out whether this rolename is correct for every account?
-	"""
-	role_arn = "arn:aws:iam::{}:role/AWSCloudFormationStackSetExecutionRole".format(AllChildAccounts[i]['AccountId'])
-	logging.info("Role ARN: %s" % role_arn)
-	try:
-		# This is a standalone or child account and the profile provided is all we need
-		if len(AllChildAccounts) == 1 and pProfile == AllChildAccounts[i]['ParentProfile']:
-			continue    # We've already populated the account_credentials dict above
-		# The profile provided is of a root account, which has access to the member accounts via some role
-		else:
-			account_credentials, role = Inventory_Modules.get_child_access2(AllChildAccounts[i]['ParentProfile'], AllChildAccounts[i]['AccountId'])
-			account_credentials['Profile']=pProfile
-		account_credentials['AccountNumber']=AllChildAccounts[i]['AccountId']
-	except ClientError as my_Error:
-		if str(my_Error).find("AuthFailure") > 0:
-			logging.error("%s: Authorization Failure for account %s", AllChildAccounts[i]['ParentProfile'], AllChildAccounts[i]['AccountId'])
-		elif str(my_Error).find("AccessDenied") > 0:
-			logging.error("%s: Access Denied Failure for account %s", AllChildAccounts[i]['ParentProfile'], AllChildAccounts[i]['AccountId'])
+if ProfileIsRoot in ['StandAlone', 'Child']:
+	# The profile provided is all we need - so there's no role to assume
+	account_credentials['AccountNumber']=Creds['AccountId']
+	AllChildAccounts[0]['Credentials']=account_credentials
+
+if pProcesses > 1:
+	FanOut=functools.partial(Inventory_Modules.process_fan_out_finder, fProcesses=pProcesses, fAsync=pAsync)
+elif pAsync:
+	FanOut=Inventory_Modules.async_fan_out_finder
+else:
+	FanOut=Inventory_Modules.fan_out_finder
+for Finding in FanOut(AllChildAccounts, RegionList, Inventory_Modules.find_account_instances,
+                      fFinderKwargs={'fFilters': InstanceFilters, 'fFields': Inventory_Modules.INSTANCE_SUMMARY_FIELDS, 'fPageSize': args.pPageSize},
+                      fWorkers=pWorkers, fService='ec2'):
+	ParentProfile=Finding['ParentProfile']
+	pRegion=Finding['Region']
+	if Finding['Error'] is not None:
+		my_Error=Finding['Error']
+		if pRegion is None:
+			logging.error("%s: Failure getting into account %s", ParentProfile, Finding['AccountId'])
 			logging.warning(my_Error)
+		elif str(my_Error).find("AuthFailure") > 0:
+			logging.error("Authorization Failure using {} parent profile to access {} account in {} region".format(ParentProfile, Finding['AccountId'], pRegion))
+			logging.warning("It's possible that the region %s hasn't been opted-into", pRegion)
 		else:
-			logging.error("%s: Other kind of failure for account %s", AllChildAccounts[i]['ParentProfile'], AllChildAccounts[i]['AccountId'])
+			logging.error("%s: Other kind of failure for account %s in region %s", ParentProfile, Finding['AccountId'], pRegion)
 			logging.warning(my_Error)
 		continue
-	for pRegion in RegionList:
-		try:
-			Instances=Inventory_Modules.find_account_instances(account_credentials, pRegion)
-			logging.warning("Account %s being looked at now", account_credentials['AccountNumber'])
-			InstanceNum=len(Instances['Reservations'])
-			print(ERASE_LINE+"Org Profile: {} Account: {} Region: {} Found {} instances".format(AllChildAccounts[i]['ParentProfile'], account_credentials['AccountNumber'], pRegion, InstanceNum), end='\r')
-		except ClientError as my_Error:
-			if str(my_Error).find("AuthFailure") > 0:
-				logging.error("Authorization Failure using {} parent profile to access {} account in {} region".format(AllChildAccounts[i]['ParentProfile'], AllChildAccounts[i]['AccountId'], pRegion))
-				logging.warning("It's possible that the region %s hasn't been opted-into", pRegion)
-				pass
-		# if len(Instances['Reservations']) > 0:
-		if 'Reservations' in Instances.keys():
-			for y in range(len(Instances['Reservations'])):
-				for z in range(len(Instances['Reservations'][y]['Instances'])):
-					InstanceType=Instances['Reservations'][y]['Instances'][z]['InstanceType']
-					InstanceId=Instances['Reservations'][y]['Instances'][z]['InstanceId']
-					PublicDnsName=Instances['Reservations'][y]['Instances'][z]['PublicDnsName']
-					State=Instances['Reservations'][y]['Instances'][z]['State']['Name']
-					# print("Length:", len(Instances['Reservations'][y]['Instances'][z]['Tags']))
-					try:
-						Name="No Name Tag"
-						for x in range(len(Instances['Reservations'][y]['Instances'][z]['Tags'])):
-							if Instances['Reservations'][y]['Instances'][z]['Tags'][x]['Key']=="Name":
-								Name=Instances['Reservations'][y]['Instances'][z]['Tags'][x]['Value']
-					except KeyError as my_Error:	# This is needed for when there is no "Tags" key within the describe-instances output
-						logging.info(my_Error)
-						pass
-					if State == 'running':
-						fmt='%-12s %-15s %-10s %-15s %-20s %-20s %-42s '+Fore.RED+'%-12s'+Fore.RESET
-					else:
-						fmt='%-12s %-15s %-10s %-15s %-20s %-20s %-42s %-12s'
-					print(fmt % (AllChildAccounts[i]['ParentProfile'], account_credentials['AccountNumber'], pRegion, InstanceType, Name, InstanceId, PublicDnsName, State))
-					NumInstancesFound += 1
-print(ERASE_LINE)
-print("Found {} instances across {} profiles across {} regions".format(NumInstancesFound, len(AllChildAccounts), len(RegionList)))
-print()
+	Instances=Finding['Result']
+	logging.warning("Account %s being looked at now", Finding['AccountId'])
+	InstanceNum=sum(len(reservation['Instances']) for reservation in Instances['Reservations'])
+	print(ERASE_LINE+"Org Profile: {} Account: {} Region: {} Found {} instances".format(ParentProfile, Finding['AccountId'], pRegion, InstanceNum), end='\r', file=Console)
+	Items=[]
+	for reservation in Instances['Reservations']:
+		for instance in reservation['Instances']:
+			InstanceType=instance['InstanceType']
+			InstanceId=instance['InstanceId']
+			PublicDnsName=instance.get('PublicDnsName', '')
+			State=instance['State']['Name']
+			Name="No Name Tag"
+			# There's no "Tags" key at all when the instance has no tags
+			for tag in instance.get('Tags', []):
+				if tag['Key']=="Name":
+					Name=tag['Value']
+			Items.append((InstanceId, instance, {
+				'ParentProfile': ParentProfile,
+				'AccountId': Finding['AccountId'],
+				'Region': pRegion,
+				'InstanceType': InstanceType,
+				'Name': Name,
+				'InstanceId': InstanceId,
+				'PublicDnsName': PublicDnsName,
+				'State': State}))
+			NumInstancesFound += 1
+	if pIncremental:
+		# Unchanged account/ regions come back empty, so there's nothing more to do for them
+		Rows=[dict(Row, Change=Change) for Change, Row in Inventory_Modules.diff_inventory_partition(Snapshot, (Finding['AccountId'], pRegion, SnapshotType), Items)]
+		NumChanges += len(Rows)
+	else:
+		Rows=[Row for InstanceId, Instance, Row in Items]
+	for Row in Rows:
+		if Row['State'] == 'running':
+			fmt=ChangeFmt+'%-12s %-15s %-10s %-15s %-20s %-20s %-42s '+Fore.RED+'%-12s'+Fore.RESET
+		else:
+			fmt=ChangeFmt+'%-12s %-15s %-10s %-15s %-20s %-20s %-42s %-12s'
+		Sink.write(Row, fmt)
+Sink.close()
+print(ERASE_LINE, file=Console)
+print("Found {} instances across {} profiles across {} regions".format(NumInstancesFound, len(AllChildAccounts), len(RegionList)), file=Console)
+if pIncremental:
+	Inventory_Modules.save_inventory_snapshot("all_my_instances", Snapshot)
+	print("{} instances were added, removed or changed since the last run".format(NumChanges), file=Console)
+print(file=Console)
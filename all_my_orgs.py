@@ -19,6 +19,7 @@ CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 import os
 import sys
+import subprocess
 import logging
 import argparse
 import Inventory_Modules
@@ -59,6 +60,47 @@ parser.add_argument(
 	dest="shortform",
 	const=True,
 	default=False)
+parser.add_argument(
+	"--workers",
+	dest="pWorkers",
+	metavar="number of threads",
+	type=int,
+	default=10,
+	help="How many profiles to check at the same time. Default is 10.")
+parser.add_argument(
+	"--timeout",
+	dest="pTimeout",
+	metavar="seconds",
+	type=int,
+	default=Inventory_Modules.PROFILE_TIMEOUT,
+	help="How long to wait on any one profile before giving up on it. Default is {} seconds.".format(Inventory_Modules.PROFILE_TIMEOUT))
+parser.add_argument(
+	"--output-format",
+	dest="pOutputFormat",
+	choices=Inventory_Modules.OUTPUT_FORMATS,
+	default="table",
+	help="How to write out what we find. Default is a table on the screen. Anything else writes one row per account in each Organization. 'parquet' needs pyarrow, and --output-file.")
+parser.add_argument(
+	"--output-file",
+	dest="pOutputFile",
+	metavar="file name",
+	default=None,
+	help="Where to write what we find. Default is stdout.")
+parser.add_argument(
+	"--profile-calls",
+	dest="pProfileCalls",
+	metavar="trace file",
+	nargs="?",
+	const="",
+	default=None,
+	help="Print a summary of the API calls made (by service, operation, region and account) when the script finishes. Give a file name to also save every call there, as json.")
+parser.add_argument(
+	'--refresh',
+	help="Ignore what we remember about your Organizations from previous runs, and look everything up again",
+	action="store_const",
+	dest="refresh",
+	const=True,
+	default=False)
 parser.add_argument(
 	'-v',
 	help="Be verbose",
@@ -94,13 +136,30 @@ pProfiles=args.pProfiles
 verbose=args.loglevel
 rootonly=args.rootonly
 shortform=args.shortform
+pWorkers=args.pWorkers
+pTimeout=args.pTimeout
+pOutputFormat=args.pOutputFormat
+pOutputFile=args.pOutputFile
+if pOutputFormat == 'parquet' and pOutputFile is None:
+	parser.error("--output-format parquet needs an --output-file")
+if args.pProfileCalls is not None:
+	Inventory_Modules.enable_call_profiling(args.pProfileCalls or None)
+if pOutputFile is not None and not pProfiles == []:
+	parser.error("--output-file can't be used with a list of profiles, since each profile is run separately")
 logging.basicConfig(level=args.loglevel, format="[%(filename)s:%(lineno)s:%(levelname)s - %(funcName)20s() ] %(message)s")
+# Get boto3 (and the STS and Organizations models) loaded in the background, while we read through the profiles
+Inventory_Modules.preload_service_models()
+
+if args.refresh:
+	Inventory_Modules.invalidate_org_snapshot()
 
 SkipProfiles=["default"]
 ERASE_LINE = '\x1b[2K'
 
 RootAccts=[]	# List of the Organization Root's Account Number
 RootProfiles=[]	# List of the Organization Root's profiles
+# When the rows are going to stdout in some other format, everything else we print goes to stderr instead
+Console=sys.stdout if pOutputFormat == 'table' or pOutputFile is not None else sys.stderr
 
 """
 Because there's two ways for the user to provide profiles, we have to consider four scenarios:
@@ -134,11 +193,26 @@ elif not pProfile == "all":	# Use case #2 from above
 		RootAcct=True
 		ShowEverything=False
 	else:
-		print()
-		print(Fore.RED + "If you're going to provide a profile, it's supposed to be a Master Billing Account profile!!" + Fore.RESET)
-		print("Continuing to run the script - but for all profiles.")
+		print(file=Console)
+		print(Fore.RED + "If you're going to provide a profile, it's supposed to be a Master Billing Account profile!!" + Fore.RESET,file=Console)
+		print("Continuing to run the script - but for all profiles.",file=Console)
 		ShowEverything=True
 else: # Use case #3 from above
+	def ChildArgs(profile):
+		# Everything else we were asked for, for the run with just this profile
+		Args=["--output-format",pOutputFormat,"--workers",str(pWorkers),"--timeout",str(pTimeout)]
+		Args+=["-R"] if rootonly else []
+		Args+=["-s"] if shortform else []
+		Args+=["--refresh"] if args.refresh else []
+		Args+={logging.ERROR: ["-v"], logging.WARNING: ["-vv"], logging.INFO: ["-vvv"], logging.DEBUG: ["-d"]}.get(verbose,[])
+		if args.pProfileCalls == "":
+			Args+=["--profile-calls"]
+		elif args.pProfileCalls is not None:
+			# Each run saves its own trace, rather than writing over the one before
+			TraceFile=os.path.splitext(args.pProfileCalls)
+			Args+=["--profile-calls",TraceFile[0]+"-"+profile+TraceFile[1]]
+		return(Args)
+
 	logging.info("Use Case #3")
 	logging.warning("Multiple profiles have been provided: %s. Going through one at a time...",str(pProfiles))
 	for profile in pProfiles:
@@ -150,106 +224,130 @@ else: # Use case #3 from above
 			filename=sys.argv[0]
 			logging.info("Running the script again with %s as your profile",profile)
 			ShowEverything=False
-			os.system("python3 "+filename+" -p "+profile)
+			subprocess.call([sys.executable,filename,"-p",profile]+ChildArgs(profile))
 		else:
-			print()
-			print(Fore.RED + "Provided profile: {} isn't a Master Billing Account profile!!".format(profile) + Fore.RESET)
-			print("Skipping...")
+			print(file=Console)
+			print(Fore.RED + "Provided profile: {} isn't a Master Billing Account profile!!".format(profile) + Fore.RESET,file=Console)
+			print("Skipping...",file=Console)
 			ShowEverything=False
 			continue
 	sys.exit("Finished %s profiles!" % len(pProfiles))	# Finished the multiple profiles provided.
 
+# Anything other than the table gets one row per account, for each Organization we find
+Sink=Inventory_Modules.get_output_sink(pOutputFormat,["ParentProfile","MasterAccount","ALZ","AccountId","AccountEmail"],pOutputFile) if not pOutputFormat == 'table' else None
+
 """
 TODO:
 	- If they provide a profile that isn't a root profile, you should find out which org it belongs to, and then show the org for that. This will be difficult, since we don't know which profile that belongs to. Hmmm...
 """
 
-if ShowEverything:
-	fmt='%-23s %-15s %-27s %-12s %-10s'
-	print ("------------------------------------")
-	print (fmt % ("Profile Name","Account Number","Master Org Acct","Org ID","Root Acct?"))
-	print (fmt % ("------------","--------------","---------------","------","----------"))
-	for profile in Inventory_Modules.get_profiles2(SkipProfiles,"all"):
-		AcctNum = "Blank Acct"
-		MasterAcct = "Blank Root"
-		OrgId = "o-xxxxxxxxxx"
-		Email = "Email not available"
-		RootId = "r-xxxx"
-		ErrorFlag = False
-		try:
-			AcctNum = Inventory_Modules.find_account_number(profile)
-			logging.info("AccountNumber: {}".format(AcctNum))
-			if AcctNum == '123456789012':
-				ErrorFlag = True
-				pass
-			else:
-				AcctAttr = Inventory_Modules.find_org_attr(profile)
-				MasterAcct = AcctAttr['MasterAccountId']
-				OrgId = AcctAttr['Id']
-		except ClientError as my_Error:
-			ErrorFlag = True
-			if str(my_Error).find("AWSOrganizationsNotInUseException") > 0:
-				MasterAcct="Not an Org Account"
-			elif str(my_Error).find("AccessDenied") > 0:
-				MasterAcct="Acct not auth for Org API."
-			elif str(my_Error).find("InvalidClientTokenId") > 0:
-				MasterAcct="Credentials Invalid."
-			elif str(my_Error).find("ExpiredToken") > 0:
-				MasterAcct="Token Expired."
-			else:
-				print("Client Error")
-				print(my_Error)
-		except InvalidConfigError as my_Error:
+def classify_profile(profile):
+	"""
+	Figures out what kind of account the profile represents.
+	Returns a dict with the row to display for this profile.
+	"""
+	AcctNum = "Blank Acct"
+	MasterAcct = "Blank Root"
+	OrgId = "o-xxxxxxxxxx"
+	Email = "Email not available"
+	ErrorFlag = False
+	try:
+		AcctNum = Inventory_Modules.find_account_number(profile)
+		logging.info("AccountNumber: {}".format(AcctNum))
+		if AcctNum == '123456789012':
 			ErrorFlag = True
-			if str(my_Error).find("does not exist") > 0:
-				ErrorMessage=str(my_Error)[str(my_Error).find(":"):]
-				print(ErrorMessage)
-			else:
-				print("Credentials Error")
-				print(my_Error)
+			pass
+		else:
+			AcctAttr = Inventory_Modules.find_org_attr(profile)
+			MasterAcct = AcctAttr['MasterAccountId']
+			OrgId = AcctAttr['Id']
+	except ClientError as my_Error:
+		ErrorFlag = True
+		if str(my_Error).find("AWSOrganizationsNotInUseException") > 0:
+			MasterAcct="Not an Org Account"
+		elif str(my_Error).find("AccessDenied") > 0:
+			MasterAcct="Acct not auth for Org API."
+		elif str(my_Error).find("InvalidClientTokenId") > 0:
+			MasterAcct="Credentials Invalid."
+		elif str(my_Error).find("ExpiredToken") > 0:
+			MasterAcct="Token Expired."
+		else:
+			print("Client Error",file=Console)
+			print(my_Error,file=Console)
+	except InvalidConfigError as my_Error:
+		ErrorFlag = True
+		if str(my_Error).find("does not exist") > 0:
+			ErrorMessage=str(my_Error)[str(my_Error).find(":"):]
+			print(ErrorMessage,file=Console)
+		else:
+			print("Credentials Error",file=Console)
+			print(my_Error,file=Console)
 
-		except NoCredentialsError as my_Error:
-			ErrorFlag = True
-			if str(my_Error).find("Unable to locate credentials") > 0:
-				MasterAcct="This profile doesn't have credentials."
-			else:
-				print("Credentials Error")
-				print(my_Error)
-		if AcctNum==MasterAcct and not ErrorFlag:
-			RootAcct=True
-			RootAccts.append(MasterAcct)
-			RootProfiles.append(profile)
-			Email = AcctAttr['MasterAccountEmail']
-			logging.info('Email: %s',Email)
+	except NoCredentialsError as my_Error:
+		ErrorFlag = True
+		if str(my_Error).find("Unable to locate credentials") > 0:
+			MasterAcct="This profile doesn't have credentials."
 		else:
-			RootAcct=False
+			print("Credentials Error",file=Console)
+			print(my_Error,file=Console)
+	if AcctNum==MasterAcct and not ErrorFlag:
+		RootAcct=True
+		Email = AcctAttr['MasterAccountEmail']
+		logging.info('Email: %s',Email)
+	else:
+		RootAcct=False
+	return({'Profile': profile, 'AcctNum': AcctNum, 'MasterAcct': MasterAcct, 'OrgId': OrgId, 'RootAcct': RootAcct, 'Email': Email})
 
-		'''
-		If I create a dictionary from the Root Accts and Root Profiles Lists - 
-		I can use that to determine which profile belongs to the root user of my (child) account.
-		But this dictionary is only guaranteed to be valid after ALL profiles have been checked, 
-		so... it doesn't solve our issue - unless we don't write anything to the screen until *everything* is done, 
-		and we keep all output in another dictionary - where we can populate the missing data at the end... 
-		but that takes a long time, since nothing would be sent to the screen in the meantime.
-		'''
-		# dictionary.update(dict(zip(RootAccts, RootProfiles)))
 
-	#	 Print results for this profile
-		if RootAcct:
-			print(Fore.RED + fmt % (profile,AcctNum,MasterAcct,OrgId,RootAcct)+Style.RESET_ALL)
-		elif rootonly: # If I'm looking for only the root accounts, when I find something that isn't a root account, don't print anything and continue on.
-			print(ERASE_LINE,"{} isn't a root account".format(profile),end="\r")
-		else:
-			print (fmt % (profile,AcctNum,MasterAcct,OrgId,RootAcct))
-	print()
-	print("-------------------")
+def profile_row(fmt, row):
+	if row['RootAcct']:
+		return(Fore.RED + fmt % (row['Profile'],row['AcctNum'],row['MasterAcct'],row['OrgId'],row['RootAcct'])+Style.RESET_ALL)
+	else:
+		return(fmt % (row['Profile'],row['AcctNum'],row['MasterAcct'],row['OrgId'],row['RootAcct']))
+
+
+if ShowEverything:
+	fmt='%-23s %-15s %-27s %-12s %-10s'
+	print("------------------------------------",file=Console)
+	print(fmt % ("Profile Name","Account Number","Master Org Acct","Org ID","Root Acct?"),file=Console)
+	print(fmt % ("------------","--------------","---------------","------","----------"),file=Console)
+	"""
+	All the profiles are checked at the same time (up to pWorkers), and each row is shown as soon as its profile has been checked.
+	Once they're all done, the rows are re-drawn in place, sorted by profile name.
+	"""
+	ProfileRows=[]
+	LinesPrinted=0
+	Interactive=Console.isatty()
+	for profile, row, my_Error in Inventory_Modules.run_with_timeouts(classify_profile, Inventory_Modules.get_profiles2(SkipProfiles,"all"), pWorkers, pTimeout):
+		if my_Error is not None:
+			logging.error("Profile %s failed: %s", profile, my_Error)
+			row={'Profile': profile, 'AcctNum': "Blank Acct", 'MasterAcct': "Timed out" if isinstance(my_Error, TimeoutError) else "Failed", 'OrgId': "o-xxxxxxxxxx", 'RootAcct': False, 'Email': "Email not available"}
+		ProfileRows.append(row)
+		if row['RootAcct']:
+			RootAccts.append(row['MasterAcct'])
+		if Interactive and not (rootonly and not row['RootAcct']):
+			print(ERASE_LINE+profile_row(fmt, row),file=Console)
+			LinesPrinted+=1
+		elif Interactive:	# If I'm looking for only the root accounts, when I find something that isn't a root account, don't print anything and continue on.
+			print(ERASE_LINE,"{} isn't a root account".format(profile),end="\r",file=Console)
+	if Interactive:
+		# Move the cursor back up over the rows we've already shown, so we can re-draw them in order
+		print(ERASE_LINE+"\x1b[{}A".format(LinesPrinted) if LinesPrinted > 0 else ERASE_LINE, end="",file=Console)
+	for row in sorted(ProfileRows, key=lambda x: x['Profile']):
+		if row['RootAcct']:
+			RootProfiles.append(row['Profile'])
+		elif rootonly:
+			continue
+		print(ERASE_LINE+profile_row(fmt, row),file=Console)
+	print(file=Console)
+	print("-------------------",file=Console)
 
-	if not shortform:
+	if not shortform or Sink is not None:
 		fmt='%-23s %-15s %-6s'
 		child_fmt="\t\t%-20s %-20s"
-		print()
-		print(fmt % ("Organization's Profile","Root Account","ALZ"))
-		print(fmt % ("----------------------","------------","---"))
+		print(file=Console)
+		print(fmt % ("Organization's Profile","Root Account","ALZ"),file=Console)
+		print(fmt % ("----------------------","------------","---"),file=Console)
 		NumOfAccounts=0
 		for profile in RootProfiles:
 			child_accounts={}
@@ -261,19 +359,21 @@ if ShowEverything:
 				fmt='%-23s '+Style.BRIGHT+'%-15s '+Style.RESET_ALL+Fore.RED+'%-6s '+Fore.RESET
 			else:
 				fmt='%-23s '+Style.BRIGHT+'%-15s '+Style.RESET_ALL+'%-6s'
-			print(fmt % (profile,MasterAcct,landing_zone))
-			print(child_fmt % ("Child Account Number","Child Email Address"))
+			print(fmt % (profile,MasterAcct,landing_zone),file=Console)
+			print(child_fmt % ("Child Account Number","Child Email Address"),file=Console)
 			for account in sorted(child_accounts):
-				print(child_fmt % (account,child_accounts[account]))
-		print()
-		print("Number of Organizations:",len(RootProfiles))
-		print("Number of Organization Accounts:",NumOfAccounts)
+				print(child_fmt % (account,child_accounts[account]),file=Console)
+				if Sink is not None:
+					Sink.write({'ParentProfile':profile,'MasterAccount':MasterAcct,'ALZ':landing_zone,'AccountId':account,'AccountEmail':child_accounts[account]})
+		print(file=Console)
+		print("Number of Organizations:",len(RootProfiles),file=Console)
+		print("Number of Organization Accounts:",NumOfAccounts,file=Console)
 elif not ShowEverything:
 	fmt='%-23s %-15s %-6s'
 	child_fmt="\t\t%-20s %-20s"
-	print()
-	print(fmt % ("Organization's Profile","Root Account","ALZ"))
-	print(fmt % ("----------------------","------------","---"))
+	print(file=Console)
+	print(fmt % ("Organization's Profile","Root Account","ALZ"),file=Console)
+	print(fmt % ("----------------------","------------","---"),file=Console)
 	NumOfAccounts=0
 
 	child_accounts={}
@@ -285,9 +385,14 @@ elif not ShowEverything:
 		fmt='%-23s '+Style.BRIGHT+'%-15s '+Style.RESET_ALL+Fore.RED+'%-6s '+Fore.RESET
 	else:
 		fmt='%-23s '+Style.BRIGHT+'%-15s '+Style.RESET_ALL+'%-6s'
-	print(fmt % (pProfile,MasterAcct,landing_zone))
-	print(child_fmt % ("Child Account Number","Child Email Address"))
+	print(fmt % (pProfile,MasterAcct,landing_zone),file=Console)
+	print(child_fmt % ("Child Account Number","Child Email Address"),file=Console)
 	for account in sorted(child_accounts):
-		print(child_fmt % (account,child_accounts[account]))
-	print()
-	print("Number of Organization Accounts:",NumOfAccounts)
+		print(child_fmt % (account,child_accounts[account]),file=Console)
+		if Sink is not None:
+			Sink.write({'ParentProfile':pProfile,'MasterAccount':MasterAcct,'ALZ':landing_zone,'AccountId':account,'AccountEmail':child_accounts[account]})
+	print(file=Console)
+	print("Number of Organization Accounts:",NumOfAccounts,file=Console)
+
+if Sink is not None:
+	Sink.close()
@@ -17,9 +17,9 @@ IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
 CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
 
-import os, sys, pprint, datetime
+import os, sys, pprint, datetime, functools
 import Inventory_Modules
-import argparse, boto3
+import argparse
 from colorama import init,Fore,Back,Style
 from botocore.exceptions import ClientError, NoCredentialsError
 
@@ -51,6 +51,45 @@ parser.add_argument(
 	metavar="region name string",
 	default=["us-east-1"],
 	help="String fragment of the region(s) you want to check for resources.")
+parser.add_argument(
+	"--workers",
+	dest="pWorkers",
+	metavar="number of threads",
+	type=int,
+	default=1,
+	help="How many accounts/ regions to check at the same time. Default is 1, which checks one at a time.")
+parser.add_argument(
+	"--async",
+	dest="pAsync",
+	action="store_true",
+	help="Check the accounts/ regions from an asyncio event loop (using aiobotocore, if it's installed) rather than threads. Here --workers is the number checked at the same time, and defaults to {}.".format(Inventory_Modules.ASYNC_CONCURRENCY))
+parser.add_argument(
+	"--processes",
+	dest="pProcesses",
+	metavar="number of processes",
+	type=int,
+	default=1,
+	help="Split the accounts across this many processes, each with its own --workers threads, to make use of more CPUs. Default is 1.")
+parser.add_argument(
+	"--output-format",
+	dest="pOutputFormat",
+	choices=Inventory_Modules.OUTPUT_FORMATS,
+	default="table",
+	help="How to write out what we find. Default is a table on the screen. 'parquet' needs pyarrow, and --output-file.")
+parser.add_argument(
+	"--output-file",
+	dest="pOutputFile",
+	metavar="file name",
+	default=None,
+	help="Where to write what we find. Default is stdout.")
+parser.add_argument(
+	"--profile-calls",
+	dest="pProfileCalls",
+	metavar="trace file",
+	nargs="?",
+	const="",
+	default=None,
+	help="Print a summary of the API calls made (by service, operation, region and account) when the script finishes. Give a file name to also save every call there, as json.")
 parser.add_argument(
 	'-d', '--debug',
 	help="Print LOTS of debugging statements",
@@ -84,8 +123,18 @@ args = parser.parse_args()
 pProfile=args.pProfile
 pRegionList=args.pRegion
 pDefault=args.pDefault
+pWorkers=args.pWorkers
+pAsync=args.pAsync
+pProcesses=args.pProcesses
+pOutputFormat=args.pOutputFormat
+pOutputFile=args.pOutputFile
+if pOutputFormat == 'parquet' and pOutputFile is None:
+	parser.error("--output-format parquet needs an --output-file")
+if args.pProfileCalls is not None:
+	Inventory_Modules.enable_call_profiling(args.pProfileCalls or None)
 verbose=args.loglevel
 logging.basicConfig(level=args.loglevel, format="[%(filename)s:%(lineno)s:%(levelname)s - %(funcName)30s() ] %(message)s")
+Inventory_Modules.preload_service_models(['sts', 'organizations', 'ec2'])
 
 ##########################
 ERASE_LINE = '\x1b[2K'
@@ -93,10 +142,10 @@ SkipProfiles=["default"]
 
 NumVpcsFound = 0
 NumRegions = 0
-print()
 fmt='%-20s %-15s %-21s %-20s %-12s %-10s'
-print(fmt % ("Account","Region","Vpc ID","CIDR","Is Default?","Vpc Name"))
-print(fmt % ("-------","------","------","----","-----------","--------"))
+Sink=Inventory_Modules.get_output_sink(pOutputFormat,["AccountId","Region","VpcId","CidrBlock","IsDefault","VpcName"],pOutputFile,fmt,("Account","Region","Vpc ID","CIDR","Is Default?","Vpc Name"))
+# Progress and summary lines go here, so they don't get mixed in with the rows when those are going to stdout
+Console=Sink.console
 RegionList=Inventory_Modules.get_ec2_regions(pRegionList,pProfile)
 SoughtAllProfiles=False
 AllChildAccounts=[]
@@ -112,9 +161,9 @@ if pProfile in ['all','ALL','All']:
 	# print(Fore.RED+"Doesn't yet work to specify 'all' profiles, since it takes a long time to go through and find only those profiles that either Org Masters, or stand-alone accounts",Fore.RESET)
 	# sys.exit(1)
 	SoughtAllProfiles=True
-	print("Since you specified 'all' profiles, we going to look through ALL of your profiles. Then we go through and determine which profiles represent the Master of an Organization and which are stand-alone accounts. This will enable us to go through all accounts you have access to for inventorying.")
+	print("Since you specified 'all' profiles, we going to look through ALL of your profiles. Then we go through and determine which profiles represent the Master of an Organization and which are stand-alone accounts. This will enable us to go through all accounts you have access to for inventorying.",file=Console)
 	logging.error("Time: %s",datetime.datetime.now())
-	ProfileList=Inventory_Modules.get_parent_profiles('all',SkipProfiles)
+	ProfileList=Inventory_Modules.get_parent_profiles('all',SkipProfiles,fFile=Console)
 	logging.error("Time: %s",datetime.datetime.now())
 	logging.error("Found %s root profiles",len(ProfileList))
 	# logging.info("Profiles Returned from function get_parent_profiles: %s",pProfile)
@@ -122,7 +171,7 @@ else:
 	ProfileList=[pProfile]
 
 for profile in ProfileList:
-	print(ERASE_LINE,"Gathering all account data from {} profile".format(profile),end="\r")
+	print(ERASE_LINE,"Gathering all account data from {} profile".format(profile),end="\r",file=Console)
 	# if not SoughtAllProfiles:
 	logging.info("Checking to see which profiles are root profiles")
 	ProfileIsRoot=Inventory_Modules.find_if_org_root(profile)
@@ -148,58 +197,41 @@ logging.info("# of Master Accounts: %s" % len(ProfileList))
 logging.info("# of Child Accounts: %s" % len(AllChildAccounts))
 
 
-for i in range(len(AllChildAccounts)):
-	aws_session = boto3.Session(profile_name=AllChildAccounts[i]['ParentProfile'])
-	sts_client = aws_session.client('sts')
-	logging.info("Connecting to account %s using Parent Profile %s:",AllChildAccounts[i]['AccountId'],AllChildAccounts[i]['ParentProfile'])
-	role_arn = "arn:aws:iam::{}:role/{}".format(AllChildAccounts[i]['AccountId'],AdminRole)
-	try:
-		account_credentials = sts_client.assume_role(
-			RoleArn=role_arn,
-			RoleSessionName="Find-Instances")['Credentials']
-		account_credentials['AccountNumber']=AllChildAccounts[i]['AccountId']
-	except ClientError as my_Error:
-		if str(my_Error).find("AuthFailure") > 0:
-			print("{}: Authorization Failure for account {}".format(AllChildAccounts[i]['ParentProfile'], AllChildAccounts[i]['AccountId']))
-		elif str(my_Error).find("AccessDenied") > 0:
-			print("{}: Access Denied Failure for account {}".format(AllChildAccounts[i]['ParentProfile'], AllChildAccounts[i]['AccountId']))
-			print(my_Error)
-		else:
-			print("{}: Other kind of failure for account {}".format(AllChildAccounts[i]['ParentProfile'], AllChildAccounts[i]['AccountId']))
-			print (my_Error)
-			break
-
-	# NumRegions += 1
-	# NumProfilesInvestigated = 0	# I only care about the last run - so I don't get profiles * regions.
-	for region in RegionList:
-		# NumProfilesInvestigated += 1
-		try:
-			Vpcs=Inventory_Modules.find_account_vpcs(account_credentials,region,pDefault)
-			VpcNum=len(Vpcs['Vpcs']) if Vpcs['Vpcs']==[] else 0
-			print(ERASE_LINE,"Looking in account "+Fore.RED+"{}".format(AllChildAccounts[i]['AccountId']),Fore.RESET+"in {} where we found {} {} Vpcs".format(region,VpcNum,vpctype),end='\r')
-		except ClientError as my_Error:
-			if str(my_Error).find("AuthFailure") > 0:
-				print(ERASE_LINE, "{} :Authorization Failure for account: {} in region {}".format(profile,AllChildAccounts[i]['AccountId'],region))
-		except TypeError as my_Error:
-			print(my_Error)
-			pass
-		if 'Vpcs' in Vpcs and len(Vpcs['Vpcs']) > 0:
-			for y in range(len(Vpcs['Vpcs'])):
-				VpcId=Vpcs['Vpcs'][y]['VpcId']
-				IsDefault=Vpcs['Vpcs'][y]['IsDefault']
-				CIDR=Vpcs['Vpcs'][y]['CidrBlock']
-				if 'Tags' in Vpcs['Vpcs'][y]:
-					for z in range(len(Vpcs['Vpcs'][y]['Tags'])):
-						if Vpcs['Vpcs'][y]['Tags'][z]['Key']=="Name":
-							VpcName=Vpcs['Vpcs'][y]['Tags'][z]['Value']
-				else:
-					VpcName="No name defined"
-				print(fmt % (Vpcs['Vpcs'][y]['OwnerId'],region,VpcId,CIDR,IsDefault,VpcName))
-				NumVpcsFound += 1
+if pProcesses > 1:
+	FanOut=functools.partial(Inventory_Modules.process_fan_out_finder, fProcesses=pProcesses, fAsync=pAsync)
+elif pAsync:
+	FanOut=Inventory_Modules.async_fan_out_finder
+else:
+	FanOut=Inventory_Modules.fan_out_finder
+for Finding in FanOut(AllChildAccounts,RegionList,Inventory_Modules.find_account_vpcs,fFinderArgs=(pDefault,),fWorkers=pWorkers,fService='ec2',fRoleList=[AdminRole]):
+	region=Finding['Region']
+	if Finding['Error'] is not None:
+		my_Error=Finding['Error']
+		if region is None:
+			print("{}: Failure getting into account {}".format(Finding['ParentProfile'],Finding['AccountId']),file=Console)
+			print(my_Error,file=Console)
+		elif str(my_Error).find("AuthFailure") > 0:
+			print(ERASE_LINE, "{} :Authorization Failure for account: {} in region {}".format(Finding['ParentProfile'],Finding['AccountId'],region),file=Console)
 		else:
-			continue
-
-print(ERASE_LINE)
-print("Found {} {} Vpcs across {} accounts across {} regions".format(NumVpcsFound,vpctype,len(AllChildAccounts),len(RegionList)))
-print()
-print("Thank you for using this script.")
+			print(my_Error,file=Console)
+		continue
+	Vpcs=Finding['Result']
+	VpcNum=len(Vpcs['Vpcs'])
+	print(ERASE_LINE,"Looking in account "+Fore.RED+"{}".format(Finding['AccountId']),Fore.RESET+"in {} where we found {} {} Vpcs".format(region,VpcNum,vpctype),end='\r',file=Console)
+	for y in range(len(Vpcs['Vpcs'])):
+		VpcId=Vpcs['Vpcs'][y]['VpcId']
+		IsDefault=Vpcs['Vpcs'][y]['IsDefault']
+		CIDR=Vpcs['Vpcs'][y]['CidrBlock']
+		VpcName="No name defined"
+		if 'Tags' in Vpcs['Vpcs'][y]:
+			for z in range(len(Vpcs['Vpcs'][y]['Tags'])):
+				if Vpcs['Vpcs'][y]['Tags'][z]['Key']=="Name":
+					VpcName=Vpcs['Vpcs'][y]['Tags'][z]['Value']
+		Sink.write({'AccountId':Vpcs['Vpcs'][y]['OwnerId'],'Region':region,'VpcId':VpcId,'CidrBlock':CIDR,'IsDefault':IsDefault,'VpcName':VpcName})
+		NumVpcsFound += 1
+
+Sink.close()
+print(ERASE_LINE,file=Console)
+print("Found {} {} Vpcs across {} accounts across {} regions".format(NumVpcsFound,vpctype,len(AllChildAccounts),len(RegionList)),file=Console)
+print(file=Console)
+print("Thank you for using this script.",file=Console)
@@ -0,0 +1,519 @@
+#!/usr/bin/env python3
+
+"""
+Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of
+this software and associated documentation files (the "Software"), to deal in
+the Software without restriction, including without limitation the rights to
+use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+the Software, and to permit persons to whom the Software is furnished to do so.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+"""
+Runs the Inventory_Modules finders and the main all_my_* scripts against a made-up Organization, without touching AWS
+(or the network at all), and reports the wall time, number of API calls and peak memory of each.
+
+Every botocore API call is answered in-process by the SyntheticOrg below, instead of being sent anywhere. Each call can
+be made to wait (--latency) and can be throttled (--throttle-rate); a throttled call is retried with backoff, the way
+botocore would, and fails with a Throttling error after MAX_ATTEMPTS.
+
+Use --save to keep the results, and --compare to fail (exit code 1) if anything got slower - or made more calls - than
+the saved results, by more than --tolerance.
+"""
+
+import os
+import sys
+import time
+import json
+import random
+import logging
+import argparse
+import tempfile
+import threading
+import contextlib
+import runpy
+import datetime
+
+parser = argparse.ArgumentParser(
+	description="Benchmark the inventory scripts against a synthetic Organization - no AWS account needed.",
+	prefix_chars='-+/')
+parser.add_argument(
+	"--accounts",
+	dest="pAccounts",
+	type=int,
+	default=20,
+	help="How many accounts in the Organization (including the management account). Default is 20.")
+parser.add_argument(
+	"--regions",
+	dest="pRegions",
+	type=int,
+	default=4,
+	help="How many regions are enabled. Default is 4.")
+parser.add_argument(
+	"--stacks",
+	dest="pStacks",
+	type=int,
+	default=10,
+	help="How many CloudFormation stacks in each account and region. Default is 10.")
+parser.add_argument(
+	"--instances",
+	dest="pInstances",
+	type=int,
+	default=10,
+	help="How many EC2 instances in each account and region. Default is 10.")
+parser.add_argument(
+	"--stacksets",
+	dest="pStackSets",
+	type=int,
+	default=5,
+	help="How many StackSets in the management account. Each has an instance in every account and region. Default is 5.")
+parser.add_argument(
+	"--latency",
+	dest="pLatency",
+	type=float,
+	default=0.02,
+	help="How long (in seconds) every API call takes. Default is 0.02.")
+parser.add_argument(
+	"--throttle-rate",
+	dest="pThrottleRate",
+	type=float,
+	default=0.0,
+	help="The chance (0 to 1) of any single API call being throttled. Default is 0.")
+parser.add_argument(
+	"--workers",
+	dest="pWorkers",
+	type=int,
+	default=10,
+	help="The number of workers for the scenarios that fan out. Default is 10.")
+parser.add_argument(
+	"-s", "--scenario",
+	dest="pScenarios",
+	nargs="*",
+	default=["all"],
+	help="Which scenarios to run (by name, or a fragment of the name). Default is all of them.")
+parser.add_argument(
+	"--warm",
+	dest="pWarm",
+	action="store_true",
+	help="Keep the client, credential and org caches between scenarios. By default each scenario starts cold.")
+parser.add_argument(
+	"--skip-memory",
+	dest="pSkipMemory",
+	action="store_true",
+	help="Don't measure peak memory. tracemalloc slows everything down, so use this when you only care about time.")
+parser.add_argument(
+	"--seed",
+	dest="pSeed",
+	type=int,
+	default=1,
+	help="Random seed for the throttling, so runs can be repeated.")
+parser.add_argument(
+	"--save",
+	dest="pSaveFile",
+	metavar="file name",
+	default=None,
+	help="Save the results (as json) to this file.")
+parser.add_argument(
+	"--compare",
+	dest="pCompareFile",
+	metavar="file name",
+	default=None,
+	help="Compare the results to those saved in this file, and exit with 1 if anything got worse.")
+parser.add_argument(
+	"--tolerance",
+	dest="pTolerance",
+	type=float,
+	default=0.25,
+	help="How much worse (as a fraction) a scenario can be than the saved results before --compare fails it. Default is 0.25.")
+parser.add_argument(
+	'-v',
+	help="Show the API calls made in each scenario",
+	action="store_const",
+	dest="loglevel",
+	const=logging.ERROR, # args.loglevel = 40
+	default=logging.CRITICAL) # args.loglevel = 50
+parser.add_argument(
+	'-d', '--debug',
+	help="Print LOTS of debugging statements",
+	action="store_const",
+	dest="loglevel",
+	const=logging.DEBUG,	# args.loglevel = 10
+	default=logging.CRITICAL) # args.loglevel = 50
+args = parser.parse_args()
+
+logging.basicConfig(level=args.loglevel, format="[%(filename)s:%(lineno)s:%(levelname)s - %(funcName)30s() ] %(message)s")
+
+MAX_ATTEMPTS = 5
+BACKOFF_BASE = 0.05
+REGION_NAMES = ['us-east-1', 'us-east-2', 'us-west-1', 'us-west-2', 'eu-west-1', 'eu-west-2', 'eu-west-3', 'eu-central-1',
+                'eu-north-1', 'ap-south-1', 'ap-northeast-1', 'ap-northeast-2', 'ap-northeast-3', 'ap-southeast-1',
+                'ap-southeast-2', 'ca-central-1', 'sa-east-1']
+ROOT_PROFILE = 'bench-root'
+ROOT_ACCESS_KEY = 'AKIABENCHROOT0000000'
+ADMIN_ROLES = ['AWSCloudFormationStackSetExecutionRole', 'OrganizationAccountAccessRole']
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class SyntheticOrg(object):
+	"""
+	Answers API calls for a made-up Organization. The management account is the first one.
+	Assumed-role credentials carry the account number in their access key, so each call knows which account it's for.
+	"""
+	def __init__(self, fAccounts, fRegions, fStacks, fInstances, fStackSets, fLatency, fThrottleRate, fSeed):
+		self.accounts = [str(100000000000 + x) for x in range(fAccounts)]
+		self.management_account = self.accounts[0]
+		self.regions = REGION_NAMES[:fRegions]
+		self.stacks = fStacks
+		self.instances = fInstances
+		self.stacksets = ["BenchStackSet-{}".format(x) for x in range(fStackSets)]
+		self.latency = fLatency
+		self.throttle_rate = fThrottleRate
+		self.random = random.Random(fSeed)
+		self.lock = threading.Lock()
+		self.calls = {}
+		self.throttled = 0
+
+	def reset_counters(self):
+		with self.lock:
+			self.calls = {}
+			self.throttled = 0
+
+	def account_for(self, fAccessKey):
+		if fAccessKey == ROOT_ACCESS_KEY:
+			return(self.management_account)
+		return(fAccessKey[4:16])
+
+	def call(self, fService, fRegion, fAccessKey, fOperation, fParams):
+		from botocore.exceptions import ClientError
+
+		for attempt in range(MAX_ATTEMPTS):
+			with self.lock:
+				self.calls[(fService, fOperation)] = self.calls.get((fService, fOperation), 0) + 1
+				Throttled = self.random.random() < self.throttle_rate
+				if Throttled:
+					self.throttled += 1
+			time.sleep(self.latency)
+			if not Throttled:
+				break
+			time.sleep(BACKOFF_BASE * (2 ** attempt))
+		else:
+			raise ClientError({'Error': {'Code': 'Throttling', 'Message': 'Rate exceeded'}}, fOperation)
+		Handler = getattr(self, "{}_{}".format(fService.replace('-', '_'), fOperation), None)
+		if Handler is None:
+			raise ClientError({'Error': {'Code': 'InvalidAction', 'Message': "The benchmark doesn't know how to answer {}:{}".format(fService, fOperation)}}, fOperation)
+		return(Handler(self.account_for(fAccessKey), fRegion, fParams))
+
+	def page(self, fItems, fParams, fResultKey, fDefaultPageSize):
+		Start = int(fParams.get('NextToken') or 0)
+		PageSize = fParams.get('MaxResults') or fParams.get('MaxItems') or fDefaultPageSize
+		response = {fResultKey: fItems[Start:Start+PageSize]}
+		if Start + PageSize < len(fItems):
+			response['NextToken'] = str(Start + PageSize)
+		return(response)
+
+	def enabled(self, fAccount, fRegion):
+		return(fAccount in self.accounts and fRegion in self.regions)
+
+	def sts_GetCallerIdentity(self, fAccount, fRegion, fParams):
+		return({'UserId': 'AIDABENCH', 'Account': fAccount, 'Arn': "arn:aws:iam::{}:user/bench".format(fAccount)})
+
+	def sts_AssumeRole(self, fAccount, fRegion, fParams):
+		from botocore.exceptions import ClientError
+
+		TargetAccount = fParams['RoleArn'].split(':')[4]
+		RoleName = fParams['RoleArn'].split('/')[-1]
+		if TargetAccount not in self.accounts or RoleName not in ADMIN_ROLES:
+			raise ClientError({'Error': {'Code': 'AccessDenied', 'Message': "Not authorized to assume {}".format(fParams['RoleArn'])}}, 'AssumeRole')
+		return({'Credentials': {
+			'AccessKeyId': "ASIA{}XXXX".format(TargetAccount),
+			'SecretAccessKey': 'bench',
+			'SessionToken': 'bench',
+			'Expiration': datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)}})
+
+	def organizations_DescribeOrganization(self, fAccount, fRegion, fParams):
+		return({'Organization': {
+			'Id': 'o-benchmark0',
+			'Arn': "arn:aws:organizations::{0}:organization/o-benchmark0".format(self.management_account),
+			'FeatureSet': 'ALL',
+			'MasterAccountArn': "arn:aws:organizations::{0}:account/o-benchmark0/{0}".format(self.management_account),
+			'MasterAccountId': self.management_account,
+			'MasterAccountEmail': "{}@example.com".format(self.management_account),
+			'AvailablePolicyTypes': []}})
+
+	def organizations_ListAccounts(self, fAccount, fRegion, fParams):
+		Accounts = [{'Id': account, 'Email': "{}@example.com".format(account), 'Name': "Account {}".format(account), 'Status': 'ACTIVE'} for account in self.accounts]
+		return(self.page(Accounts, fParams, 'Accounts', 20))
+
+	def ec2_DescribeRegions(self, fAccount, fRegion, fParams):
+		return({'Regions': [{'RegionName': region, 'Endpoint': "ec2.{}.amazonaws.com".format(region), 'OptInStatus': 'opt-in-not-required'} for region in self.regions]})
+
+	def ec2_DescribeInstances(self, fAccount, fRegion, fParams):
+		Reservations = []
+		if self.enabled(fAccount, fRegion):
+			for x in range(self.instances):
+				Reservations.append({'ReservationId': "r-{}{:04d}".format(fAccount, x), 'OwnerId': fAccount, 'Instances': [{
+					'InstanceId': "i-{}{}{:04d}".format(fAccount, self.regions.index(fRegion), x),
+					'InstanceType': 't3.micro',
+					'PublicDnsName': '',
+					'State': {'Code': 16, 'Name': 'running' if x % 2 == 0 else 'stopped'},
+					'Tags': [{'Key': 'Name', 'Value': "bench-{}".format(x)}]}]})
+		for Filter in fParams.get('Filters', []):
+			if Filter['Name'] == 'instance-state-name':
+				Reservations = [reservation for reservation in Reservations if reservation['Instances'][0]['State']['Name'] in Filter['Values']]
+		return(self.page(Reservations, fParams, 'Reservations', 1000))
+
+	def ec2_DescribeVpcs(self, fAccount, fRegion, fParams):
+		Vpcs = []
+		if self.enabled(fAccount, fRegion):
+			Vpcs.append({'VpcId': "vpc-{}{}".format(fAccount, self.regions.index(fRegion)), 'OwnerId': fAccount, 'CidrBlock': '172.31.0.0/16', 'IsDefault': True})
+		return(self.page(Vpcs, fParams, 'Vpcs', 1000))
+
+	def s3_ListBuckets(self, fAccount, fRegion, fParams):
+		return({'Buckets': []})
+
+	def cloudformation_ListStacks(self, fAccount, fRegion, fParams):
+		Stacks = []
+		if self.enabled(fAccount, fRegion):
+			for x in range(self.stacks):
+				StackName = "BenchStack-{}".format(x)
+				Stack = {
+					'StackId': "arn:aws:cloudformation:{}:{}:stack/{}/{:08d}".format(fRegion, fAccount, StackName, x),
+					'StackName': StackName,
+					'CreationTime': datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc),
+					'StackStatus': 'CREATE_COMPLETE'}
+				if not fParams.get('StackStatusFilter') or Stack['StackStatus'] in fParams['StackStatusFilter']:
+					Stacks.append(Stack)
+		return(self.page(Stacks, fParams, 'StackSummaries', 100))
+
+	def cloudformation_ListStackSets(self, fAccount, fRegion, fParams):
+		StackSets = []
+		if fAccount == self.management_account:
+			StackSets = [{'StackSetName': name, 'StackSetId': "{}:{:08d}".format(name, x), 'Status': 'ACTIVE'} for x, name in enumerate(self.stacksets)]
+		return(self.page(StackSets, fParams, 'Summaries', 100))
+
+	def cloudformation_ListStackInstances(self, fAccount, fRegion, fParams):
+		Instances = []
+		if fAccount == self.management_account and fParams['StackSetName'] in self.stacksets:
+			for account in self.accounts:
+				for region in self.regions:
+					Instances.append({'StackSetId': fParams['StackSetName'], 'Region': region, 'Account': account, 'Status': 'CURRENT', 'StatusReason': ''})
+		return(self.page(Instances, fParams, 'Summaries', 100))
+
+
+def install_backend(fOrg):
+	"""
+	Sends every botocore API call to fOrg, instead of over the network.
+	"""
+	import Inventory_Modules
+	from botocore.client import BaseClient
+
+	def _make_api_call(self, operation_name, api_params):
+		AccessKey = self._request_signer._credentials.get_frozen_credentials().access_key
+		return(fOrg.call(self.meta.service_model.endpoint_prefix, self.meta.region_name, AccessKey, operation_name, api_params))
+
+	BaseClient._make_api_call = _make_api_call
+	# aiobotocore clients would go out over the network, so the async fan-out always uses the (sync) finders in threads
+	Inventory_Modules.get_aio_session = lambda: None
+
+
+def write_aws_config(fDirectory):
+	"""
+	Points boto3 at config and credentials files that only know about the benchmark profiles.
+	"""
+	ConfigFile = os.path.join(fDirectory, 'config')
+	CredentialsFile = os.path.join(fDirectory, 'credentials')
+	with open(ConfigFile, 'w') as f:
+		for profile in ['default', ROOT_PROFILE]:
+			f.write("[{}]\nregion = us-east-1\n\n".format('default' if profile == 'default' else "profile {}".format(profile)))
+	with open(CredentialsFile, 'w') as f:
+		for profile in ['default', ROOT_PROFILE]:
+			f.write("[{}]\naws_access_key_id = {}\naws_secret_access_key = bench\n\n".format(profile, ROOT_ACCESS_KEY))
+	os.environ['AWS_CONFIG_FILE'] = ConfigFile
+	os.environ['AWS_SHARED_CREDENTIALS_FILE'] = CredentialsFile
+	os.environ['AWS_DEFAULT_REGION'] = 'us-east-1'
+	for variable in ['AWS_PROFILE', 'AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY', 'AWS_SESSION_TOKEN']:
+		os.environ.pop(variable, None)
+
+
+def reset_caches():
+	"""
+	Forgets every client, session, credential, org detail, enabled region and failure Inventory_Modules has picked up, so the next scenario starts cold.
+	"""
+	import Inventory_Modules
+
+	with Inventory_Modules._client_cache_lock:
+		Inventory_Modules._client_cache.clear()
+		Inventory_Modules._session_cache.clear()
+	Inventory_Modules.clear_credential_cache()
+	Inventory_Modules.invalidate_org_snapshot()
+	Inventory_Modules.invalidate_enabled_regions()
+	Inventory_Modules.clear_access_failures()
+
+
+def run_script(fScript, fArgs):
+	"""
+	Runs one of the scripts in this process (so it uses the synthetic backend), with its output thrown away.
+	"""
+	SavedArgv = sys.argv
+	sys.argv = [os.path.join(SCRIPT_DIR, fScript)] + fArgs
+	try:
+		with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+			runpy.run_path(sys.argv[0], run_name='__main__')
+	except SystemExit:
+		pass
+	finally:
+		sys.argv = SavedArgv
+
+
+def get_scenarios(fOrg, fWorkers):
+	"""
+	Returns a list of (name, function) for everything we know how to measure.
+	"""
+	import Inventory_Modules
+
+	def child_accounts():
+		return(Inventory_Modules.find_child_accounts2(ROOT_PROFILE))
+
+	def child_access():
+		for account in child_accounts():
+			Inventory_Modules.get_child_access2(ROOT_PROFILE, account['AccountId'])
+
+	def fan_out(fFinder, fFanOut=Inventory_Modules.fan_out_finder, fFinderKwargs=None):
+		def scenario():
+			for Finding in fFanOut(child_accounts(), fOrg.regions, fFinder, fFinderKwargs=fFinderKwargs, fWorkers=fWorkers, fRoleList=ADMIN_ROLES):
+				pass
+		return(scenario)
+
+	def stack_instances():
+		for stackset in Inventory_Modules.find_stacksets(ROOT_PROFILE, 'us-east-1', ['all']):
+			Inventory_Modules.find_stack_instances(ROOT_PROFILE, 'us-east-1', stackset['StackSetName'])
+
+	def script(fScript, fArgs):
+		return(lambda: run_script(fScript, fArgs))
+
+	Regions = list(fOrg.regions)
+	return([
+		('find_child_accounts2', child_accounts),
+		('get_child_access2', child_access),
+		('fan_out:find_account_instances', fan_out(Inventory_Modules.find_account_instances)),
+		('fan_out:filtered_instances', fan_out(Inventory_Modules.find_account_instances, fFinderKwargs={
+			'fFilters': Inventory_Modules.get_instance_filters(['running']), 'fFields': Inventory_Modules.INSTANCE_SUMMARY_FIELDS})),
+		('fan_out:find_account_vpcs', fan_out(Inventory_Modules.find_account_vpcs)),
+		('fan_out:find_stacks_in_acct', fan_out(Inventory_Modules.find_stacks_in_acct)),
+		('async_fan_out:find_account_instances', fan_out(Inventory_Modules.find_account_instances, Inventory_Modules.async_fan_out_finder)),
+		('find_stack_instances', stack_instances),
+		('all_my_instances.py', script('all_my_instances.py', ['-p', ROOT_PROFILE, '-r'] + Regions + ['--workers', str(fWorkers)])),
+		('all_my_vpcs2.py', script('all_my_vpcs2.py', ['-p', ROOT_PROFILE, '-r'] + Regions + ['--workers', str(fWorkers)])),
+		('all_my_cfnstacks.py', script('all_my_cfnstacks.py', ['-p', ROOT_PROFILE, '-r'] + Regions)),
+		('all_my_orgs.py', script('all_my_orgs.py', ['-p', ROOT_PROFILE])),
+	])
+
+
+def measure(fOrg, fFunction, fMemory):
+	import tracemalloc
+
+	fOrg.reset_counters()
+	if fMemory:
+		tracemalloc.start()
+	Error = None
+	StartTime = time.perf_counter()
+	try:
+		fFunction()
+	except Exception as my_Error:
+		Error = "{}: {}".format(type(my_Error).__name__, my_Error)
+	WallTime = time.perf_counter() - StartTime
+	PeakMemory = None
+	if fMemory:
+		PeakMemory = tracemalloc.get_traced_memory()[1]
+		tracemalloc.stop()
+	with fOrg.lock:
+		Calls = dict(fOrg.calls)
+		Throttled = fOrg.throttled
+	return({'WallTime': WallTime,
+	        'ApiCalls': sum(Calls.values()),
+	        'Throttled': Throttled,
+	        'PeakMemory': PeakMemory,
+	        'Calls': {"{}:{}".format(service, operation): count for (service, operation), count in sorted(Calls.items())},
+	        'Error': Error})
+
+
+def compare_results(fResults, fBaseline, fTolerance):
+	"""
+	Returns a list of what got worse than the baseline, by more than fTolerance.
+	"""
+	Regressions = []
+	for name in fResults:
+		if name not in fBaseline:
+			continue
+		for measurement in ['WallTime', 'ApiCalls', 'PeakMemory']:
+			Now = fResults[name][measurement]
+			Before = fBaseline[name][measurement]
+			if Now is None or Before is None:
+				continue
+			if Now > Before * (1 + fTolerance):
+				Regressions.append("{} {}: {} -> {}".format(name, measurement, Before, Now))
+	return(Regressions)
+
+
+##########################
+
+TempDir = tempfile.mkdtemp(prefix='inventory-benchmark-')
+write_aws_config(TempDir)
+# Keep the credential, org and inventory caches away from the real ones
+os.environ['INVENTORY_SCRIPTS_CACHE_DIR'] = os.path.join(TempDir, 'cache')
+os.environ.pop('INVENTORY_CREDENTIAL_CACHE', None)
+sys.path.insert(0, SCRIPT_DIR)
+
+import Inventory_Modules
+
+Org = SyntheticOrg(args.pAccounts, args.pRegions, args.pStacks, args.pInstances, args.pStackSets, args.pLatency, args.pThrottleRate, args.pSeed)
+install_backend(Org)
+Scenarios = [(name, function) for name, function in get_scenarios(Org, args.pWorkers)
+             if "all" in args.pScenarios or any(name.find(fragment) >= 0 for fragment in args.pScenarios)]
+
+print()
+print("Synthetic Organization: {} accounts, {} regions, {} stacks and {} instances per account/ region, {} StackSets".format(
+	len(Org.accounts), len(Org.regions), Org.stacks, Org.instances, len(Org.stacksets)))
+print("Each call takes {}s, with a {:.0%} chance of being throttled. {} workers.".format(args.pLatency, args.pThrottleRate, args.pWorkers))
+print()
+fmt='%-34s %10s %10s %10s %12s'
+print(fmt % ("Scenario", "Wall (s)", "API calls", "Throttled", "Peak (MB)"))
+print(fmt % ("--------", "--------", "---------", "---------", "---------"))
+Results = {}
+for name, function in Scenarios:
+	if not args.pWarm:
+		reset_caches()
+	Results[name] = measure(Org, function, not args.pSkipMemory)
+	Result = Results[name]
+	print(fmt % (name, "{:.3f}".format(Result['WallTime']), Result['ApiCalls'], Result['Throttled'],
+	             "-" if Result['PeakMemory'] is None else "{:.1f}".format(Result['PeakMemory'] / 1024 / 1024)))
+	if Result['Error'] is not None:
+		print("\tFailed: {}".format(Result['Error']))
+	if args.loglevel < 50:
+		for call in Result['Calls']:
+			print("\t%-50s %s" % (call, Result['Calls'][call]))
+print()
+
+if args.pSaveFile is not None:
+	with open(args.pSaveFile, 'w') as f:
+		json.dump({'Parameters': vars(args), 'Results': Results}, f, indent=2, default=str)
+	print("Saved the results to {}".format(args.pSaveFile))
+
+if args.pCompareFile is not None:
+	with open(args.pCompareFile) as f:
+		Baseline = json.load(f)['Results']
+	Regressions = compare_results(Results, Baseline, args.pTolerance)
+	if Regressions:
+		print("These got worse by more than {:.0%}:".format(args.pTolerance))
+		for regression in Regressions:
+			print("\t{}".format(regression))
+		sys.exit(1)
+	print("Nothing got worse by more than {:.0%} compared to {}".format(args.pTolerance, args.pCompareFile))
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+
+"""
+Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of
+this software and associated documentation files (the "Software"), to deal in
+the Software without restriction, including without limitation the rights to
+use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+the Software, and to permit persons to whom the Software is furnished to do so.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+"""
+Measures how long each script takes to start - each one is run with "--help" in a brand new interpreter, so this is the
+time to import everything it imports at the top and parse its arguments. A few more scenarios show where that time goes:
+importing Inventory_Modules, importing boto3, making the first client, and CT_CheckAccount.py --explain.
+
+Nothing talks to AWS. Every scenario is run --runs times, and the fastest and median times are reported.
+Anything with a median over --budget seconds is flagged, and makes the script exit with 1.
+
+Use --save to keep the results, and --compare to fail (exit code 1) if anything got slower than the saved results, by
+more than --tolerance.
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+parser = argparse.ArgumentParser(
+	description="Measure the cold-start time of each of the scripts.",
+	prefix_chars='-+/')
+parser.add_argument(
+	"-s", "--scenario",
+	dest="pScenarios",
+	nargs="*",
+	default=["all"],
+	help="Which scenarios to run (by name, or a fragment of the name). Default is all of them.")
+parser.add_argument(
+	"--runs",
+	dest="pRuns",
+	type=int,
+	default=5,
+	help="How many times to run each scenario. Default is 5.")
+parser.add_argument(
+	"--budget",
+	dest="pBudget",
+	type=float,
+	default=1.0,
+	help="The most (in seconds) any scenario should take to start. Default is 1.0.")
+parser.add_argument(
+	"--save",
+	dest="pSaveFile",
+	metavar="file name",
+	default=None,
+	help="Save the results (as json) to this file.")
+parser.add_argument(
+	"--compare",
+	dest="pCompareFile",
+	metavar="file name",
+	default=None,
+	help="Compare the results to those saved in this file, and exit with 1 if anything got slower.")
+parser.add_argument(
+	"--tolerance",
+	dest="pTolerance",
+	type=float,
+	default=0.25,
+	help="How much slower (as a fraction) a scenario can be than the saved results before --compare fails it. Default is 0.25.")
+args = parser.parse_args()
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# These aren't scripts you'd run, or they're this benchmark
+NOT_SCRIPTS = ['Inventory_Modules.py', 'benchmark_inventory.py', 'benchmark_startup.py']
+TIMEOUT = 60
+
+
+def get_scenarios():
+	"""
+	Returns a list of (name, arguments to python) for everything we know how to measure.
+	"""
+	Scenarios = [
+		('python', ['-c', 'pass']),
+		('import Inventory_Modules', ['-c', 'import Inventory_Modules']),
+		('import boto3', ['-c', 'import boto3']),
+		('first client', ['-c', "import Inventory_Modules; Inventory_Modules.get_client('sts', 'us-east-1')"]),
+		('CT_CheckAccount.py --explain', ['CT_CheckAccount.py', '--explain']),
+	]
+	for script in sorted(glob.glob(os.path.join(SCRIPT_DIR, '*.py'))):
+		if os.path.basename(script) in NOT_SCRIPTS:
+			continue
+		Scenarios.append(("{} --help".format(os.path.basename(script)), [os.path.basename(script), '--help']))
+	return(Scenarios)
+
+
+def get_environment(fDirectory):
+	"""
+	Returns the environment to run everything in - made-up credentials, and no config files, so nothing goes looking for
+	(or finds) a real account.
+	"""
+	Environment = dict(os.environ)
+	Environment.update({
+		'AWS_ACCESS_KEY_ID': 'AKIASTARTUP000000000',
+		'AWS_SECRET_ACCESS_KEY': 'startup',
+		'AWS_DEFAULT_REGION': 'us-east-1',
+		'AWS_CONFIG_FILE': os.path.join(fDirectory, 'config'),
+		'AWS_SHARED_CREDENTIALS_FILE': os.path.join(fDirectory, 'credentials'),
+		'AWS_EC2_METADATA_DISABLED': 'true',
+		'INVENTORY_SCRIPTS_CACHE_DIR': os.path.join(fDirectory, 'cache'),
+		'PYTHONPATH': SCRIPT_DIR,
+	})
+	Environment.pop('AWS_PROFILE', None)
+	Environment.pop('AWS_SESSION_TOKEN', None)
+	return(Environment)
+
+
+def measure(fArguments, fEnvironment, fRuns):
+	"""
+	Runs python with fArguments fRuns times, and returns the fastest and median wall times - and the last line of the
+	traceback if it ever crashed (like when something it imports isn't installed), since then the times mean nothing.
+	"""
+	Times = []
+	Error = None
+	for x in range(fRuns):
+		StartTime = time.perf_counter()
+		try:
+			Process = subprocess.run([sys.executable] + fArguments, cwd=SCRIPT_DIR, env=fEnvironment, stdin=subprocess.DEVNULL,
+			                         stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=TIMEOUT)
+			if b'Traceback' in Process.stderr:
+				Error = Process.stderr.decode(errors='replace').strip().splitlines()[-1]
+		except subprocess.TimeoutExpired:
+			Error = "Timed out after {} seconds - it's probably waiting on something other than its arguments".format(TIMEOUT)
+		Times.append(time.perf_counter() - StartTime)
+	Times.sort()
+	return({'Fastest': Times[0],
+	        'Median': Times[len(Times) // 2],
+	        'Error': Error})
+
+
+def compare_results(fResults, fBaseline, fTolerance):
+	"""
+	Returns a list of what got slower than the baseline, by more than fTolerance.
+	"""
+	Regressions = []
+	for name in fResults:
+		if name not in fBaseline:
+			continue
+		Now = fResults[name]['Median']
+		Before = fBaseline[name]['Median']
+		if Now > Before * (1 + fTolerance):
+			Regressions.append("{}: {:.3f}s -> {:.3f}s".format(name, Before, Now))
+	return(Regressions)
+
+
+##########################
+
+TempDir = tempfile.mkdtemp(prefix='inventory-startup-')
+Environment = get_environment(TempDir)
+Scenarios = [(name, arguments) for name, arguments in get_scenarios()
+             if "all" in args.pScenarios or any(name.find(fragment) >= 0 for fragment in args.pScenarios)]
+
+print()
+print("Running each scenario {} times, in a new interpreter each time. The budget is {}s.".format(args.pRuns, args.pBudget))
+print()
+fmt='%-56s %12s %12s %10s'
+print(fmt % ("Scenario", "Fastest (s)", "Median (s)", "Budget"))
+print(fmt % ("--------", "-----------", "----------", "------"))
+Results = {}
+OverBudget = []
+for name, arguments in Scenarios:
+	Results[name] = measure(arguments, Environment, max(1, args.pRuns))
+	Result = Results[name]
+	if Result['Median'] > args.pBudget:
+		OverBudget.append(name)
+	print(fmt % (name, "{:.3f}".format(Result['Fastest']), "{:.3f}".format(Result['Median']),
+	             "OVER" if name in OverBudget else "ok"))
+	if Result['Error'] is not None:
+		print("\tFailed: {}".format(Result['Error']))
+print()
+
+if args.pSaveFile is not None:
+	with open(args.pSaveFile, 'w') as f:
+		json.dump({'Parameters': vars(args), 'Results': Results}, f, indent=2, default=str)
+	print("Saved the results to {}".format(args.pSaveFile))
+
+ExitCode = 0
+if OverBudget:
+	print("These took longer than {}s to start:".format(args.pBudget))
+	for name in OverBudget:
+		print("\t{}".format(name))
+	ExitCode = 1
+
+if args.pCompareFile is not None:
+	with open(args.pCompareFile) as f:
+		Baseline = json.load(f)['Results']
+	Regressions = compare_results(Results, Baseline, args.pTolerance)
+	if Regressions:
+		print("These got slower by more than {:.0%}:".format(args.pTolerance))
+		for regression in Regressions:
+			print("\t{}".format(regression))
+		ExitCode = 1
+	else:
+		print("Nothing got slower by more than {:.0%} compared to {}".format(args.pTolerance, args.pCompareFile))
+sys.exit(ExitCode)
@@ -130,28 +130,16 @@ all_config_resources=[]
 
 print("Searching {} accounts and {} regions".format(len(ChildAccounts),len(cfg_regions)))
 
-sts_session = boto3.Session(profile_name=pProfile)
-sts_client = sts_session.client('sts')
-for account in ChildAccounts:
-	role_arn = "arn:aws:iam::{}:role/{}".format(account['AccountId'],adminrolename)
-	logging.info("Role ARN: %s" % role_arn)
-	try:
-		account_credentials = sts_client.assume_role(
-			RoleArn=role_arn,
-			RoleSessionName="Find-Enable-Config-Resources")['Credentials']
-	except ClientError as my_Error:
-		if str(my_Error).find("AuthFailure") > 0:
-			print(profile+": Authorization Failure for account {}".format(account['AccountId']))
+# The roles are all assumed up front (in parallel), and each account is checked as soon as its credentials are ready
+for account, account_credentials in Inventory_Modules.prefetch_credentials(ChildAccounts, fRoleList=[adminrolename]):
+	if account_credentials is None:
+		print(pProfile+": Authorization Failure for account {}".format(account['AccountId']))
+		continue
 	for region in cfg_regions:
-		session_aws=boto3.Session(
-			aws_access_key_id=account_credentials['AccessKeyId'],
-			aws_secret_access_key=account_credentials['SecretAccessKey'],
-			aws_session_token=account_credentials['SessionToken'],
-			region_name=region)
-		client_cfg=session_aws.client('config')
-		client_sns=session_aws.client('sns')
-		client_lam=session_aws.client('lambda')
-		client_cwl=session_aws.client('logs')
+		client_cfg=Inventory_Modules.get_client('config', region, account_credentials)
+		client_sns=Inventory_Modules.get_client('sns', region, account_credentials)
+		client_lam=Inventory_Modules.get_client('lambda', region, account_credentials)
+		client_cwl=Inventory_Modules.get_client('logs', region, account_credentials)
 		## List Configuration_Recorders
 		print(ERASE_LINE,"Trying account {} in region {}".format(account['AccountId'],region),end='\r')
 		try: # Looking for Configuration Recorders
@@ -165,9 +153,7 @@ for account in ChildAccounts:
 						'AccountId':account['AccountId'],
 						'Region':region,
 						'ResourceName':response['ConfigurationRecorders'][i]['name'],
-						'AccessKeyId':account_credentials['AccessKeyId'],
-						'SecretAccessKey':account_credentials['SecretAccessKey'],
-						'SessionToken':account_credentials['SessionToken']
+						'Credentials':account_credentials
 					})
 					logging.info("Found another config recorder %s in account %s in region %s bringing the total found to %s ", str(response['ConfigurationRecorders'][i]['name']), account['AccountId'], region, str(NumObjectsFound))
 			else:
@@ -185,9 +171,7 @@ for account in ChildAccounts:
 					'AccountId':account['AccountId'],
 					'Region':region,
 					'ResourceName':response['DeliveryChannels'][0]['name'],
-					'AccessKeyId':account_credentials['AccessKeyId'],
-					'SecretAccessKey':account_credentials['SecretAccessKey'],
-					'SessionToken':account_credentials['SessionToken']
+					'Credentials':account_credentials
 				})
 				logging.info("Found another delivery channel %s in account %s in region %s bringing the total found to %s ", str(response['DeliveryChannels'][i]['name']), account['AccountId'], region, str(NumObjectsFound))
 			else:
@@ -206,9 +190,7 @@ for account in ChildAccounts:
 							'AccountId':account['AccountId'],
 							'Region':region,
 							'ResourceName':response['Topics'][i]['TopicArn'],
-							'AccessKeyId':account_credentials['AccessKeyId'],
-							'SecretAccessKey':account_credentials['SecretAccessKey'],
-							'SessionToken':account_credentials['SessionToken']
+							'Credentials':account_credentials
 						})
 						logging.info("Found another SNS Topic Arn %s in account %s in region %s bringing the total resources found to %s ", str(response['Topics'][i]['TopicArn']), account['AccountId'], region, str(NumObjectsFound))
 			else:
@@ -227,9 +209,7 @@ for account in ChildAccounts:
 							'AccountId':account['AccountId'],
 							'Region':region,
 							'ResourceName':response['Functions'][i]['FunctionName'],
-							'AccessKeyId':account_credentials['AccessKeyId'],
-							'SecretAccessKey':account_credentials['SecretAccessKey'],
-							'SessionToken':account_credentials['SessionToken']
+							'Credentials':account_credentials
 						})
 						logging.info("Found another Lambda Function %s in account %s in region %s bringing the total resources found to %s ", str(response['Functions'][i]['FunctionName']), account['AccountId'], region, str(NumObjectsFound))
 			else:
@@ -248,9 +228,7 @@ for account in ChildAccounts:
 							'AccountId':account['AccountId'],
 							'Region':region,
 							'ResourceName':response['logGroups'][i]['logGroupName'],
-							'AccessKeyId':account_credentials['AccessKeyId'],
-							'SecretAccessKey':account_credentials['SecretAccessKey'],
-							'SessionToken':account_credentials['SessionToken']
+							'Credentials':account_credentials
 						})
 						logging.info("Found another SNS Topic Arn %s in account %s in region %s bringing the total resources found to %s ", str(response['logGroups'][i]['logGroupName']), account['AccountId'], region, str(NumObjectsFound))
 			else:
@@ -273,14 +251,9 @@ print()
 
 ###############
 def delete_resources(fResource):
-	session_aws_child=boto3.Session(
-		aws_access_key_id=fResource['AccessKeyId'],
-		aws_secret_access_key=fResource['SecretAccessKey'],
-		aws_session_token=fResource['SessionToken'],
-		region_name=fResource['Region'])
 	if fResource['Type']=='Config Recorder':
 		try:
-			client_cfg=session_aws_child.client('config')
+			client_cfg=Inventory_Modules.get_client('config', fResource['Region'], fResource['Credentials'])
 			Output=client_cfg.delete_configuration_recorder(
 				ConfigurationRecorderName=fResource['ResourceName'])
 		except Exception as e:
@@ -290,7 +263,7 @@ def delete_resources(fResource):
 			sys.exit(9)
 	elif fResource['Type']=='Delivery Channel':
 		try:
-			client_cfg=session_aws_child.client('config')
+			client_cfg=Inventory_Modules.get_client('config', fResource['Region'], fResource['Credentials'])
 			Output=client_cfg.delete_delivery_channel(
 				DeliveryChannelName=fResource['ResourceName'])
 		except Exception as e:
@@ -300,7 +273,7 @@ def delete_resources(fResource):
 			sys.exit(9)
 	elif fResource['Type']=='SNS Topic':
 		try:
-			client_sns=session_aws_child.client('sns')
+			client_sns=Inventory_Modules.get_client('sns', fResource['Region'], fResource['Credentials'])
 			Output=client_sns.delete_topic(TopicArn=fResource['ResourceName'])
 		except Exception as e:
 			logging.error("Problem with account %s in region %s",fResource['AccountId'],fResource['Region'])
@@ -309,7 +282,7 @@ def delete_resources(fResource):
 			sys.exit(9)
 	elif fResource['Type']=='Lambda Function':
 		try:
-			client_lam=session_aws_child.client('lambda')
+			client_lam=Inventory_Modules.get_client('lambda', fResource['Region'], fResource['Credentials'])
 			Output=client_lam.delete_function(FunctionName=fResource['ResourceName'])
 		except Exception as e:
 			logging.error("Problem with account %s in region %s",fResource['AccountId'],fResource['Region'])
@@ -318,7 +291,7 @@ def delete_resources(fResource):
 			sys.exit(9)
 	elif fResource['Type']=='Log Group':
 		try:
-			client_cwl=session_aws_child.client('logs')
+			client_cwl=Inventory_Modules.get_client('logs', fResource['Region'], fResource['Credentials'])
 			Output=client_cwl.delete_log_group(
 				logGroupName=fResource['ResourceName'])
 		except Exception as e:
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+
+"""
+Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of
+this software and associated documentation files (the "Software"), to deal in
+the Software without restriction, including without limitation the rights to
+use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+the Software, and to permit persons to whom the Software is furnished to do so.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+"""
+Runs until it's told to stop, answering inventory queries over a Unix socket (see inventory_query.py for the client).
+Sessions, clients and credentials stay warm between queries, and whatever was found is kept for --ttl seconds - so a
+query that's already been answered once comes back in milliseconds, instead of a full sweep of the Organization.
+
+A request is one line of json, like:
+	{"Query": "instances", "Profile": "LZRoot", "Account": "123456789012", "Region": "us-east", "Fragment": "web"}
+Query is one of QUERIES (or 'status' or 'shutdown'). Profile defaults to the one the daemon was started with.
+Account, Region and Fragment narrow down what comes back - Region and Fragment match any part of the name.
+"Refresh": true looks again, even if what we have isn't stale yet. For stacks, "Status" works like it does for
+all_my_cfnstacks.py ('active' by default).
+
+The response is one line of json:
+	{"Columns": [...], "Rows": [{...}, ...], "Age": <seconds since we looked>, "Failures": <accounts/ regions we couldn't see>, "Error": null}
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+import socketserver
+import Inventory_Modules
+
+parser = argparse.ArgumentParser(
+	description="Keep the inventory warm in memory, and answer queries about it over a local socket.",
+	prefix_chars='-+')	# Not '/', since --socket takes a path
+parser.add_argument(
+	"-p", "--profile",
+	dest="pProfile",
+	metavar="profile to use",
+	default=None,
+	help="The profile queries use when they don't name one. Default is your default credentials.")
+parser.add_argument(
+	"-r", "--region",
+	nargs="*",
+	dest="pRegionList",
+	metavar="region name string",
+	default=["all"],
+	help="String fragment of the region(s) to keep an inventory of. Default is all of them.")
+parser.add_argument(
+	"--ttl",
+	dest="pTTL",
+	type=int,
+	default=300,
+	help="How long (in seconds) to keep answering from what we've already found, before looking again. Default is 300.")
+parser.add_argument(
+	"--workers",
+	dest="pWorkers",
+	metavar="number of threads",
+	type=int,
+	default=10,
+	help="How many accounts/ regions to check at the same time, when we have to look. Default is 10.")
+parser.add_argument(
+	"--socket",
+	dest="pSocket",
+	metavar="file name",
+	default=Inventory_Modules.DAEMON_SOCKET,
+	help="Where to put the socket. Default is {}".format(Inventory_Modules.DAEMON_SOCKET))
+parser.add_argument(
+	"--warm",
+	dest="pWarm",
+	nargs="*",
+	metavar="query",
+	default=None,
+	help="Look for these (or everything, if none are listed) as soon as we start, instead of waiting to be asked.")
+parser.add_argument(
+	'-v',
+	help="Be verbose",
+	action="store_const",
+	dest="loglevel",
+	const=logging.ERROR, # args.loglevel = 40
+	default=logging.CRITICAL) # args.loglevel = 50
+parser.add_argument(
+	'-vv', '--verbose',
+	help="Be MORE verbose",
+	action="store_const",
+	dest="loglevel",
+	const=logging.WARNING, # args.loglevel = 30
+	default=logging.CRITICAL) # args.loglevel = 50
+parser.add_argument(
+	'-vvv',
+	help="Print INFO level",
+	action="store_const",
+	dest="loglevel",
+	const=logging.INFO,	# args.loglevel = 20
+	default=logging.CRITICAL) # args.loglevel = 50
+parser.add_argument(
+	'-d', '--debug',
+	help="Print LOTS of debugging statements",
+	action="store_const",
+	dest="loglevel",
+	const=logging.DEBUG,	# args.loglevel = 10
+	default=logging.CRITICAL) # args.loglevel = 50
+args = parser.parse_args()
+
+pProfile=args.pProfile
+pRegionList=args.pRegionList
+pTTL=args.pTTL
+pWorkers=args.pWorkers
+pSocket=args.pSocket
+logging.basicConfig(level=args.loglevel, format="[%(filename)s:%(lineno)s:%(levelname)s - %(funcName)30s() ] %(message)s")
+Inventory_Modules.preload_service_models(['sts', 'organizations', 'ec2', 'cloudformation'])
+
+
+def get_tag(fTags, fKey, fDefault):
+	for tag in fTags or []:
+		if tag['Key'] == fKey:
+			return(tag['Value'])
+	return(fDefault)
+
+
+def collect_accounts(fProfile, fRequest):
+	Rows=[]
+	for account in Inventory_Modules.get_profile_accounts(fProfile):
+		Rows.append(Inventory_Modules.AccountRecord(account['ParentProfile'], account['AccountId'], account['AccountEmail'],
+		                                            account.get('AccountStatus', 'ACTIVE')))
+	return(Rows, 0)
+
+
+def collect(fProfile, fFinder, fFinderArgs, fService, fMakeRows):
+	"""
+	Runs fFinder across every account and region for fProfile, and turns what each returns into rows with fMakeRows.
+	Returns the rows, and how many accounts/ regions we couldn't look at.
+	"""
+	Rows=[]
+	Failures=0
+	for Finding in Inventory_Modules.fan_out_finder(Inventory_Modules.get_profile_accounts(fProfile), RegionList, fFinder,
+	                                                fFinderArgs=fFinderArgs, fWorkers=pWorkers, fService=fService):
+		if Finding['Error'] is not None:
+			logging.warning("Couldn't look in account %s, region %s: %s", Finding['AccountId'], Finding['Region'], Finding['Error'])
+			Failures+=1
+			continue
+		Rows.extend(fMakeRows(Finding))
+	return(Rows, Failures)
+
+
+def collect_instances(fProfile, fRequest):
+	def make_rows(fFinding):
+		for reservation in fFinding['Result']['Reservations']:
+			for instance in reservation['Instances']:
+				yield(Inventory_Modules.InstanceRecord(
+					ParentProfile=fFinding['ParentProfile'],
+					AccountId=fFinding['AccountId'],
+					Region=fFinding['Region'],
+					InstanceType=instance['InstanceType'],
+					Name=get_tag(instance.get('Tags'), 'Name', "No Name Tag"),
+					InstanceId=instance['InstanceId'],
+					PublicDnsName=instance.get('PublicDnsName', ''),
+					State=instance['State']['Name']))
+	return(collect(fProfile, Inventory_Modules.find_account_instances, (None, Inventory_Modules.INSTANCE_SUMMARY_FIELDS), 'ec2', make_rows))
+
+
+def collect_vpcs(fProfile, fRequest):
+	def make_rows(fFinding):
+		for vpc in fFinding['Result']['Vpcs']:
+			yield(Inventory_Modules.VpcRecord(
+				AccountId=vpc['OwnerId'],
+				Region=fFinding['Region'],
+				VpcId=vpc['VpcId'],
+				CidrBlock=vpc['CidrBlock'],
+				IsDefault=vpc['IsDefault'],
+				VpcName=get_tag(vpc.get('Tags'), 'Name', "No name defined")))
+	return(collect(fProfile, Inventory_Modules.find_account_vpcs, (False,), 'ec2', make_rows))
+
+
+def collect_stacks(fProfile, fRequest):
+	def make_rows(fFinding):
+		for stack in fFinding['Result']:
+			yield(Inventory_Modules.StackRecord(
+				Account=fFinding['AccountId'],
+				Region=fFinding['Region'],
+				StackName=stack['StackName'],
+				StackStatus=stack['StackStatus'],
+				StackArn=stack['StackId']))
+	# The fragment is matched against what we've found, so every stack is collected
+	return(collect(fProfile, Inventory_Modules.find_stacks_in_acct, ('all', fRequest.get('Status', 'active')), 'cloudformation', make_rows))
+
+
+"""
+Each query: the function that collects the rows, the columns those rows have, the column the Account filter matches,
+and the columns the Fragment filter matches
+"""
+QUERIES = {
+	'accounts': (collect_accounts, ['ParentProfile', 'AccountId', 'AccountEmail', 'AccountStatus'], 'AccountId', ['AccountId', 'AccountEmail']),
+	'instances': (collect_instances, ['ParentProfile', 'AccountId', 'Region', 'InstanceType', 'Name', 'InstanceId', 'PublicDnsName', 'State'], 'AccountId', ['Name', 'InstanceId', 'PublicDnsName']),
+	'vpcs': (collect_vpcs, ['AccountId', 'Region', 'VpcId', 'CidrBlock', 'IsDefault', 'VpcName'], 'AccountId', ['VpcId', 'CidrBlock', 'VpcName']),
+	'stacks': (collect_stacks, ['Account', 'Region', 'StackName', 'StackStatus', 'StackArn'], 'Account', ['StackName']),
+}
+
+
+class InventoryCache(object):
+	"""
+	What we've found, by (query, profile, and anything else that changes what gets collected). When several requests
+	need the same thing at once, only one of them goes and looks - the others wait for it.
+	"""
+	def __init__(self, fTTL):
+		self.ttl = fTTL
+		self.entries = {}
+		self.locks = {}
+		self.lock = threading.Lock()
+
+	def get(self, fKey, fCollector, fRefresh=False):
+		"""
+		Returns (rows, failures, age in seconds) for fKey - calling fCollector() for them if we don't have them, or
+		they're older than the ttl, or fRefresh is set.
+		"""
+		with self.lock:
+			KeyLock = self.locks.setdefault(fKey, threading.Lock())
+		with KeyLock:
+			Entry = self.entries.get(fKey)
+			if fRefresh or Entry is None or time.time() - Entry['Timestamp'] > self.ttl:
+				logging.warning("Collecting %s", fKey)
+				Rows, Failures = fCollector()
+				Entry = {'Timestamp': time.time(), 'Rows': Rows, 'Failures': Failures}
+				self.entries[fKey] = Entry
+			return(Entry['Rows'], Entry['Failures'], time.time() - Entry['Timestamp'])
+
+	def status(self):
+		with self.lock:
+			return([{'Key': list(key), 'Rows': len(entry['Rows']), 'Failures': entry['Failures'], 'Age': time.time() - entry['Timestamp']}
+			        for key, entry in self.entries.items()])
+
+
+def matches(fRow, fRequest, fAccountColumn, fFragmentColumns):
+	if fRequest.get('Account') and not str(fRow.get(fAccountColumn)) == str(fRequest['Account']):
+		return(False)
+	if fRequest.get('Region') and str(fRow.get('Region', '')).find(fRequest['Region']) < 0:
+		return(False)
+	if fRequest.get('Fragment') and not any(str(fRow.get(column, '')).find(fRequest['Fragment']) >= 0 for column in fFragmentColumns):
+		return(False)
+	return(True)
+
+
+def answer(fRequest):
+	"""
+	Returns the response (a dict) to one request.
+	"""
+	Query = fRequest.get('Query')
+	if Query == 'status':
+		return({'Columns': ['Key', 'Rows', 'Failures', 'Age'], 'Rows': Cache.status(), 'Age': 0, 'Failures': 0, 'Error': None})
+	if Query == 'shutdown':
+		# shutdown() waits for serve_forever to stop, so it can't be called from a request it's serving
+		threading.Thread(target=Server.shutdown, daemon=True).start()
+		return({'Columns': [], 'Rows': [], 'Age': 0, 'Failures': 0, 'Error': None})
+	if Query not in QUERIES:
+		return({'Error': "Unknown query {} - try one of {}".format(Query, sorted(QUERIES) + ['status', 'shutdown'])})
+	Collector, Columns, AccountColumn, FragmentColumns = QUERIES[Query]
+	Profile = fRequest.get('Profile') or pProfile
+	Key = (Query, Profile, fRequest.get('Status', 'active') if Query == 'stacks' else None)
+	Rows, Failures, Age = Cache.get(Key, lambda: Collector(Profile, fRequest), fRequest.get('Refresh', False))
+	return({'Columns': Columns,
+	        'Rows': [row for row in Rows if matches(row, fRequest, AccountColumn, FragmentColumns)],
+	        'Age': Age,
+	        'Failures': Failures,
+	        'Error': None})
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+	def handle(self):
+		try:
+			Response = answer(json.loads(self.rfile.readline()))
+		except Exception as my_Error:
+			logging.error("Couldn't answer a request: %s", my_Error)
+			Response = {'Error': "{}: {}".format(type(my_Error).__name__, my_Error)}
+		# The rows are kept as records (they're much smaller than dicts), and go out as dicts of their fields
+		self.wfile.write((json.dumps(Response, default=Inventory_Modules.json_default) + '\n').encode())
+
+
+class InventoryServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+	daemon_threads = True
+
+
+def remove_stale_socket(fSocketFile):
+	"""
+	Removes the socket left behind by a daemon that's no longer running - and exits if there's one that still is.
+	"""
+	if not os.path.exists(fSocketFile):
+		return()
+	try:
+		Inventory_Modules.query_daemon({'Query': 'status'}, fSocketFile, fTimeout=5)
+	except OSError:
+		os.remove(fSocketFile)
+		return()
+	sys.exit("There's already a daemon listening on {}".format(fSocketFile))
+
+
+##########################
+
+RegionList=Inventory_Modules.get_regions(pRegionList)
+Cache=InventoryCache(pTTL)
+remove_stale_socket(pSocket)
+os.makedirs(os.path.dirname(os.path.abspath(pSocket)), mode=0o700, exist_ok=True)
+# Only we should be able to ask it anything, since it answers with our credentials
+SavedUmask=os.umask(0o077)
+try:
+	Server=InventoryServer(pSocket, RequestHandler)
+finally:
+	os.umask(SavedUmask)
+
+if args.pWarm is not None:
+	def warm_up():
+		for query in args.pWarm or sorted(QUERIES):
+			try:
+				answer({'Query': query})
+			except Exception as my_Error:
+				logging.error("Couldn't warm up %s: %s", query, my_Error)
+	threading.Thread(target=warm_up, daemon=True).start()
+
+print("Listening on {} - use inventory_query.py to ask it something, or 'inventory_query.py shutdown' to stop it".format(pSocket))
+try:
+	Server.serve_forever()
+except KeyboardInterrupt:
+	pass
+finally:
+	Server.server_close()
+	if os.path.exists(pSocket):
+		os.remove(pSocket)
+print("Thanks for using this script...")
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+
+"""
+Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of
+this software and associated documentation files (the "Software"), to deal in
+the Software without restriction, including without limitation the rights to
+use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of
+the Software, and to permit persons to whom the Software is furnished to do so.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY, FITNESS
+FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR
+COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER
+IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
+CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+"""
+
+"""
+Asks inventory_daemon.py something, and prints what it says. Start the daemon first - this script doesn't talk to AWS
+itself, so it starts (and answers) in a fraction of the time the all_my_*.py scripts take.
+
+With --store, it looks in the local inventory store instead (see INVENTORY_STORE_FILE in Inventory_Modules) - everything
+the role, topic, log group, lambda and stackset finders have found, in any script, without needing the daemon at all.
+Like "inventory_query.py --store iam-role -f ControlTower", to see which accounts have a role with ControlTower in its name.
+"""
+
+import sys
+import argparse
+import Inventory_Modules
+
+parser = argparse.ArgumentParser(
+	description="Ask the inventory daemon about your accounts, instances, vpcs or stacks.",
+	prefix_chars='-+')	# Not '/', since --socket takes a path
+parser.add_argument(
+	"pQuery",
+	metavar="query",
+	choices=['accounts', 'instances', 'vpcs', 'stacks', 'status', 'shutdown'] + Inventory_Modules.INVENTORY_STORE_TYPES + ['all'],
+	help="What to ask about - accounts, instances, vpcs or stacks. 'status' shows what the daemon has, and 'shutdown' stops it. "
+	     "With --store, it's one of {} (or 'all').".format(", ".join(Inventory_Modules.INVENTORY_STORE_TYPES)))
+parser.add_argument(
+	"-p", "--profile",
+	dest="pProfile",
+	metavar="profile to use",
+	default=None,
+	help="The profile the daemon should use. Default is the one it was started with.")
+parser.add_argument(
+	"-a", "--account",
+	dest="pAccount",
+	metavar="account number",
+	default=None,
+	help="Only show what's in this account.")
+parser.add_argument(
+	"-r", "--region",
+	dest="pRegion",
+	metavar="region name string",
+	default=None,
+	help="Only show what's in regions with this in their name.")
+parser.add_argument(
+	"-f", "--fragment",
+	dest="pFragment",
+	metavar="name fragment",
+	default=None,
+	help="Only show things with this in their name (or id).")
+parser.add_argument(
+	"-s", "--status",
+	dest="pStatus",
+	metavar="stack status",
+	default=None,
+	help="For stacks - which status to look for. Default is 'active'.")
+parser.add_argument(
+	"-t", "--tag",
+	dest="pTags",
+	nargs="*",
+	metavar="key=value",
+	default=None,
+	help="With --store - only show things with these tags. Leave out the '=value' to match any value.")
+parser.add_argument(
+	"-i", "--ignore-case",
+	dest="pIgnoreCase",
+	action="store_true",
+	help="With --store - match the fragment regardless of case.")
+parser.add_argument(
+	"--store",
+	dest="pStore",
+	action="store_true",
+	help="Look in the local inventory store, instead of asking the daemon.")
+parser.add_argument(
+	"--refresh",
+	dest="pRefresh",
+	action="store_true",
+	help="Make the daemon look again, even if what it has isn't stale yet.")
+parser.add_argument(
+	"--socket",
+	dest="pSocket",
+	metavar="file name",
+	default=Inventory_Modules.DAEMON_SOCKET,
+	help="The daemon's socket. Default is {}".format(Inventory_Modules.DAEMON_SOCKET))
+parser.add_argument(
+	"--output-format",
+	dest="pOutputFormat",
+	choices=Inventory_Modules.OUTPUT_FORMATS,
+	default="table",
+	help="How to write out the answer. Default is a table on the screen. 'parquet' needs pyarrow, and --output-file.")
+parser.add_argument(
+	"--output-file",
+	dest="pOutputFile",
+	metavar="file name",
+	default=None,
+	help="Where to write the answer. Default is stdout.")
+args = parser.parse_args()
+
+if args.pOutputFormat == 'parquet' and args.pOutputFile is None:
+	parser.error("--output-format parquet needs an --output-file")
+if args.pStore and args.pQuery not in Inventory_Modules.INVENTORY_STORE_TYPES + ['all']:
+	parser.error("With --store, the query is one of {} (or 'all')".format(", ".join(Inventory_Modules.INVENTORY_STORE_TYPES)))
+if not args.pStore and args.pQuery in Inventory_Modules.INVENTORY_STORE_TYPES + ['all']:
+	parser.error("{} is only kept in the inventory store - add --store".format(args.pQuery))
+
+
+def query_store():
+	"""
+	Returns the same sort of response the daemon does, from the inventory store.
+	"""
+	import time
+
+	Tags={}
+	for tag in args.pTags or []:
+		key, _, value = tag.partition('=')
+		Tags[key]=value if _ else None
+	Resources=Inventory_Modules.query_inventory(None if args.pQuery == 'all' else args.pQuery, args.pFragment, args.pAccount,
+	                                           args.pRegion, Tags, args.pIgnoreCase)
+	return({'Columns': ['Account', 'Region', 'Type', 'Name', 'Id'],
+	        'Rows': Resources,
+	        'Age': time.time() - min(resource['Timestamp'] for resource in Resources) if Resources else 0,
+	        'Failures': 0,
+	        'Error': None})
+
+
+Request={'Query': args.pQuery,
+         'Profile': args.pProfile,
+         'Account': args.pAccount,
+         'Region': args.pRegion,
+         'Fragment': args.pFragment,
+         'Refresh': args.pRefresh}
+if args.pStatus is not None:
+	Request['Status']=args.pStatus
+
+if args.pStore:
+	Response=query_store()
+else:
+	try:
+		Response=Inventory_Modules.query_daemon(Request, args.pSocket)
+	except OSError as my_Error:
+		sys.exit("Couldn't talk to the daemon on {} ({}). Start it with inventory_daemon.py".format(args.pSocket, my_Error))
+if Response.get('Error') is not None:
+	sys.exit(Response['Error'])
+
+Columns=Response['Columns']
+if args.pQuery == 'shutdown':
+	print("The daemon is shutting down")
+	sys.exit(0)
+
+fmt=None
+if args.pOutputFormat == 'table':
+	Widths=[max([len(column)] + [len(str(row.get(column))) for row in Response['Rows']]) for column in Columns]
+	fmt=' '.join('%-{}s'.format(width) for width in Widths)
+Sink=Inventory_Modules.get_output_sink(args.pOutputFormat, Columns, args.pOutputFile, fmt, Columns)
+Console=Sink.console
+with Sink:
+	for row in Response['Rows']:
+		Sink.write(row)
+print(file=Console)
+if args.pStore:
+	print("Found {} rows in {} accounts. The oldest was found {:.0f} seconds ago.".format(len(Response['Rows']), len(set(row['Account'] for row in Response['Rows'])), Response['Age']), file=Console)
+else:
+	print("Found {} rows. The daemon looked {:.0f} seconds ago, and couldn't see into {} accounts/ regions.".format(len(Response['Rows']), Response['Age'], Response['Failures']), file=Console)
@@ -196,33 +196,21 @@ Trust_Policy_json = json.dumps(Trust_Policy)
 child_accounts=Inventory_Modules.find_child_accounts2(pProfile)
 
 # 4. Connect to each account, and detach the existing policy, and apply the new policy
-sts_client = aws_session.client('sts')
 TrustPoliciesChanged=0
 ErroredAccounts=[]
-for acct in child_accounts:
+# The roles are all assumed up front (in parallel), and each account is updated as soon as its credentials are ready
+for acct, account_credentials in Inventory_Modules.prefetch_credentials(child_accounts, fRoleList=[pAccessRole]):
 	ConnectionSuccess = False
-	try:
-		role_arn = "arn:aws:iam::{}:role/{}".format(acct['AccountId'], pAccessRole)
-		account_credentials = sts_client.assume_role(
-			RoleArn=role_arn,
-			RoleSessionName="RegistrationScript")['Credentials']
-		account_credentials['Account'] = acct['AccountId']
-		logging.warning("Accessed Account %s using rolename %s" % (acct['AccountId'], pAccessRole))
-		ConnectionSuccess = True
-	except ClientError as my_Error:
+	if account_credentials is None:
 		logging.error("Account %s, role %s was unavailable to change, so we couldn't access the role's Trust Policy", acct['AccountId'], pTargetRole)
-		logging.warning(my_Error)
 		ErroredAccounts.append(acct['AccountId'])
-		pass
+	else:
+		logging.warning("Accessed Account %s using rolename %s" % (acct['AccountId'], pAccessRole))
+		ConnectionSuccess = True
 	if ConnectionSuccess:
 		try:
 			# detach policy from the role and attach the new policy
-			iam_session = boto3.Session(
-				aws_access_key_id=account_credentials['AccessKeyId'],
-				aws_secret_access_key=account_credentials['SecretAccessKey'],
-				aws_session_token=account_credentials['SessionToken']
-			)
-			iam_client = iam_session.client('iam')
+			iam_client = Inventory_Modules.get_client('iam', ocredentials=account_credentials)
 			trustpolicyexisting=iam_client.get_role(RoleName=pTargetRole)
 			logging.info("Found Trust Policy %s in account %s for role %s" % (
 				json.dumps(trustpolicyexisting['Role']['AssumeRolePolicyDocument']),
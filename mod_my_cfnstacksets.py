@@ -22,7 +22,8 @@ import logging
 import time
 import Inventory_Modules
 import argparse
-import boto3
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from botocore.exceptions import ClientError
 from colorama import init
 
 '''
@@ -114,6 +115,25 @@ parser.add_argument(
 	const=True,
 	default=False,
 	dest="RetainStacks")
+parser.add_argument(
+	"--concurrency",
+	dest="pConcurrency",
+	metavar="number of stacksets",
+	type=int,
+	default=10,
+	help="How many stacksets to start removing stack instances from at the same time - once started, they're all waited on together. Default is 10.")
+parser.add_argument(
+	"--max-concurrent-percentage",
+	dest="pMaxConcurrentPercentage",
+	type=int,
+	default=Inventory_Modules.STACKSET_OPERATION_PREFERENCES['MaxConcurrentPercentage'],
+	help="Within each stackset, the percentage of accounts (in each region) to remove at the same time. Default is {}.".format(Inventory_Modules.STACKSET_OPERATION_PREFERENCES['MaxConcurrentPercentage']))
+parser.add_argument(
+	"--failure-tolerance-percentage",
+	dest="pFailureTolerancePercentage",
+	type=int,
+	default=Inventory_Modules.STACKSET_OPERATION_PREFERENCES['FailureTolerancePercentage'],
+	help="Within each stackset, the percentage of accounts (in each region) that can fail before CloudFormation stops. Default is {}.".format(Inventory_Modules.STACKSET_OPERATION_PREFERENCES['FailureTolerancePercentage']))
 parser.add_argument(
 	'-v',
 	help="Be verbose",
@@ -155,6 +175,10 @@ pdryrun=args.DryRun
 pstatus=args.pstatus
 pAccountRemove=args.pAccountRemove
 pRegionRemove=args.pRegionRemove
+pConcurrency=args.pConcurrency
+OperationPreferences=dict(Inventory_Modules.STACKSET_OPERATION_PREFERENCES,
+                          MaxConcurrentPercentage=args.pMaxConcurrentPercentage,
+                          FailureTolerancePercentage=args.pFailureTolerancePercentage)
 logging.basicConfig(level=args.loglevel, format="[%(filename)s:%(lineno)s - %(funcName)20s() ] %(message)s")
 
 
@@ -170,90 +194,105 @@ def randomString(stringLength=10):
 ########################
 #### delete_stack_instances #####
 # Required Parameters:
-# StackSetNames
-# RegionList
-# AccountList
+# StackSetName
+# AccountList - only the accounts this stackset has instances in
+# RegionList - only the regions this stackset has instances in
 # pProfile
 # pRegion
-# pAccountRemove
 # pForce
 #
 ####################
 
 
-def _delete_stack_instances(fProfile, fRegion, fAccountList, fAccountRemove, fAccountsToSkip, fRegionList, fStackSet, fForce=True):
-	session_cfn=boto3.Session(profile_name=pProfile, region_name=pRegion)
-	logging.warning("Removing instances from %s StackSet" % (fStackSet['StackSetName']))
-	try:
-		StackSetOpId='Delete-'+randomString(5)
-		response=Inventory_Modules.delete_stack_instances(fProfile, fRegion, fAccountList, fRegionList, fStackSet['StackSetName'], fForce, StackSetOpId)
-		# pprint.pprint(response)
-	except Exception as e:
-		if e.response['Error']['Code'] == 'StackSetNotFoundException':
-			logging.info("Caught exception 'StackSetNotFoundException', ignoring the exception...")
-		else:
-			print("Error: ", e)
-			return("Failed-Other")
-	StackOperationsRunning=True
-	client_cfn=session_cfn.client('cloudformation')
-	timer=10
-	while StackOperationsRunning:
-		InstancesToSkip = 0
-		SpecificInstancesLeft = 0
-		logging.debug("Got into the While Loop")
-		logging.warning(fStackSet['StackSetName'])
+def _start_stack_instance_deletion(fProfile, fRegion, fAccountList, fRegionList, fStackSetName, fForce=True):
+	"""
+	Starts removing the stack instances from one stackset - waiting its turn if another operation is running on it.
+	Returns (OperationId, None) once it's started, or (None, "Success" or "Failed-Other") if there's nothing to wait for.
+	"""
+	logging.warning("Removing instances from %s StackSet" % (fStackSetName))
+	StackSetOpId='Delete-'+randomString(5)
+	Delay=5
+	while True:
 		try:
-			time.sleep(3)
-			Status=client_cfn.list_stack_set_operations(StackSetName=fStackSet['StackSetName'])
-			# pprint.pprint(Status)
-			logging.info("StackSet Operation state is %s" % Status['Summaries'][0]['Status'])
-			if Status['Summaries'][0]['Status'] in ['CANCELLED', 'FAILED']:
-				time.sleep(2)
-				Reason=client_cfn.list_stack_set_operation_results(StackSetName=fStackSet['StackSetName'], OperationId=StackSetOpId)
-				for k in range(len(Reason)):
-					logging.info("Reason: %s", Reason['Summaries'][k]['StatusReason'])
-					if Reason['Summaries'][k]['Status']=='FAILED' and Reason['Summaries'][k]['StatusReason'].find("role with trust relationship to Role") > 0:
-						logging.info("StackSet Operation status reason is: %s" % Reason['Summaries'][k]['StatusReason'])
-						print("Error removing account {} from the StackSet {}. We should try to delete the stack instance with '--retain-stacks' enabled...".format(pAccountRemove, fStackSet['StackSetName']))
-						return("Failed-ForceIt")
-			response2=client_cfn.list_stack_instances(StackSetName=fStackSet['StackSetName'])['Summaries']
-			for j in range(len(response2)):
-				if response2[j]['Account'] in fAccountsToSkip:
-					InstancesToSkip+=1
-				elif response2[j]['Account'] == fAccountRemove:
-					SpecificInstancesLeft+=1
-				# elif response2[j]['Region'] == fRegionRemove:
-				# 	SpecificInstancesLeft+=1
-			# if fAccountRemove=='NotProvided' and fRegionRemove=='NotProvided':
-				# InstancesLeft=len(response2)-InstancesToSkip
-				# logging.info("There are still %s instances left in the stackset" % InstancesLeft)
-			if fAccountRemove=='NotProvided':
-				InstancesLeft=len(response2)-InstancesToSkip
-				logging.info("There are still %s instances left in the stackset" % InstancesLeft)
-			else:	# A specific account was provided to remove from all stacksets
-				InstancesLeft=SpecificInstancesLeft
-				logging.info("There are still %s instances of account %s left in the stackset", SpecificInstancesLeft, fAccountRemove)
-			StackOperationsRunning=(Status['Summaries'][0]['Status'] in ['RUNNING', 'PENDING'])
-			logging.info("StackOperationsRunning is %s" % StackOperationsRunning)
-			if StackOperationsRunning:
-				print(ERASE_LINE+"Waiting {} seconds for {} to be fully deleted. There's still {} instances left.".format(timer, fStackSet['StackSetName'], InstancesLeft), end='\r')
-				time.sleep(10)
-				timer+=10
-			elif Status['Summaries'][0]['Status'] == 'SUCCEEDED':
-				# pprint.pprint(Status['Summaries'])
-				logging.info("Successfully removed %s from %s", fAccountRemove, fStackSet['StackSetName'])
-				return("Success")
+			Inventory_Modules.delete_stack_instances(fProfile, fRegion, fAccountList, fRegionList, fStackSetName, fForce, StackSetOpId, OperationPreferences)
+			return(StackSetOpId, None)
+		except ClientError as my_Error:
+			if my_Error.response['Error']['Code'] == 'StackSetNotFoundException':
+				logging.info("Caught exception 'StackSetNotFoundException', so there's nothing left to remove...")
+				return(None, "Success")
+			elif my_Error.response['Error']['Code'] == 'OperationInProgressException' and Delay <= 300:
+				# Only one operation can run on a stackset at a time - this one has to wait for whatever's already running
+				logging.info("Another operation is running on %s, so we'll try again in %s seconds", fStackSetName, Delay)
+				time.sleep(Delay)
+				Delay*=2
 			else:
-				logging.info("Something else failed")
-				return("Failed-Other")
-		except Exception as e:
-			# if e.response['Error']['Code'] == 'StackSetNotFoundException':
-			# 	logging.info("Caught exception 'StackSetNotFoundException', ignoring the exception...")
-			# 	StackOperationsRunning=True
-			# 	pass
-			# else:
-			print("Error: ", e)
-			break
+				print("Error: ", my_Error)
+				return(None, "Failed-Other")
+
+
+def _stack_instance_deletion_result(fProfile, fRegion, fStackSetName, fOperationId, fOperation):
+	"""
+	Returns "Success", "Failed-ForceIt" (it might work with --retain-stacks) or "Failed-Other", for a finished operation.
+	"""
+	# With any failure tolerance, the operation can have SUCCEEDED without removing every instance
+	Failures=Inventory_Modules.find_stackset_operation_failures(fProfile, fRegion, fStackSetName, fOperationId)
+	if fOperation['Status'] == 'SUCCEEDED' and len(Failures) == 0:
+		logging.info("Successfully removed the instances from %s", fStackSetName)
+		return("Success")
+	for result in Failures:
+		logging.info("StackSet Operation status reason is: %s" % result.get('StatusReason'))
+		if result['Status'] == 'FAILED' and result.get('StatusReason', '').find("role with trust relationship to Role") > 0:
+			print("Error removing account {} from the StackSet {}. We should try to delete the stack instance with '--retain-stacks' enabled...".format(result['Account'], fStackSetName))
+			return("Failed-ForceIt")
+	logging.info("Something else failed")
+	return("Failed-Other")
+
+
+def delete_all_stack_instances(fStackSets, fForce):
+	"""
+	fStackSets is a dict of {StackSetName: (AccountList, RegionList)}
+
+	Starts removing the stack instances from up to pConcurrency stacksets at the same time, then waits for all of the
+	operations together. Returns {StackSetName: result}.
+	"""
+	Results={}
+	Operations=[]
+	with ThreadPoolExecutor(max_workers=max(1, pConcurrency)) as Executor:
+		Futures={Executor.submit(_start_stack_instance_deletion, pProfile, pRegion, Accounts, Regions, StackSetName, fForce): StackSetName
+		         for StackSetName, (Accounts, Regions) in fStackSets.items()}
+		for future in as_completed(Futures):
+			try:
+				OperationId, Result = future.result()
+			except Exception as my_Error:
+				# Whatever went wrong with this stackset, the others carry on
+				print("Error: ", my_Error)
+				OperationId, Result = None, "Failed-Other"
+			if OperationId is None:
+				Results[Futures[future]]=Result
+			else:
+				Operations.append((Futures[future], OperationId))
+
+	def operation_finished(fStackSetName, fOperationId, fOperation):
+		try:
+			Results[fStackSetName]=_stack_instance_deletion_result(pProfile, pRegion, fStackSetName, fOperationId, fOperation)
+		except Exception as my_Error:
+			# Not being able to find out why it failed mustn't stop us waiting on the others
+			print("Error: ", my_Error)
+			Results[fStackSetName]="Failed-Other"
+		print(ERASE_LINE+"Finished {} of {} StackSets ({} was {})".format(len(Results), len(fStackSets), fStackSetName, Results[fStackSetName]), end='\r')
+
+	Errors={}
+	try:
+		Inventory_Modules.wait_for_stackset_operations(pProfile, pRegion, Operations, fCallback=operation_finished, fErrors=Errors)
+	except Exception as my_Error:
+		print("Error: ", my_Error)
+	for (StackSetName, OperationId), my_Error in Errors.items():
+		print("Error: ", my_Error)
+	for StackSetName, OperationId in Operations:
+		# Whatever we couldn't check on didn't finish as far as we know
+		Results.setdefault(StackSetName, "Failed-Other")
+	print(ERASE_LINE, end='\r')
+	return(Results)
 
 ##########################
 ERASE_LINE = '\x1b[2K'
@@ -418,26 +457,39 @@ elif pdryrun:
 elif not pdryrun:
 	print()
 	print("Removing {} stack instances from the {} StackSets found".format(len(AllInstances), len(StackSetNames)))
-	# pprint.pprint(StackSetNames)
-	for m in range(len(StackSetNames)):
-		logging.info("About to remove account %s from stackset %s in regions %s ", pAccountRemove, StackSetNames[m], str(RegionList))
-		result=_delete_stack_instances(pProfile, pRegion, AccountList, pAccountRemove, AccountsToSkip, RegionList, StackSetNames[m], pForce)
-		if result=='Success':
-			print(ERASE_LINE+"Successfully finished StackSet {}".format(StackSetNames[m]['StackSetName']))
-		elif pForce is True and result=='Failed-ForceIt':
-			print("Some other problem happened.")
-		elif pForce is False and result=='Failed-ForceIt':
-			Decision=(input("Deletion of Stack Instances failed, but might work if we force it. Shall we force it? (y/n): ") in ['y', 'Y'])
-			if Decision:
-				result = _delete_stack_instances(pProfile, pRegion, AccountList, pAccountRemove, AccountsToSkip, RegionList, StackSetNames[m], True) 	# Try it again, forcing it this time
-				if result=='Success':
-					print(ERASE_LINE+"Successfully retried StackSet {}".format(StackSetNames[m]['StackSetName']))
-				elif pForce is True and result=='Failed-ForceIt':
-					print(ERASE_LINE+"Some other problem happened on the retry.")
-				elif result=='Failed-Other':
-					print(ERASE_LINE+"Something else failed on the retry... Who knows?")
-		elif result=='Failed-Other':
-			print("Something else failed... Who knows?")
+	# Each stackset only gets the accounts and regions it actually has instances in - so its operation does only what it needs to
+	StackSetsToClean={}
+	for instance in AllInstances:
+		if instance['ChildAccount'] in AccountsToSkip:
+			continue
+		Accounts, Regions = StackSetsToClean.setdefault(instance['StackSetName'], (set(), set()))
+		Accounts.add(instance['ChildAccount'])
+		Regions.add(instance['ChildRegion'])
+	StackSetsToClean={name: (sorted(Accounts), sorted(Regions)) for name, (Accounts, Regions) in StackSetsToClean.items()}
+	logging.info("About to remove account %s from %s stacksets", pAccountRemove, len(StackSetsToClean))
+	Results=delete_all_stack_instances(StackSetsToClean, pForce)
+	ToForce=[]
+	for StackSetName in sorted(Results):
+		if Results[StackSetName]=='Success':
+			print(ERASE_LINE+"Successfully finished StackSet {}".format(StackSetName))
+		elif pForce is True and Results[StackSetName]=='Failed-ForceIt':
+			print("Some other problem happened with StackSet {}.".format(StackSetName))
+		elif pForce is False and Results[StackSetName]=='Failed-ForceIt':
+			ToForce.append(StackSetName)
+		elif Results[StackSetName]=='Failed-Other':
+			print("Something else failed with StackSet {}... Who knows?".format(StackSetName))
+	if ToForce:
+		Decision=(input("Deletion of Stack Instances failed for {} StackSets, but might work if we force it. Shall we force it? (y/n): ".format(len(ToForce))) in ['y', 'Y'])
+		if Decision:
+			# Try them again, forcing it this time
+			Retries=delete_all_stack_instances({name: StackSetsToClean[name] for name in ToForce}, True)
+			for StackSetName in sorted(Retries):
+				if Retries[StackSetName]=='Success':
+					print(ERASE_LINE+"Successfully retried StackSet {}".format(StackSetName))
+				elif Retries[StackSetName]=='Failed-ForceIt':
+					print(ERASE_LINE+"Some other problem happened on the retry of StackSet {}.".format(StackSetName))
+				elif Retries[StackSetName]=='Failed-Other':
+					print(ERASE_LINE+"Something else failed on the retry of StackSet {}... Who knows?".format(StackSetName))
 
 	if pAccountRemove == 'NotProvided':
 		try:
@@ -1,4 +1,3 @@
-
 """
 Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 
@@ -16,437 +15,335 @@ IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN
 CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 """
 
-def del_vpc(ocredentials,fVPCId,fRegion):
-	import boto3, logging
-	from botocore.exceptions import ClientError
-	from colorama import init,Fore,Back,Style
-
-	ERASE_LINE = '\x1b[2K'
-
-	def find_and_delete_vpc_endpoints(fVPC_client,fVpcId,fRegion):
+import logging
+import Inventory_Modules
+from botocore.exceptions import ClientError
 
-		import boto3, logging
-		vpc_endpoints=fVPC_client.describe_vpc_endpoints(
-			Filters=[
-				{
-					'Name': 'vpc-id',
-					'Values': [fVpcId]
-				}
-			]
-		)
-		vpc_endpoints_to_delete=[]
-		logging.info("Found %s vpc endpoints",len(vpc_endpoints))
-		for x in range(len(vpc_endpoints['VpcEndpoints'])):
-			vpc_endpoints_to_delete.append(vpc_endpoints['VpcEndpoints'][x]['VpcEndpointId'])
-
-		logging.warning("Found %s endpoints in vpc",len(vpc_endpoints_to_delete))
-		if len(vpc_endpoints_to_delete) > 0:
-			try:
-				response = fVPC_client.delete_vpc_endpoints(
-					VpcEndpointIds=vpc_endpoints_to_delete
-				)
-				return(0)
-			except ClientError as my_Error:
-				print(my_Error)
-				return(1)
-		else:
-			logging.warning("No Endpoints found to delete")
-			return(0)
-
-	def find_and_delete_vpc_security_groups(fVPC_client,fVpcId,fRegion):
-
-		import boto3, pprint
-		from botocore.exceptions import ClientError
-
-		vpc_security_groups=fVPC_client.describe_security_groups(
-			Filters=[
-				{
-					'Name': 'vpc-id',
-					'Values': [fVpcId]
-				}
+"""
+Waiters for the things a VPC deletion has to wait on, which EC2 doesn't have waiters for (or only has in newer versions
+of botocore). Each one is done when nothing it's waiting on is left - whether they're gone, or only showing as deleted.
+Checked every VPC_WAITER_DELAY seconds, for up to VPC_WAITER_MAX_ATTEMPTS times.
+"""
+VPC_WAITER_DELAY = 5
+VPC_WAITER_MAX_ATTEMPTS = 120
+VPC_WAITERS = {
+	'version': 2,
+	'waiters': {
+		'NatGatewaysDeleted': {
+			'operation': 'DescribeNatGateways',
+			'delay': VPC_WAITER_DELAY,
+			'maxAttempts': VPC_WAITER_MAX_ATTEMPTS,
+			'acceptors': [
+				{'matcher': 'path', 'argument': "length(NatGateways[?State!='deleted' && State!='failed'])", 'expected': 0, 'state': 'success'},
+				{'matcher': 'error', 'expected': 'NatGatewayNotFound', 'state': 'success'},
 			]
-		)
-		for x in range(len(vpc_security_groups['SecurityGroups'])):
-			if vpc_security_groups['SecurityGroups'][x]['GroupName'] == 'default':
-				logging.info("Only found default security groups. These will auto-delete")
-				continue
-			else:
-				try:
-					logging.info("Deleting security group %s",vpc_security_groups['SecurityGroups'][x]['GroupId'])
-					response = fVPC_client.delete_security_group(
-						GroupId=vpc_security_groups['SecurityGroups'][x]['GroupId']
-					)
-				except ClientError as my_Error:
-					print(my_Error)
-					return(1)
-		return(0)
-
-	def find_and_delete_vpc_peering_connections(fVPC_client,fVpcId,fRegion):
-
-		import boto3, pprint
-		from botocore.exceptions import ClientError
-
-		vpc_peering_connections=fVPC_client.describe_vpc_peering_connections(
-			Filters=[
-				{
-					'Name': 'requester-vpc-info.vpc-id',
-					'Values': [fVpcId]
-				}
+		},
+		'VpcEndpointsDeleted': {
+			'operation': 'DescribeVpcEndpoints',
+			'delay': VPC_WAITER_DELAY,
+			'maxAttempts': VPC_WAITER_MAX_ATTEMPTS,
+			'acceptors': [
+				{'matcher': 'path', 'argument': "length(VpcEndpoints[?State!='deleted' && State!='Deleted'])", 'expected': 0, 'state': 'success'},
+				{'matcher': 'error', 'expected': 'InvalidVpcEndpointId.NotFound', 'state': 'success'},
 			]
-		)
-		for x in range(len(vpc_peering_connections['VpcPeeringConnections'])):
-			try:
-				response = fVPC_client.delete_vpc_peering_connection(
-					VpcPeeringConnectionId=vpc_peering_connections['VpcPeeringConnections'][x]['VpcPeeringConnectionId']
-				)
-			except ClientError as my_Error:
-				print(my_Error)
-				return(1)
-		return(0)
-
-	def find_and_delete_vpc_route_tables(fVPC_client,fVpcId,fRegion):
-
-		import boto3, pprint
-		from botocore.exceptions import ClientError
-
-		vpc_route_tables=fVPC_client.describe_route_tables(
-			Filters=[
-				{
-					'Name': 'vpc-id',
-					'Values': [fVpcId]
-				}
+		},
+		'VpnGatewaysDetached': {
+			'operation': 'DescribeVpnGateways',
+			'delay': VPC_WAITER_DELAY,
+			'maxAttempts': VPC_WAITER_MAX_ATTEMPTS,
+			'acceptors': [
+				{'matcher': 'path', 'argument': "length(VpnGateways[].VpcAttachments[] | [?State!='detached'])", 'expected': 0, 'state': 'success'},
 			]
-		)
-		vpc_route_tables_to_delete=list()
-		for x in range(len(vpc_route_tables['RouteTables'])):
-			rRouteTableId=vpc_route_tables['RouteTables'][x]['RouteTableId']
-		# Add all route tables to the delete list...
-			vpc_route_tables_to_delete.append(rRouteTableId)
-			for y in range(len(vpc_route_tables['RouteTables'][x]['Associations'])):
-				rIsMain=vpc_route_tables['RouteTables'][x]['Associations'][y]['Main']
-		# However, since we can't disassociate the "Main" Route Table, and we can't delete it, we remove it from our list.
-				if rIsMain:
-					vpc_route_tables_to_delete.remove(rRouteTableId)
-					continue
-				rRouteAssociation=vpc_route_tables['RouteTables'][x]['Associations'][y]['RouteTableAssociationId']
-				try:
-					disassociateresponse = fVPC_client.disassociate_route_table(
-						AssociationId=rRouteAssociation
-					)
-					logging.critical("Disassociated Route Table ID: %s",rRouteTableId)
-				except ClientError as my_Error:
-					print(my_Error)
-					return(1)
-
-			# pprint.pprint(vpc_route_tables_to_delete)
-			for RtTbl in vpc_route_tables_to_delete:
-				try:
-					deleteresponse = fVPC_client.delete_route_table(
-						RouteTableId=RtTbl
-					)
-					print("Deleted Route Table ID:",RtTbl)
-					vpc_route_tables_to_delete.remove(RtTbl)
-				except ClientError as my_Error:
-					print(my_Error)
-					return(1)
+		},
+	}
+}
+
+
+def get_vpc_waiter(fVPC_client, fWaiterName):
+	"""
+	Returns one of the VPC_WAITERS (by name), for this client.
+	"""
+	from botocore.waiter import WaiterModel, create_waiter_with_client
+
+	return(create_waiter_with_client(fWaiterName, WaiterModel(VPC_WAITERS), fVPC_client))
+
+
+def find_and_delete_vpc_endpoints(fVPC_client, fVpcId):
+	"""
+	Deletes the endpoints in the vpc, and waits for them to be gone - an interface endpoint holds onto its subnets and
+	security groups until it is.
+	"""
+	vpc_endpoints_to_delete=[endpoint['VpcEndpointId'] for endpoint in Inventory_Modules.paginate(
+		fVPC_client, 'describe_vpc_endpoints', 'VpcEndpoints', Filters=[{'Name': 'vpc-id', 'Values': [fVpcId]}])]
+	logging.warning("Found %s endpoints in vpc %s", len(vpc_endpoints_to_delete), fVpcId)
+	if len(vpc_endpoints_to_delete) == 0:
+		logging.warning("No Endpoints found to delete")
 		return(0)
+	try:
+		response=fVPC_client.delete_vpc_endpoints(VpcEndpointIds=vpc_endpoints_to_delete)
+		if response.get('Unsuccessful'):
+			for failure in response['Unsuccessful']:
+				print(failure['Error']['Message'])
+			return(1)
+		get_vpc_waiter(fVPC_client, 'VpcEndpointsDeleted').wait(VpcEndpointIds=vpc_endpoints_to_delete)
+	except ClientError as my_Error:
+		print(my_Error)
+		return(1)
+	return(0)
 
-	def find_and_delete_vpc_nacls(fVPC_client,fVpcId,fRegion):
 
-		import boto3, pprint
-		from botocore.exceptions import ClientError
+def find_and_delete_vpc_security_groups(fVPC_client, fVpcId):
+	"""
+	Deletes the security groups in the vpc - except the default one, which goes with the vpc itself.
+	"""
+	for security_group in Inventory_Modules.paginate(fVPC_client, 'describe_security_groups', 'SecurityGroups', Filters=[{'Name': 'vpc-id', 'Values': [fVpcId]}]):
+		if security_group['GroupName'] == 'default':
+			logging.info("Only found default security groups. These will auto-delete")
+			continue
+		try:
+			logging.info("Deleting security group %s", security_group['GroupId'])
+			fVPC_client.delete_security_group(GroupId=security_group['GroupId'])
+		except ClientError as my_Error:
+			print(my_Error)
+			return(1)
+	return(0)
 
-		vpc_nacls=fVPC_client.describe_network_acls(
-			Filters=[
-				{
-					'Name': 'vpc-id',
-					'Values': [fVpcId]
-				}
-			]
-		)
 
-		for x in (range(len(vpc_nacls['NetworkAcls']))  ) :
-			if vpc_nacls['NetworkAcls'][x]['IsDefault']:
-				continue
-			else:
-				try:
-					response=fVPC_client.delete_network_acl(
-						NetworkAclId=vpc_nacls['NetworkAcls'][x]['NetworkAclId']
-					)
-					# pprint.pprint(response)
-				except ClientError as my_Error:
-					print(my_Error)
-					return(1)
-		return(0)
+def find_and_delete_vpc_peering_connections(fVPC_client, fVpcId):
+	"""
+	Deletes the peering connections this vpc requested.
+	"""
+	for peering_connection in Inventory_Modules.paginate(fVPC_client, 'describe_vpc_peering_connections', 'VpcPeeringConnections', Filters=[{'Name': 'requester-vpc-info.vpc-id', 'Values': [fVpcId]}]):
+		try:
+			fVPC_client.delete_vpc_peering_connection(VpcPeeringConnectionId=peering_connection['VpcPeeringConnectionId'])
+		except ClientError as my_Error:
+			print(my_Error)
+			return(1)
+	return(0)
 
-	def find_and_delete_subnets(fVPC_client,fVpcId,fRegion):
 
-		import boto3, pprint
-		from botocore.exceptions import ClientError
+def find_and_delete_vpc_route_tables(fVPC_client, fVpcId):
+	"""
+	Disassociates and deletes the route tables in the vpc. We can't disassociate (or delete) the "Main" route table - it
+	goes with the vpc itself.
+	"""
+	for route_table in Inventory_Modules.paginate(fVPC_client, 'describe_route_tables', 'RouteTables', Filters=[{'Name': 'vpc-id', 'Values': [fVpcId]}]):
+		rIsMain=any(association['Main'] for association in route_table['Associations'])
+		if rIsMain:
+			continue
+		try:
+			for association in route_table['Associations']:
+				fVPC_client.disassociate_route_table(AssociationId=association['RouteTableAssociationId'])
+				logging.info("Disassociated Route Table ID: %s", route_table['RouteTableId'])
+			fVPC_client.delete_route_table(RouteTableId=route_table['RouteTableId'])
+			logging.info("Deleted Route Table ID: %s", route_table['RouteTableId'])
+		except ClientError as my_Error:
+			print(my_Error)
+			return(1)
+	return(0)
 
-		subnets=fVPC_client.describe_subnets(
-			Filters=[
-				{
-					'Name': 'vpc-id',
-					'Values': [fVpcId]
-				}
-			]
-		)
-		# print("Found",len(subnets['Subnets']),"Subnets")
-
-		# pprint.pprint(vpc_nacls)
-		# pprint.pprint(vpc_nacls['NetworkAcls'][0]['IsDefault'])
-		# print("There are "+str(len(subnets['Subnets']))+" subnets")
-		# print("There are "+str(len(vpc_route_tables['RouteTables'][0]['Routes']))+" routes in the first table")
-		for x in range(len(subnets['Subnets'])):
-			try:
-				rSubnetId=subnets['Subnets'][x]['SubnetId']
-				response=fVPC_client.delete_subnet(
-					SubnetId=rSubnetId
-				)
-				# pprint.pprint(response)
-			except ClientError as my_Error:
-				print(my_Error)
-				return(1)
-		return(0)
 
-	def find_and_delete_NAT_gateways(fVPC_client,fVpcId,fRegion):
-
-		import boto3, pprint, time
-		from botocore.exceptions import ClientError
-
-		nat_gateways=fVPC_client.describe_nat_gateways(
-			Filters=[
-				{
-					'Name': 'vpc-id',
-					'Values': [fVpcId]
-				},
-				{
-					'Name': 'state',
-					'Values': ['available']
-				}
-			]
-		)
-		rNatGWList=[]
-		if len(nat_gateways['NatGateways']) > 0:
-			logging.info("Found %s NAT Gateways",len(nat_gateways['NatGateways']))
-			for x in range(len(nat_gateways['NatGateways'])):
-				rNatGWList.append(nat_gateways['NatGateways'][x]['NatGatewayId'])
-				try:
-					deleteresponse=fVPC_client.delete_nat_gateway(
-						NatGatewayId=rNatGWList[x]
-					)
-				except ClientError as my_Error:
-					print(my_Error)
-					return(1)
-			print("Waiting for the NAT Gateways to be fully deleted")
-			verify_nat_gws_are_gone=nat_gateways
-			while len(verify_nat_gws_are_gone['NatGateways']) > 0:
-				verify_nat_gws_are_gone=fVPC_client.describe_nat_gateways(
-					Filters=[
-						{
-							'Name': 'state',
-							'Values': [
-								'available','pending','deleting','failed'
-							]
-						}
-					],
-					NatGatewayIds=rNatGWList
-				)
-				cyclesWaited+=1
-				if cyclesWaited % 5 ==0:
-					logging.info("Still waiting on NAT Gateways to be deleted...")
-				# print(".", end='', flush=True)
-			time.sleep(10)
-		return(0)
+def find_and_delete_vpc_nacls(fVPC_client, fVpcId):
+	"""
+	Deletes the network ACLs in the vpc - except the default one, which goes with the vpc itself.
+	"""
+	for network_acl in Inventory_Modules.paginate(fVPC_client, 'describe_network_acls', 'NetworkAcls', Filters=[{'Name': 'vpc-id', 'Values': [fVpcId]}]):
+		if network_acl['IsDefault']:
+			continue
+		try:
+			fVPC_client.delete_network_acl(NetworkAclId=network_acl['NetworkAclId'])
+		except ClientError as my_Error:
+			print(my_Error)
+			return(1)
+	return(0)
 
-	def find_and_delete_gateways(fVPC_client,fVpcId,fRegion):
 
-		import boto3, pprint
-		from botocore.exceptions import ClientError
+def find_and_delete_subnets(fVPC_client, fVpcId):
+	"""
+	Deletes the subnets in the vpc.
+	"""
+	for subnet in Inventory_Modules.paginate(fVPC_client, 'describe_subnets', 'Subnets', Filters=[{'Name': 'vpc-id', 'Values': [fVpcId]}]):
+		try:
+			fVPC_client.delete_subnet(SubnetId=subnet['SubnetId'])
+		except ClientError as my_Error:
+			print(my_Error)
+			return(1)
+	return(0)
 
-		gateways=fVPC_client.describe_internet_gateways(
-			Filters=[
-				{
-					'Name': 'attachment.vpc-id',
-					'Values': [fVpcId]
-				}
-			]
-		)
-		for x in range(len(gateways['InternetGateways'])):
-			rGatewayId=gateways['InternetGateways'][x]['InternetGatewayId']
-			try:
-				detachresponse = fVPC_client.detach_internet_gateway(
-					InternetGatewayId=rGatewayId,
-					VpcId=fVpcId
-				)
-			except ClientError as my_Error:
-				print(my_Error)
-				return(1)
-			try:
-				deleteresponse=fVPC_client.delete_internet_gateway(
-					InternetGatewayId=rGatewayId
-				)
-			except ClientError as my_Error:
-				print(my_Error)
-				return(1)
-		return(0)
 
-	def find_and_delete_virtual_gateways(fVPC_client,fVpcId,fRegion):
-
-		import boto3, pprint, time
-		from botocore.exceptions import ClientError
-
-		vgws=fVPC_client.describe_vpn_gateways(
-			Filters=[
-				{
-					'Name': 'attachment.vpc-id',
-					'Values': [fVpcId]
-				},
-				{
-					'Name': 'attachment.state',
-					'Values': ['attached']
-				}
-			]
-		)
-		rVPN_GatewayList=list()
-		for x in range(len(vgws['VpnGateways'])):
-			rVPN_GatewayList.append(vgws['VpnGateways'][x]['VpnGatewayId'])
-			try:
-				detachresponse = fVPC_client.detach_vpn_gateway(
-					VpnGatewayId=rVPN_GatewayList[x],
-					VpcId=fVpcId
-				)
-			except ClientError as my_Error:
-				print(my_Error)
-				return(1)
-
-			print("Waiting for the VPN Gateways to be fully detached")
-			verify_vgws_are_gone=vgws
-			while len(verify_vgws_are_gone['VpnGateways']) > 0:
-				verify_vgws_are_gone=fVPC_client.describe_vpn_gateways(
-					Filters=[
-						{
-							'Name': 'attachment.state',
-							'Values': ['attached','detaching']
-						},
-					],
-					VpnGatewayIds=rVPN_GatewayList
-				)
-				cyclesWaited+=1
-				if cyclesWaited % 5 ==0:
-					logging.info("Still waiting on VGWS to be deleted...")
-				# pprint.pprint(verify_nat_gws_are_gone)
-				time.sleep(10)
+def find_and_delete_NAT_gateways(fVPC_client, fVpcId):
+	"""
+	Deletes the NAT gateways in the vpc, and waits for them to be gone - until they are, their network interfaces are
+	still in the subnets, and their elastic IPs still keep the internet gateway attached.
+	"""
+	rNatGWList=[nat_gateway['NatGatewayId'] for nat_gateway in Inventory_Modules.paginate(
+		fVPC_client, 'describe_nat_gateways', 'NatGateways', Filter=[{'Name': 'vpc-id', 'Values': [fVpcId]}, {'Name': 'state', 'Values': ['available', 'pending']}])]
+	if len(rNatGWList) == 0:
 		return(0)
+	logging.info("Found %s NAT Gateways", len(rNatGWList))
+	try:
+		for NatGatewayId in rNatGWList:
+			fVPC_client.delete_nat_gateway(NatGatewayId=NatGatewayId)
+		logging.info("Waiting for the NAT Gateways to be fully deleted")
+		get_vpc_waiter(fVPC_client, 'NatGatewaysDeleted').wait(NatGatewayIds=rNatGWList)
+	except ClientError as my_Error:
+		print(my_Error)
+		return(1)
+	return(0)
 
-	def delete_vpc(fVPC_client,fVpcId,fRegion):
-
-		import boto3, pprint
-		from botocore.exceptions import ClientError
 
+def find_and_delete_gateways(fVPC_client, fVpcId):
+	"""
+	Detaches and deletes the internet gateways attached to the vpc.
+	"""
+	for gateway in Inventory_Modules.paginate(fVPC_client, 'describe_internet_gateways', 'InternetGateways', Filters=[{'Name': 'attachment.vpc-id', 'Values': [fVpcId]}]):
 		try:
-			response=fVPC_client.delete_vpc(
-				VpcId=fVpcId
-			)
-			return(0)
+			fVPC_client.detach_internet_gateway(InternetGatewayId=gateway['InternetGatewayId'], VpcId=fVpcId)
+			fVPC_client.delete_internet_gateway(InternetGatewayId=gateway['InternetGatewayId'])
 		except ClientError as my_Error:
 			print(my_Error)
 			return(1)
+	return(0)
+
+
+def find_and_delete_virtual_gateways(fVPC_client, fVpcId):
+	"""
+	Detaches the virtual private gateways attached to the vpc, and waits for them to be detached. The gateways themselves
+	aren't deleted - they may still have VPN connections, and can be attached somewhere else.
+	"""
+	rVPN_GatewayList=[vgw['VpnGatewayId'] for vgw in fVPC_client.describe_vpn_gateways(
+		Filters=[{'Name': 'attachment.vpc-id', 'Values': [fVpcId]}, {'Name': 'attachment.state', 'Values': ['attached']}])['VpnGateways']]
+	if len(rVPN_GatewayList) == 0:
+		return(0)
+	try:
+		for VpnGatewayId in rVPN_GatewayList:
+			fVPC_client.detach_vpn_gateway(VpnGatewayId=VpnGatewayId, VpcId=fVpcId)
+		logging.info("Waiting for the VPN Gateways to be fully detached")
+		get_vpc_waiter(fVPC_client, 'VpnGatewaysDetached').wait(VpnGatewayIds=rVPN_GatewayList)
+	except ClientError as my_Error:
+		print(my_Error)
+		return(1)
+	return(0)
 
-###### Main ########################################
-	session_vpc=boto3.Session(
-		aws_access_key_id = ocredentials['AccessKeyId'],
-		aws_secret_access_key = ocredentials['SecretAccessKey'],
-		aws_session_token = ocredentials['SessionToken'],
-		region_name=fRegion)
-	client_vpc=session_vpc.client('ec2')
+
+def delete_vpc(fVPC_client, fVpcId):
+	"""
+	Deletes the vpc itself - once everything in it is gone.
+	"""
 	try:
-		#1. Call EC2.Client.describe_vpc_endpoints. Filter on your VPC id. Call EC2.client.delete_vpc_endpoints on each
-		# print(ERASE_LINE,"Deleting vpc...",end='',flush=True)
-		print("Deleting vpc in {}...".format(fRegion),end='',flush=True)
-
-		logging.info("Deleting vpc-endpoints... for vpc %s in region %s",fVPCId,fRegion)
-		print(".",end='',flush=True)
-		ResultGood=(find_and_delete_vpc_endpoints(client_vpc,fVPCId,fRegion)==0)
-		if not ResultGood:
-			logging.error("Something failed in the vpc_endpoints deletion script")
-			return(1) # out of the try
-		#2. Call VPC.security_groups. Delete the group unless its group_name attribute is "main". The main security group will be deleted via VPC.delete().
-		logging.info("Deleting security groups...")
-		print(".",end='',flush=True)
-		ResultGood=(find_and_delete_vpc_security_groups(client_vpc,fVPCId,fRegion)==0)
-		if not ResultGood:
-			logging.error("Something failed in the vpc_security_group deletion script")
-			return(1) # out of the try
-
-		#3. Call EC2.Client.describe_vpc_peering_connections. Filter on your VPC id as the requester-vpc-info.vpc-id. (My VPC is a requester. There is also accepter-vpc-info.vpc-id among other filters.) Iterate through the entries keyed by VpcPeeringConnections. Get an instance of the peering connection by instantiating a EC2.ServiceResource.VpcPeeringConnection with the VpcPeeringConnectionId. Call VpcPeeringConnection.delete() to remove the peering connection.
-		logging.info("Deleting vpc peering connections...")
-		print(".",end='',flush=True)
-		ResultGood=(find_and_delete_vpc_peering_connections(client_vpc,fVPCId,fRegion)==0)
-		if not ResultGood:
-			logging.error("Something failed in the vpc_peering_connection deletion script")
-			return(1) # out of the try
-
-		# Need to figure a way to wait on this operation, if there are Gateways to be deleted.
-		logging.info("Deleting NAT Gateways...")
-		print(".",end='',flush=True)
-		ResultGood=(find_and_delete_NAT_gateways(client_vpc,fVPCId,fRegion)==0)
-		if not ResultGood:
-			logging.error("Something failed in the vpc_NAT_gateways deletion script")
-			return(1) # out of the try
-
-		#4. Call vpc.route_tables.all() and iterate through the route tables. For each route table, iterate through its routes using the RouteTable.routes attribute. Delete the routes where route['Origin'] is 'CreateRoute'. I deleted using EC2.Client.delete_route using EC2.RouteTable.id and route['DestinationCidrBlock']. After removing the routes, call EC2.RouteTable.delete() to remove the route table itself. I set up exception handlers for each delete. Not every route table can be deleted, but I haven't cracked the code. Maybe next week.
-		logging.info("Deleting vpc route tables...")
-		print(".",end='',flush=True)
-		ResultGood=(find_and_delete_vpc_route_tables(client_vpc,fVPCId,fRegion)==0)
-		if not ResultGood:
-			logging.error("Something failed in the vpc_route_tables deletion script")
-			return(1) # out of the try
-
-		#5. Iterate through vpc.network_acls.all(), test the NetworkAcl.is_default attribute and call NetworkAcl.delete for non-default acls.
-		logging.info("Deleting vpc network access control lists...")
-		print(".",end='',flush=True)
-		ResultGood=(find_and_delete_vpc_nacls(client_vpc,fVPCId,fRegion)==0)
-		if not ResultGood:
-			logging.error("Something failed in the vpc_nacls deletion script")
-			return(1) # out of the try
-
-		#
-		#6. Iterate through vpc.subnets.all().network_interfaces.all(). Call EC2.NetworkInterface.delete() on each.
-		logging.info("Deleting subnets...")
-		print(".",end='',flush=True)
-		ResultGood=(find_and_delete_subnets(client_vpc,fVPCId,fRegion)==0)
-		if not ResultGood:
-			logging.error("Something failed in the vpc_subnets deletion script")
-			return(1) # out of the try
-		#
-		#7. Iterate through vpc.internet_gateways.all(). Call EC2.InternetGateway.delete() on each.
-		logging.info("Deleting Internet Gateways...")
-		print(".",end='',flush=True)
-		ResultGood=(find_and_delete_gateways(client_vpc,fVPCId,fRegion)==0)
-		if not ResultGood:
-			logging.error("Something failed in the vpc_gateways deletion script")
-			return(1) # out of the try
-
-		# Virtual Gateway
-		logging.info("Deleting Virtual Customer Gateways...")
-		print(".",end='',flush=True)
-		ResultGood=(find_and_delete_virtual_gateways(client_vpc,fVPCId,fRegion)==0)
-		if not ResultGood:
-			logging.error("Something failed in the vpc_virtual_gateways deletion script")
-			return(1) # out of the try
-
-		#
-		#8. Call vpc.delete()
-		print("!")
-		ResultGood=(delete_vpc(client_vpc,fVPCId,fRegion)==0)
-		if not ResultGood:
-			logging.error("Something failed in the final vpc deletion script")
-			return(1) # out of the try
+		fVPC_client.delete_vpc(VpcId=fVpcId)
 	except ClientError as my_Error:
 		print(my_Error)
-		print(Fore.RED+"What to do now?"+Fore.RESET)
 		return(1)
-		print()
 	return(0)
+
+
+"""
+What has to be gone before each part of a vpc can be deleted: {step: (function, [steps it depends on])}.
+Anything that doesn't depend on something still running is deleted at the same time as everything else that doesn't.
+- Interface endpoints and NAT gateways have network interfaces in the subnets, and endpoints use the security groups
+- NAT gateways' elastic IPs are mapped through the internet gateway, so it can't be detached until they're gone
+- Route tables are done once nothing (endpoints, peering connections or NAT gateways) is routed to from them
+- Network ACLs can't be deleted while they're still associated with subnets
+"""
+VPC_DELETION_STEPS = {
+	'vpc_endpoints': (find_and_delete_vpc_endpoints, []),
+	'vpc_peering_connections': (find_and_delete_vpc_peering_connections, []),
+	'NAT_gateways': (find_and_delete_NAT_gateways, []),
+	'virtual_gateways': (find_and_delete_virtual_gateways, []),
+	'security_groups': (find_and_delete_vpc_security_groups, ['vpc_endpoints']),
+	'route_tables': (find_and_delete_vpc_route_tables, ['vpc_endpoints', 'vpc_peering_connections', 'NAT_gateways']),
+	'subnets': (find_and_delete_subnets, ['vpc_endpoints', 'NAT_gateways']),
+	'network_acls': (find_and_delete_vpc_nacls, ['subnets']),
+	'internet_gateways': (find_and_delete_gateways, ['NAT_gateways']),
+	'vpc': (delete_vpc, ['security_groups', 'route_tables', 'network_acls', 'internet_gateways', 'virtual_gateways']),
+}
+
+
+def run_dependency_graph(fSteps, fMaxWorkers=None):
+	"""
+	- fSteps is a dict of {step: (function, [steps it depends on])}. Each function is called with no parameters, and
+	  returns 0 if it worked (anything else if it didn't).
+	- fMaxWorkers is how many steps can run at the same time. If None, every step that's ready is run right away.
+
+	Each step is started as soon as every step it depends on has worked. If a step fails (or raises anything at all),
+	nothing that depends on it (directly or not) is started - but everything else still runs.
+	Returns {step: result} - the steps that never started are left out.
+	"""
+	from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+	Results={}
+	Running={}
+	with ThreadPoolExecutor(max_workers=fMaxWorkers or max(1, len(fSteps))) as Executor:
+		while True:
+			for step, (function, dependencies) in fSteps.items():
+				if step not in Results and step not in Running.values() and all(Results.get(dependency) == 0 for dependency in dependencies):
+					Running[Executor.submit(function)]=step
+			if not Running:
+				break
+			Done, NotDone = wait(Running, return_when=FIRST_COMPLETED)
+			for future in Done:
+				step=Running.pop(future)
+				try:
+					Results[step]=future.result()
+				except Exception as my_Error:
+					# Whatever went wrong (a WaiterError, an EndpointConnectionError...), it's only this step that failed
+					print(my_Error)
+					Results[step]=1
+				if not Results[step] == 0:
+					logging.error("Something failed in the %s step", step)
+	return(Results)
+
+
+def delete_vpc_resources(ocredentials, fVpcId, fRegion):
+	"""
+	- ocredentials are the credentials for the account the vpc is in (as described in Inventory_Modules.get_session)
+	- fVpcId is the vpc to delete
+	- fRegion is the region it's in
+
+	Deletes everything in the vpc (following VPC_DELETION_STEPS), and then the vpc.
+	Returns 0 if the vpc is gone, and 1 if something couldn't be deleted.
+	"""
+	from functools import partial
+
+	client_vpc=Inventory_Modules.get_client('ec2', fRegion, ocredentials)
+	Steps={step: (partial(function, client_vpc, fVpcId), dependencies) for step, (function, dependencies) in VPC_DELETION_STEPS.items()}
+	logging.info("Deleting vpc %s in region %s", fVpcId, fRegion)
+	Results=run_dependency_graph(Steps)
+	return(0 if Results.get('vpc') == 0 else 1)
+
+
+def del_vpc(ocredentials, fVPCId, fRegion):
+	"""
+	Deletes one vpc (and everything in it) - see delete_vpc_resources.
+	"""
+	print("Deleting vpc in {}...".format(fRegion), end='', flush=True)
+	Result=delete_vpc_resources(ocredentials, fVPCId, fRegion)
+	print("!" if Result == 0 else "")
+	return(Result)
+
+
+def del_vpcs(fVpcs, fMaxWorkers=10):
+	"""
+	- fVpcs is a list of (ocredentials, VpcId, Region) - for the vpcs to delete, in whichever accounts and regions
+	- fMaxWorkers is how many vpcs to delete at the same time
+
+	Deletes all the vpcs (and everything in them), and returns a list of the results (0 if it worked, 1 if it didn't) in
+	the same order as fVpcs.
+	"""
+	from concurrent.futures import ThreadPoolExecutor, as_completed
+
+	ERASE_LINE = '\x1b[2K'
+	Results=[None] * len(fVpcs)
+	with ThreadPoolExecutor(max_workers=max(1, fMaxWorkers)) as Executor:
+		Futures={Executor.submit(delete_vpc_resources, ocredentials, VpcId, Region): i for i, (ocredentials, VpcId, Region) in enumerate(fVpcs)}
+		for future in as_completed(Futures):
+			try:
+				Results[Futures[future]]=future.result()
+			except Exception as my_Error:
+				# Like not being able to make a client for that account at all - the other vpcs carry on
+				print(my_Error)
+				Results[Futures[future]]=1
+			print(ERASE_LINE+"Deleting vpcs ({} of {} done)...".format(sum(result is not None for result in Results), len(fVpcs)), end='\r', flush=True)
+	print(ERASE_LINE, end='\r')
+	return(Results)